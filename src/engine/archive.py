@@ -1,153 +1,255 @@
-from collections import deque
-from typing import Dict, Tuple, List, Deque
+import math
+from typing import Dict, List
 
+import numpy as np
+
+from src.engine.checkpoint import read_checkpoint, write_checkpoint
 from src.engine.engine import Engine
-from src.flow.flow import Flow
-from src.roadnet.drivable import Drivable
+from src.engine.snapshot import Snapshot
+from src.flow.route import Route
 from src.roadnet.history_record import HistoryRecord
-from src.roadnet.intersection import Intersection
+from src.roadnet.road import Road
+from src.vehicle.buffer import Buffer
+from src.vehicle.lane_change_info import LaneChangeInfo
 from src.vehicle.vehicle import Vehicle
+from src.vehicle.vehicle_info import VehicleInfo
 
 
-class DrivableArchive:
-    def __init__(self):
-        self.vehicles: List[Vehicle] = []
-        self.waiting_buffer: Deque[Vehicle] = deque()
-        self.history: List[HistoryRecord] = []
-        self.history_average_speed: float = 0
-        self.history_vehicle_num: int = 0
-
-
-class FlowArchive:
-    def __init__(self, now_time: float, current_time: float, cnt: int):
-        self.now_time: float = now_time
-        self.current_time: float = current_time
-        self.cnt: int = cnt
+def _flatten(items: List[List[int]]):
+    offsets = np.zeros(len(items) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(item) for item in items])
+    values = np.array([value for item in items for value in item], dtype=np.int64)
+    return offsets, values
 
 
-class TrafficLightArchive:
-    def __init__(self, remain_duration: float, cur_phase_index: int):
-        self.remain_duration: float = remain_duration
-        self.cur_phase_index: int = cur_phase_index
+def _unflatten(offsets: np.ndarray, values: np.ndarray, i: int) -> List[int]:
+    return values[offsets[i]:offsets[i + 1]].tolist()
 
 
 class Archive:
 
-    def __init__(self, engine: Engine):
-        self.step: int = engine.step
-        self.active_vehicle_count: int = engine.active_vehicle_count
-        self.finished_vehicle_cnt = engine.finished_vehicle_cnt
-        self.cumulative_travel_time = engine.cumulative_travel_time
-        self.vehicle_pool: Dict[int, Tuple[Vehicle, int]] = engine.vehicle_pool.copy()
-        self.drivable_archive: Dict[Drivable, DrivableArchive] = {}
-        self.flows_archive: Dict[Flow, FlowArchive] = {}
-        self.traffic_lights_archive: Dict[Intersection, TrafficLightArchive] = {}
-
-        for drivable in engine.road_net.get_drivables():
-            archive = DrivableArchive()
-            self.drivable_archive[drivable] = archive
-            self.archive_drivable(drivable, archive)
-
-        for flow in engine.flows:
-            self.flows_archive[flow] = FlowArchive(flow.now_time, flow.current_time, flow.cnt)
-
-        for intersection in engine.road_net.get_intersections():
-            light = intersection.get_traffic_light()
-            self.traffic_lights_archive[intersection] = TrafficLightArchive(light.remain_duration,
-                                                                            light.cur_phase_index)
-
-    def archive_drivable(self, drivable: Drivable, drivable_archive: DrivableArchive) -> None:
-        for vehicle in drivable.get_vehicles():
-            drivable_archive.vehicles.append(self.getNewPointer(self.vehicle_pool, vehicle))
-
-        if drivable.is_lane():
-            for vehicle in drivable.get_waiting_buffer():
-                drivable_archive.waiting_buffer.append(self.getNewPointer(self.vehicle_pool, vehicle))
-
-            drivable_archive.history = drivable.history
-            drivable_archive.historyVehicleNum = drivable.historyVehicleNum
-            drivable_archive.historyAverageSpeed = drivable.historyAverageSpeed
-
-    def getNewPointer(self, vehicle_pool: Dict[int, Tuple[Vehicle, int]], old: Vehicle) -> Vehicle | None:
-        if old is None:
-            return None
-
-        priority = old.get_priority()
-        assert priority in vehicle_pool
-        return vehicle_pool[priority][0]
+    def __init__(self, engine: Engine = None, snapshot: Snapshot = None):
+        self.snapshot: Snapshot | None = engine.snapshot() if engine is not None else snapshot
+        self.roads: List[Road] = engine.road_net.get_roads() if engine is not None else []
+        self.flows = engine.flows if engine is not None else []
+        self.header: Dict = {}
+        self.arrays: Dict[str, np.ndarray] = {}
 
     def resume(self, engine: Engine) -> None:
-        engine.step = self.step
-        engine.active_vehicle_count = self.active_vehicle_count
-
-        for key in list(engine.vehicle_pool.keys()):
-            del engine.vehicle_pool[key]
-
-        engine.vehiclePool = self.copy_vehicle_pool(self.vehicle_pool)
-        engine.vehicle_map.clear()
-
-        for key in list(engine.vehicle_pool.keys()):
-            vehicle = engine.vehicle_pool[key][0]
-            engine.vehicle_map[vehicle.get_id()] = vehicle
-
-        for thread_veh in engine.thread_vehicle_pool:
-            thread_veh.clear()
-
-        for pair in list(engine.vehicle_pool.keys()):
-            vehicle = engine.vehicle_pool[pair][0]
-            thread_index = engine.vehicle_pool[pair][1]
-            engine.thread_vehicle_pool[thread_index].append(vehicle)
-
-        for drivable in engine.road_net.get_drivables():
-            archive = self.drivable_archive[drivable]
-            drivable.vehicles.clear()
-
-            for vehicle in archive.vehicles:
-                drivable.vehicles.append(self.getNewPointer(engine.vehicle_pool, vehicle))
-
-            if drivable.is_lane():
-                drivable.waiting_buffer.clear()
-
-                for vehicle in archive.waiting_buffer:
-                    drivable.waiting_buffer.append(self.getNewPointer(engine.vehicle_pool, vehicle))
-
-                drivable.history = archive.history
-                drivable.historyVehicleNum = archive.history_vehicle_num
-                drivable.historyAverageSpeed = archive.history_average_speed
-
-        for flow in engine.flows:
-            archive = self.flows_archive[flow]
-            flow.current_time = archive.current_time
-            flow.now_time = archive.now_time
-            flow.cnt = archive.cnt
-
-        for intersection in engine.road_net.get_intersections():
-            light = intersection.get_traffic_light()
-            archive = self.traffic_lights_archive[intersection]
-            light.remainDuration = archive.remain_duration
-            light.curPhaseIndex = archive.cur_phase_index
-
-        engine.finished_vehicle_cnt = self.finished_vehicle_cnt
-        engine.cumulative_travel_time = self.cumulative_travel_time
-
-    def copy_vehicle_pool(self, src: Dict[int, Tuple[Vehicle, int]]) -> Dict[int, Tuple[Vehicle, int]]:
-        new_pool: Dict[int, Tuple[Vehicle, int]] = {}
-        for key in src.items():
-            old_vehicle = key[1][0]
-            new_vehicle = Vehicle(vehicle=old_vehicle)
-            new_pool[old_vehicle.get_priority()] = (new_vehicle, key[1][1])
-
-        for veh in new_pool.items():
-            vehicle = veh[1][0]
-            vehicle.lane_change_info.partner = self.getNewPointer(new_pool, vehicle.lane_change_info.partner)
-            vehicle.controller_info.leader = self.getNewPointer(new_pool, vehicle.controller_info.leader)
-            vehicle.controller_info.blocker = self.getNewPointer(new_pool, vehicle.controller_info.blocker)
+        if self.snapshot is None:
+            self.snapshot = self.decode(engine)
+        engine.restore(self.snapshot)
+
+    def dump(self, path: str) -> None:
+        header, arrays = self.encode()
+        write_checkpoint(path, header, arrays)
+
+    @staticmethod
+    def load(path: str, mmap: bool = True) -> 'Archive':
+        archive = Archive()
+        archive.header, archive.arrays = read_checkpoint(path, mmap)
+        return archive
+
+    def encode(self):
+        snapshot = self.snapshot
+        road_index: Dict[Road, int] = {road: i for i, road in enumerate(self.roads)}
+        flow_index = {flow: i for i, flow in enumerate(self.flows)}
+        vehicle_num = len(snapshot.vehicles)
+
+        routes, anchors, planned, notified = [], [], [], []
+        cur_road = np.full(vehicle_num, -1, dtype=np.int64)
+        route_valid = np.zeros(vehicle_num, dtype=np.bool_)
+        partner_type = np.zeros(vehicle_num, dtype=np.int64)
+        partner_slot = np.full(vehicle_num, -1, dtype=np.int64)
+        blocker_slot = np.full(vehicle_num, -1, dtype=np.int64)
+        buffer_drivable = np.full(vehicle_num, -1, dtype=np.int64)
+        buffer_blocker_slot = np.full(vehicle_num, -1, dtype=np.int64)
+        lane_change_flags = np.zeros((vehicle_num, 2), dtype=np.bool_)
+        lane_change_values = np.zeros((vehicle_num, 5), dtype=np.float64)
+        ids = []
+
+        for i, (vehicle_id, valid, route, anchor_points, i_cur_road, vehicle_planned,
+                vehicle_partner_type, partner, lane_change, blocker, buffer) in enumerate(
+                snapshot.resolve_vehicle_states()):
+            ids.append(vehicle_id)
+            route_valid[i] = valid
+            routes.append([road_index[road] for road in route])
+            anchors.append([road_index[road] for road in anchor_points])
+            # A planned None marks the end of the route
+            planned.append([drivable.index if drivable is not None else -1 for drivable in vehicle_planned])
+            if isinstance(i_cur_road, Road):
+                cur_road[i] = road_index[i_cur_road]
+            elif i_cur_road is not None and i_cur_road < len(route):
+                cur_road[i] = road_index[route[i_cur_road]]
+
+            partner_type[i] = vehicle_partner_type
+            partner_slot[i] = partner.slot if partner is not None else -1
+            blocker_slot[i] = blocker.slot if blocker is not None else -1
+            buffer_drivable[i] = buffer.drivable.index if buffer.drivable is not None else -1
+            buffer_blocker_slot[i] = buffer.blocker.slot if buffer.blocker is not None else -1
+            notified.append([vehicle.slot for vehicle in buffer.notifiedVehicles])
+            if lane_change is not None:
+                lane_change_flags[i] = (lane_change.changing, lane_change.finished)
+                lane_change_values[i] = (math.nan if lane_change.last_dir is None else lane_change.last_dir,
+                                         lane_change.waiting_time, lane_change.last_change_time,
+                                         lane_change.leader_gap, lane_change.follower_gap)
+
+        records = [snapshot.resolve_history(i) for i in range(len(snapshot.history_lengths))]
+        history_offsets = np.zeros(len(records) + 1, dtype=np.int64)
+        history_offsets[1:] = np.cumsum([len(record) for record in records])
+
+        route_offsets, route_roads = _flatten(routes)
+        anchor_offsets, anchor_roads = _flatten(anchors)
+        planned_offsets, planned_drivables = _flatten(planned)
+        notified_offsets, notified_slots = _flatten(notified)
+        vehicles, waiting = snapshot.resolve_drivables(snapshot.drivable_num())
+        drivable_offsets, drivable_vehicle_slots = _flatten([slots.tolist() for slots in vehicles])
+        waiting_offsets, waiting_vehicle_slots = _flatten([slots.tolist() for slots in waiting])
+
+        rng_state = snapshot.rng_state
+        header = {
+            "step": snapshot.step,
+            "active_vehicle_count": snapshot.active_vehicle_count,
+            "finished_vehicle_cnt": snapshot.finished_vehicle_cnt,
+            "cumulative_travel_time": snapshot.cumulative_travel_time,
+            "rng": [rng_state[0], int(rng_state[2]), int(rng_state[3]), float(rng_state[4])],
+            "road_ids": [road.get_id() for road in self.roads],
+            "vehicle_ids": ids
+        }
+
+        arrays = {"column/" + name: column for name, column in snapshot.resolve_columns().items()}
+        arrays.update({
+            "rng_keys": rng_state[1],
+            "slots": snapshot.slots,
+            "priorities": snapshot.priorities,
+            "thread_indices": snapshot.thread_indices,
+            "blocker_slot": blocker_slot,
+            "buffer_drivable": buffer_drivable,
+            "buffer_blocker_slot": buffer_blocker_slot,
+            "notified_offsets": notified_offsets,
+            "notified_slots": notified_slots,
+            "flows": np.array([flow_index.get(vehicle.flow, -1) for vehicle in snapshot.vehicles], dtype=np.int64),
+            "enter_times": np.array([vehicle.enter_time for vehicle in snapshot.vehicles], dtype=np.float64),
+            "route_valid": route_valid,
+            "route_offsets": route_offsets,
+            "route_roads": route_roads,
+            "anchor_offsets": anchor_offsets,
+            "anchor_roads": anchor_roads,
+            "planned_offsets": planned_offsets,
+            "planned_drivables": planned_drivables,
+            "cur_road": cur_road,
+            "partner_type": partner_type,
+            "partner_slot": partner_slot,
+            "lane_change_flags": lane_change_flags,
+            "lane_change_values": lane_change_values,
+            "drivable_offsets": drivable_offsets,
+            "drivable_vehicle_slots": drivable_vehicle_slots,
+            "waiting_offsets": waiting_offsets,
+            "waiting_vehicle_slots": waiting_vehicle_slots,
+            "flow_now_time": snapshot.flow_now_time,
+            "flow_current_time": snapshot.flow_current_time,
+            "flow_cnt": snapshot.flow_cnt,
+            "flow_valid": snapshot.flow_valid,
+            "light_remain_duration": snapshot.light_remain_duration,
+            "light_phase_index": snapshot.light_phase_index,
+            "history_versions": snapshot.history_versions,
+            "history_lengths": snapshot.history_lengths,
+            "history_vehicle_num": snapshot.history_vehicle_num,
+            "history_average_speed": snapshot.history_average_speed,
+            "history_offsets": history_offsets,
+            "history_record_vehicle_num": np.array([item.vehicle_num for record in records for item in record],
+                                                   dtype=np.int64),
+            "history_record_average_speed": np.array([item.average_speed for record in records for item in record],
+                                                     dtype=np.float64)
+        })
+        return header, arrays
+
+    def decode(self, engine: Engine) -> Snapshot:
+        header, arrays = self.header, self.arrays
+        roads: List[Road] = [engine.road_net.get_road_by_id(road_id) for road_id in header["road_ids"]]
+        drivables = engine.road_net.get_drivables()
+        if len(arrays["drivable_offsets"]) != len(drivables) + 1 or None in roads:
+            raise Exception("Checkpoint does not match the loaded roadnet")
+
+        snapshot = Snapshot()
+        snapshot.step = header["step"]
+        snapshot.active_vehicle_count = header["active_vehicle_count"]
+        snapshot.finished_vehicle_cnt = header["finished_vehicle_cnt"]
+        snapshot.cumulative_travel_time = header["cumulative_travel_time"]
+        algorithm, pos, has_gauss, cached_gaussian = header["rng"]
+        snapshot.rng_state = (algorithm, np.array(arrays["rng_keys"]), pos, has_gauss, cached_gaussian)
+
+        for name in ("slots", "priorities", "thread_indices",
+                     "drivable_offsets", "drivable_vehicle_slots", "waiting_offsets", "waiting_vehicle_slots",
+                     "flow_now_time", "flow_current_time", "flow_cnt", "flow_valid",
+                     "light_remain_duration", "light_phase_index",
+                     "history_versions", "history_lengths", "history_vehicle_num", "history_average_speed"):
+            setattr(snapshot, name, np.array(arrays[name]))
+        snapshot.changed_slots = snapshot.slots
+        snapshot.changed_drivables = np.arange(len(drivables), dtype=np.int64)
+        snapshot.columns = {name[len("column/"):]: np.array(array)
+                            for name, array in arrays.items() if name.startswith("column/")}
+
+        history_offsets = arrays["history_offsets"]
+        record_vehicle_num = arrays["history_record_vehicle_num"].tolist()
+        record_average_speed = arrays["history_record_average_speed"].tolist()
+        snapshot.history_tails = [
+            [HistoryRecord(record_vehicle_num[j], record_average_speed[j])
+             for j in range(history_offsets[i], history_offsets[i + 1])]
+            for i in range(len(snapshot.history_lengths))]
+
+        # Vehicles are rebuilt around their original slots, which stay untouched until the snapshot is restored
+        snapshot.vehicles = []
+        slot_vehicle: Dict[int, Vehicle] = {}
+        for i, vehicle_id in enumerate(header["vehicle_ids"]):
+            route = Route()
+            route.route = [roads[road] for road in _unflatten(arrays["anchor_offsets"], arrays["anchor_roads"], i)]
+            flow_index = int(arrays["flows"][i])
+            vehicle = Vehicle.restored(VehicleInfo(route), vehicle_id, engine,
+                                       engine.flows[flow_index] if flow_index >= 0 else None,
+                                       int(snapshot.slots[i]), int(snapshot.priorities[i]),
+                                       float(arrays["enter_times"][i]))
+            snapshot.vehicles.append(vehicle)
+            slot_vehicle[vehicle.slot] = vehicle
+
+        snapshot.vehicle_map = {vehicle.id: vehicle for vehicle in snapshot.vehicles}
+        snapshot.vehicle_states = {}
+        for i, vehicle in enumerate(snapshot.vehicles):
+            route = [roads[road] for road in _unflatten(arrays["route_offsets"], arrays["route_roads"], i)]
+            anchor_points = [roads[road] for road in _unflatten(arrays["anchor_offsets"], arrays["anchor_roads"], i)]
+            planned = [drivables[index] if index >= 0 else None for index in
+                       _unflatten(arrays["planned_offsets"], arrays["planned_drivables"], i)]
+            cur_road = int(arrays["cur_road"][i])
+
+            partner_type = int(arrays["partner_type"][i])
+            if partner_type != 0:
+                vehicle.lane_change_info = LaneChangeInfo(vehicle)
 
             lane_change = vehicle.lane_change
-            lane_change.target_leader = self.getNewPointer(new_pool, lane_change.target_leader)
-            lane_change, targetFollower = self.getNewPointer(new_pool, lane_change.target_follower)
-            if lane_change.signal_recv:
-                lane_change.signal_recv = self.getNewPointer(new_pool,
-                                                             lane_change.signal_recv.source).lane_change.signal_send
-
-        return new_pool
+            lane_change.changing, lane_change.finished = arrays["lane_change_flags"][i].tolist()
+            last_dir, lane_change.waiting_time, lane_change.last_change_time, \
+                lane_change.leader_gap, lane_change.follower_gap = arrays["lane_change_values"][i].tolist()
+            lane_change.last_dir = None if math.isnan(last_dir) else int(last_dir)
+
+            buffer = Buffer()
+            drivable_index = int(arrays["buffer_drivable"][i])
+            buffer.drivable = drivables[drivable_index] if drivable_index >= 0 else None
+            buffer.blocker = slot_vehicle.get(int(arrays["buffer_blocker_slot"][i]))
+            buffer.notifiedVehicles = [slot_vehicle[slot] for slot in
+                                       _unflatten(arrays["notified_offsets"], arrays["notified_slots"], i)]
+
+            snapshot.vehicle_states[vehicle.slot] = (
+                vehicle.id,
+                bool(arrays["route_valid"][i]),
+                route,
+                anchor_points,
+                roads[cur_road] if cur_road >= 0 else None,
+                planned,
+                partner_type,
+                slot_vehicle.get(int(arrays["partner_slot"][i])),
+                lane_change,
+                slot_vehicle.get(int(arrays["blocker_slot"][i])),
+                buffer
+            )
+
+        return snapshot
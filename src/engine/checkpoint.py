@@ -0,0 +1,65 @@
+import json
+import struct
+from typing import Dict, Tuple
+
+import numpy as np
+
+MAGIC = b"CFCKPT\x00\x00"
+VERSION = 1
+ALIGNMENT = 64
+
+# magic, format version, header length
+_PREAMBLE = struct.Struct("<8sIQ")
+
+
+def _align(offset: int) -> int:
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def write_checkpoint(path: str, header: Dict, arrays: Dict[str, np.ndarray]) -> None:
+    arrays = {name: np.ascontiguousarray(array) for name, array in arrays.items()}
+
+    # Array offsets are relative to the data section, so the header can be sized before it is written
+    layout: Dict[str, Dict] = {}
+    offset = 0
+    for name, array in arrays.items():
+        offset = _align(offset)
+        layout[name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+        offset += array.nbytes
+
+    header_bytes = json.dumps({"meta": header, "arrays": layout}).encode("utf-8")
+    data_start = _align(_PREAMBLE.size + len(header_bytes))
+
+    with open(path, "wb") as file:
+        file.write(_PREAMBLE.pack(MAGIC, VERSION, len(header_bytes)))
+        file.write(header_bytes)
+        for name, array in arrays.items():
+            file.write(b"\x00" * (data_start + layout[name]["offset"] - file.tell()))
+            file.write(array.tobytes())
+
+
+def read_checkpoint(path: str, mmap: bool = True) -> Tuple[Dict, Dict[str, np.ndarray]]:
+    with open(path, "rb") as file:
+        preamble = file.read(_PREAMBLE.size)
+        if len(preamble) < _PREAMBLE.size:
+            raise Exception("Checkpoint '" + path + "' is truncated")
+
+        magic, version, header_length = _PREAMBLE.unpack(preamble)
+        if magic != MAGIC:
+            raise Exception("'" + path + "' is not a checkpoint file")
+        if version != VERSION:
+            raise Exception("Unsupported checkpoint version " + str(version))
+        header = json.loads(file.read(header_length).decode("utf-8"))
+
+    data_start = _align(_PREAMBLE.size + header_length)
+    data = np.memmap(path, dtype=np.uint8, mode="r") if mmap else np.fromfile(path, dtype=np.uint8)
+
+    arrays: Dict[str, np.ndarray] = {}
+    for name, entry in header["arrays"].items():
+        dtype = np.dtype(entry["dtype"])
+        shape = tuple(entry["shape"])
+        start = data_start + entry["offset"]
+        count = int(np.prod(shape, dtype=np.int64))
+        arrays[name] = data[start:start + count * dtype.itemsize].view(dtype).reshape(shape)
+
+    return header["meta"], arrays
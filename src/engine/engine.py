@@ -1,107 +1,130 @@
+from __future__ import annotations
+
 import json
 import math
 import sys
 import threading
-from concurrent.futures import ThreadPoolExecutor
 
 import numpy as np
 
-from typing import List, Dict, Tuple, Set
+from typing import TYPE_CHECKING, Dict, List, Set, Tuple
 
 from src.flow.flow import Flow
 from src.flow.route import Route
-from src.roadnet.drivable import Drivable
-from src.roadnet.intersection import Intersection
-from src.roadnet.road import Road
+from src.engine.worker_buffer import WorkerBuffer
+from src.replay.async_replay_writer import AsyncReplayWriter
+from src.replay.replay_format import LIGHT_GREEN, LIGHT_IMPLICIT, LIGHT_RED
+from src.replay.replay_writer import ReplayWriter
+from src.roadnet.partitioner import RoadNetPartitioner
 from src.roadnet.roadnet import RoadNet
+from src.roadnet.roadnet_cache import RoadNetCache
 from src.utility.barrier import Barrier
-from src.utility.utility import read_json_from_file, write_json_to_file, min2double
+from src.utility.utility import read_json_from_file, write_json_to_file, min2double, Point
+from src.vehicle.car_follow_kernel import get_next_speeds
+from src.vehicle.route_cache import RouteCache
+from src.vehicle.router_type import RouterType
 from src.vehicle.vehicle import Vehicle
 from src.vehicle.vehicle_info import VehicleInfo
+from src.vehicle.vehicle_store import VehicleStore
+
+if TYPE_CHECKING:
+    from src.roadnet.drivable import Drivable
+    from src.roadnet.intersection import Intersection
+    from src.roadnet.lane import Lane
+    from src.roadnet.road import Road
 
 
 class Engine:
     def __init__(self, config_file: str, thread_num: int):
-        self.log_out = None
+        self.replay_writer: ReplayWriter | AsyncReplayWriter | None = None
+        self.replayCompression: bool = False
+        self.replayAsync: bool = True
+        self.replayKeyframeInterval: int = 100
+        self.replay_lanes: List[Lane] = []
+        self.replay_light_phases: List[int] | None = None
         self.step: int = 0
         self.finished = False
-        self.lock = threading.Lock()
         self.interval: float
         self.warnings: bool = False
         self.rlTrafficLight: bool = False
         self.laneChange: bool = False
+        self.rebalanceInterval: int = 300
+        self.rebalance_threshold: float = 1.2
+        self.partitioner: RoadNetPartitioner
+        self.drivable_partition: np.ndarray = np.zeros(0, dtype=np.int64)
         self.seed: int
         self.dir: str
         self.road_net: RoadNet
+        self.roadnet_cache: RoadNetCache | None = None
+        self.roadnetBuildWorkers: int = 1
+        self.route_cache: RouteCache | None = RouteCache()
+        self.routingEngine: str = "dijkstra"
+        self.routing_engine = None
         self.saveReplayInConfig: bool
         self.saveReplay: bool = False
         self.finished_vehicle_cnt: int = 0
         self.active_vehicle_count: int = 0
         self.cumulative_travel_time: float = 0.0
         self.vehicle_pool: Dict[int, Tuple[Vehicle, int]] = {}
+        self.vehicle_store: VehicleStore = VehicleStore()
+        self.drivable_max_speed: np.ndarray = np.zeros(0)
+        self.last_snapshot = None
         self.lane_change_notify_buffer: List[Vehicle] = []
         self.push_buffer: List[Tuple[Vehicle, float]] = []
 
         self.thread_num = thread_num
+        self.threads: List[threading.Thread] = []
         self.vehicle_map: Dict[str, Vehicle] = {}
         self.thread_vehicle_pool: List[List[Vehicle]] = [[] for _ in range(thread_num)]
         self.thread_road_pool: List[List[Road]] = [[] for _ in range(thread_num)]
         self.thread_intersection_pool: List[List[Intersection]] = [[] for _ in range(thread_num)]
         self.thread_drivable_pool: List[List[Drivable]] = [[] for _ in range(thread_num)]
         self.flows: List[Flow] = []
-        self.start_barrier: Barrier = Barrier(thread_num + 1)
-        self.end_barrier: Barrier = Barrier(thread_num + 1)
+        self.barrierSpinCount: int = 100
+        self.start_barrier: Barrier = Barrier(thread_num + 1, self.barrierSpinCount)
+        self.end_barrier: Barrier = Barrier(thread_num + 1, self.barrierSpinCount)
         self.vehicle_remove_buffer: Set[Vehicle] = set()
+        self.worker_buffers: List[WorkerBuffer] = [WorkerBuffer() for _ in range(thread_num)]
 
         success = self.load_config(config_file)
         if not success:
             print("load config failed!")
 
-        self.thread_pool = ThreadPoolExecutor(max_workers=thread_num)
-        self.threads = []
         for i in range(thread_num):
-            t = threading.Thread(target=self.thread_controller, args=(
+            t = threading.Thread(target=self.threadController, args=(
                 self.thread_vehicle_pool[i],
                 self.thread_road_pool[i],
                 self.thread_intersection_pool[i],
-                self.thread_drivable_pool[i]))
+                self.thread_drivable_pool[i],
+                self.worker_buffers[i]), daemon=True)
             self.threads.append(t)
             t.start()
 
     def __del__(self):
-        self.log_out.close()
-        self.finished = True
-
-        for i in range((9 if self.laneChange else 6)):
-            self.start_barrier.wait()
-            self.end_barrier.wait()
-
-        for thread in self.thread_pool:
-            thread.join()
-
-        for vehicle_pair in self.vehicle_pool.values():
-            del vehicle_pair[0]
-
-    def thread_controller(self, vehicle_pool, road_pool, intersection_pool, drivable_pool):
-        # Thread specific processing logic
-        pass
+        self.close()
 
     def load_config(self, config_file: str) -> bool:
         document = read_json_from_file(config_file)
-        if read_json_from_file is None:
+        if document is None:
             print("cannot open config file!")
             return False
 
         try:
-            self.interval = document.interval
+            self.interval = document["interval"]
             self.warnings = False
-            self.rlTrafficLight = document.rlTrafficLight
-            self.laneChange = document.laneChange if document.laneChange is not None else False
-            self.seed = document.seed
+            self.rlTrafficLight = document["rlTrafficLight"]
+            self.laneChange = document.get("laneChange", False)
+            self.seed = document["seed"]
             np.random.seed(self.seed)
-            self.dir = document.dir
-            roadnet_file: str = document.roadnetFile
-            flowFile: str = document.flowFile
+            self.dir = document["dir"]
+            roadnet_file: str = document["roadnetFile"]
+            flowFile: str = document["flowFile"]
+            roadnet_cache_dir = document.get("roadnetCacheDir", None)
+            self.roadnet_cache = RoadNetCache(self.dir + roadnet_cache_dir) if roadnet_cache_dir else None
+            self.roadnetBuildWorkers = document.get("roadnetBuildWorkers", 1)
+            route_cache_size = document.get("routeCacheSize", 4096)
+            self.route_cache = RouteCache(route_cache_size) if route_cache_size > 0 else None
+            self.routingEngine = document.get("routingEngine", "dijkstra")
 
             if self.loadRoadNet(self.dir + roadnet_file) is False:
                 print("loading roadnet file error!")
@@ -114,36 +137,86 @@ class Engine:
             if self.warnings:
                 self.check_warning()
 
-            self.saveReplayInConfig = document.saveReplay
-            self.saveReplay = document.saveReplay
+            self.rebalanceInterval = document.get("rebalanceInterval", 300)
+            self.barrierSpinCount = document.get("barrierSpinCount", 100)
+            self.start_barrier.spin_count = self.barrierSpinCount
+            self.end_barrier.spin_count = self.barrierSpinCount
+            self.saveReplayInConfig = document["saveReplay"]
+            self.saveReplay = document["saveReplay"]
+            self.replayCompression = document.get("replayCompression", False)
+            self.replayAsync = document.get("replayAsync", True)
+            self.replayKeyframeInterval = document.get("replayKeyframeInterval", 100)
 
             if self.saveReplay:
-                roadnetLogFile: str = document.roadnetLogFile
-                replayLogFile: str = document.replayLogFile
-                self.setLogFile(self.dir + roadnetLogFile, self.dir + replayLogFile)
+                roadnetLogFile: str = document["roadnetLogFile"]
+                replayLogFile: str = document["replayLogFile"]
+                self.set_log_file(self.dir + roadnetLogFile, self.dir + replayLogFile)
         except:
             return False
         self.stepLog = ""
         return True
 
     def loadRoadNet(self, json_file: str) -> bool:
-        self.road_net = RoadNet()
-        ans = self.road_net.load_from_json(json_file)
-        cnt = 0
+        # A cached roadnet is keyed by the JSON's content hash and skips parsing and all geometry construction
+        cached = self.roadnet_cache.load(json_file) if self.roadnet_cache is not None else None
+        if cached is not None:
+            self.road_net, ans = cached, True
+        else:
+            self.road_net = RoadNet()
+            ans = self.road_net.load_from_json(json_file, self.roadnetBuildWorkers)
+            if ans and self.roadnet_cache is not None:
+                # Routing preprocessing is built before storing so it is cached along with the roadnet
+                self.road_net.get_routing_engine(self.routingEngine)
+                self.roadnet_cache.store(json_file, self.road_net)
+        if ans:
+            self.routing_engine = self.road_net.get_routing_engine(self.routingEngine)
+        self.invalidate_routes()
+        self.partitioner = RoadNetPartitioner(self.road_net, self.thread_num)
+        self.partitioner.partition()
+        self.assign_partitions()
+
+        self.drivable_max_speed = np.array([drivable.get_max_speed() for drivable in self.road_net.get_drivables()],
+                                           dtype=np.float64)
+
+        self.json_root = self.road_net.convert_to_json()
+        return ans
+
+    def assign_partitions(self) -> None:
+        for pool in self.thread_road_pool + self.thread_intersection_pool + self.thread_drivable_pool:
+            pool.clear()
+
         for road in self.road_net.get_roads():
-            self.thread_road_pool[cnt].append(road)
-            cnt = (cnt + 1) % self.thread_num
+            self.thread_road_pool[self.partitioner.get_road_partition(road)].append(road)
 
         for intersection in self.road_net.get_intersections():
-            self.thread_intersection_pool[cnt].append(intersection)
-            cnt = (cnt + 1) % self.thread_num
+            self.thread_intersection_pool[self.partitioner.get_intersection_partition(intersection)].append(
+                intersection)
 
+        self.drivable_partition = self.partitioner.drivable_partition_array()
         for drivable in self.road_net.get_drivables():
-            self.thread_drivable_pool[cnt].append(drivable)
-            cnt = (cnt + 1) % self.thread_num
+            self.thread_drivable_pool[self.drivable_partition[drivable.index]].append(drivable)
 
-        self.json_root = self.road_net.convert_to_json()
-        return ans
+        for pool in self.thread_vehicle_pool:
+            pool.clear()
+
+        for priority, (vehicle, _) in self.vehicle_pool.items():
+            thread_index = self.get_vehicle_partition(vehicle)
+            self.vehicle_pool[priority] = (vehicle, thread_index)
+            self.thread_vehicle_pool[thread_index].append(vehicle)
+
+    def get_vehicle_partition(self, vehicle: Vehicle) -> int:
+        drivable = vehicle.get_cur_drivable()
+        if drivable is not None:
+            return int(self.drivable_partition[drivable.index])
+        return self.partitioner.get_road_partition(vehicle.get_first_road())
+
+    def rebalance_partitions(self) -> None:
+        load = self.partitioner.intersection_load()
+        if self.partitioner.imbalance(load) <= self.rebalance_threshold:
+            return
+
+        self.partitioner.partition(load)
+        self.assign_partitions()
 
     def load_flow(self, json_filename: str):
         try:
@@ -212,14 +285,14 @@ class Engine:
 
         return result
 
-    def vehicle_control(self, vehicle: Vehicle, buffer: List[Tuple[Vehicle, float]]) -> None:
-
-        next_speed = vehicle.get_buffer_speed() if vehicle.has_set_speed() else vehicle.get_next_speed(
-            self.interval).speed
+    def vehicle_control(self, vehicle: Vehicle, worker_buffer: WorkerBuffer, next_speed: float = None) -> None:
+        if next_speed is None:
+            next_speed = vehicle.get_buffer_speed() if vehicle.has_set_speed() else vehicle.get_next_speed(
+                self.interval).speed
 
         if self.laneChange:
             partner = vehicle.get_partner()
-            if partner is not None and partner.has_set_speed() is False:
+            if partner is not None and not partner.has_set_speed():
                 partner_speed = partner.get_next_speed(self.interval).speed
                 next_speed = min(next_speed, partner_speed)
                 partner.set_speed(next_speed)
@@ -242,7 +315,7 @@ class Engine:
         vehicle.set_delta_distance(delta_dis)
 
         if self.laneChange:
-            if vehicle.is_real() and vehicle.get_changed_drivable() is not None:
+            if not vehicle.is_real() and vehicle.get_changed_drivable() is not None:
                 vehicle.abort_lane_change()
 
             if vehicle.is_changing():
@@ -254,60 +327,53 @@ class Engine:
                 vehicle.set_offset(new_offset * direction)
 
                 if new_offset >= vehicle.get_max_offset():
-                    with self.lock:
-                        del self.vehicle_map[vehicle.get_partner().get_id()]
-                        self.vehicle_map[vehicle.get_id()] = vehicle.get_partner()
-                        vehicle.finish_changing()
+                    partner = vehicle.get_partner()
+                    worker_buffer.vehicle_map_updates.append((partner.get_id(), vehicle.get_id(), partner))
+                    vehicle.finish_changing()
 
-        if vehicle.has_set_end() is False and vehicle.has_set_drivable():
-            buffer.append((vehicle, vehicle.get_buffer_dis()))
+        if not vehicle.has_set_end() and vehicle.has_set_drivable():
+            worker_buffer.push_buffer.append((vehicle, vehicle.get_buffer_dis()))
 
     def threadController(self, vehicles: Set[Vehicle],
                          roads: List[Road],
                          intersections: List[Intersection],
-                         drivables: List[Drivable]) -> None:
-        while self.finished is False:
+                         drivables: List[Drivable],
+                         worker_buffer: WorkerBuffer) -> None:
+        while True:
+            self.start_barrier.wait()
+            if self.finished:
+                return
             self.thread_plan_route(roads)
             if self.laneChange:
                 self.thread_init_segments(roads)
-                self.thread_plan_lane_change(vehicles)
+                self.thread_plan_lane_change(vehicles, worker_buffer)
                 self.thread_update_leader_and_gap(drivables)
 
             self.thread_notify_cross(intersections)
-            self.thread_get_action(vehicles)
-            self.thread_update_location(drivables)
+            self.thread_get_action(vehicles, worker_buffer)
+            self.thread_update_location(drivables, worker_buffer)
             self.thread_update_action(vehicles)
             self.thread_update_leader_and_gap(drivables)
 
-    def thread_update_location(self, drivables: List[Drivable]) -> None:
+    def thread_plan_route(self, roads: List[Road]) -> None:
+        for road in roads:
+            for vehicle in road.get_plan_route_buffer():
+                vehicle.update_route()
+        self.end_barrier.wait()
+
+    def thread_update_location(self, drivables: List[Drivable], worker_buffer: WorkerBuffer) -> None:
         self.start_barrier.wait()
         for drivable in drivables:
-            drivable.vehicles = [vehicle for vehicle in drivable.vehicles if
-                                 vehicle.get_changed_drivable() is not None or vehicle.has_set_end()]
-            vehicles = drivable.get_vehicles()
-            vehicle_iter = iter(vehicles)
-            while True:
-                try:
-                    vehicle = next(vehicle_iter)
-                except StopIteration:
-                    break
-
-                if vehicle.get_changed_drivable() or vehicle.has_set_end():
-                    vehicles.remove(vehicle)
-
+            vehicles = []
+            for vehicle in drivable.vehicles:
                 if vehicle.has_set_end():
-                    with self.lock:
-                        self.vehicle_remove_buffer.add(vehicle)
-                        if vehicle.lane_change.has_finished():
-                            del self.vehicle_map[vehicle.get_id]
-
-                            self.finished_vehicle_cnt += 1
-                            self.cumulative_travel_time += self.get_current_time() - vehicle.enter_time
-
-                        iter_vehicle_pool = self.vehicle_pool[vehicle.get_priority()]
-                        self.thread_vehicle_pool[iter_vehicle_pool[1]].remove(vehicle)
-                        del self.vehicle_pool[vehicle.get_priority()]
-                        self.active_vehicle_count -= 1
+                    worker_buffer.remove_buffer.append(vehicle)
+                elif vehicle.get_changed_drivable() is None:
+                    vehicles.append(vehicle)
+
+            if len(vehicles) != len(drivable.vehicles):
+                drivable.vehicles = vehicles
+                drivable.dirty = True
         self.end_barrier.wait()
 
     def thread_notify_cross(self, intersections: List[Intersection]) -> None:
@@ -366,18 +432,13 @@ class Engine:
 
         self.end_barrier.wait()
 
-    def thread_plan_lane_change(self, vehicles: Set[Vehicle]) -> None:
+    def thread_plan_lane_change(self, vehicles: Set[Vehicle], worker_buffer: WorkerBuffer) -> None:
         self.start_barrier.wait()
-        buffer: List[Vehicle] = [];
-
         for vehicle in vehicles:
             if vehicle.is_running() and vehicle.is_real():
                 vehicle.make_lane_change_signal(self.interval)
                 if vehicle.plan_lane_change():
-                    buffer.append(vehicle)
-
-        with self.lock:
-            self.lane_change_notify_buffer.extend(buffer)
+                    worker_buffer.lane_change_notify_buffer.append(vehicle)
         self.end_barrier.wait()
 
     def thread_init_segments(self, roads: List[Road]) -> None:
@@ -388,15 +449,21 @@ class Engine:
 
         self.end_barrier.wait()
 
-    def thread_get_action(self, vehicles: Set[Vehicle]) -> None:
+    def thread_get_action(self, vehicles: Set[Vehicle], worker_buffer: WorkerBuffer) -> None:
         self.start_barrier.wait()
-        buffer: List[Tuple[Vehicle, float]] = []
+        batch_vehicles: List[Vehicle] = []
         for vehicle in vehicles:
             if vehicle.is_running():
-                self.vehicle_control(vehicle, buffer)
+                if vehicle.is_batch_controllable():
+                    batch_vehicles.append(vehicle)
+                else:
+                    self.vehicle_control(vehicle, worker_buffer)
 
-        with self.lock:
-            self.push_buffer.extend(buffer)
+        if batch_vehicles:
+            slots = np.fromiter((vehicle.slot for vehicle in batch_vehicles), dtype=np.int64,
+                                count=len(batch_vehicles))
+            next_speeds = get_next_speeds(self.vehicle_store, slots, self.drivable_max_speed, self.interval)
+            self.batch_vehicle_control(batch_vehicles, next_speeds, worker_buffer)
 
         self.end_barrier.wait()
 
@@ -425,13 +492,17 @@ class Engine:
         self.end_barrier.wait()
 
     def plan_lane_change(self) -> None:
-        self.start_barrier.wait()
-        self.end_barrier.wait()
-        self.scheduleLaneChange()
+        self.start_barrier.wait("plan_lane_change")
+        self.end_barrier.wait("plan_lane_change")
+
+        for worker_buffer in self.worker_buffers:
+            self.lane_change_notify_buffer.extend(worker_buffer.lane_change_notify_buffer)
+            worker_buffer.lane_change_notify_buffer.clear()
+        self.schedule_lane_change()
 
     def plan_route(self) -> None:
-        self.start_barrier.wait()
-        self.end_barrier.wait()
+        self.start_barrier.wait("plan_route")
+        self.end_barrier.wait("plan_route")
 
         for road in self.road_net.get_roads():
             for vehicle in road.get_plan_route_buffer():
@@ -446,23 +517,45 @@ class Engine:
                     iter_vehicle = self.vehicle_pool[vehicle.get_priority()]
                     self.thread_vehicle_pool[iter_vehicle[1]].remove(vehicle)
                     del self.vehicle_pool[vehicle.get_priority()]
+                    del self.vehicle_map[vehicle.get_id()]
+                    self.vehicle_store.release(vehicle.slot)
 
             road.clear_plan_route_buffer()
 
     def get_action(self) -> None:
-        self.start_barrier.wait()
-        self.end_barrier.wait()
+        self.start_barrier.wait("get_action")
+        self.end_barrier.wait("get_action")
+
+        for worker_buffer in self.worker_buffers:
+            for old_id, new_id, vehicle in worker_buffer.vehicle_map_updates:
+                del self.vehicle_map[old_id]
+                self.vehicle_map[new_id] = vehicle
+            self.push_buffer.extend(worker_buffer.push_buffer)
+            worker_buffer.vehicle_map_updates.clear()
+            worker_buffer.push_buffer.clear()
+
+    def batch_vehicle_control(self, vehicles: List[Vehicle], next_speeds: np.ndarray,
+                              worker_buffer: WorkerBuffer) -> None:
+        for vehicle, next_speed in zip(vehicles, next_speeds.tolist()):
+            self.vehicle_control(vehicle, worker_buffer, next_speed)
 
     def update_location(self) -> None:
-        self.start_barrier.wait()
-        self.end_barrier.wait()
+        self.start_barrier.wait("update_location")
+        self.end_barrier.wait("update_location")
 
-        self.push_buffer.sort(key=lambda x: x[1])
+        for worker_buffer in self.worker_buffers:
+            for vehicle in worker_buffer.remove_buffer:
+                self.remove_finished_vehicle(vehicle)
+            worker_buffer.remove_buffer.clear()
+
+        self.push_buffer.sort(key=lambda x: (x[1], x[0].get_priority()))
         for vehicle_pair in self.push_buffer:
             vehicle, drivable = vehicle_pair
             changed_drivable = vehicle.get_changed_drivable()
             if changed_drivable:
                 changed_drivable.push_vehicle(vehicle)
+                if self.thread_num > 1:
+                    self.migrate_vehicle(vehicle, changed_drivable)
                 if changed_drivable.is_lane_link():
                     vehicle.set_enter_lane_link_time(self.step)
                 else:
@@ -470,9 +563,33 @@ class Engine:
 
         self.push_buffer.clear()
 
+    def migrate_vehicle(self, vehicle: Vehicle, drivable: Drivable) -> None:
+        # A vehicle entering another region is handed over to the worker that owns its new drivable
+        thread_index = int(self.drivable_partition[drivable.index])
+        old_thread_index = self.vehicle_pool[vehicle.get_priority()][1]
+        if thread_index != old_thread_index:
+            self.thread_vehicle_pool[old_thread_index].remove(vehicle)
+            self.thread_vehicle_pool[thread_index].append(vehicle)
+            self.vehicle_pool[vehicle.get_priority()] = (vehicle, thread_index)
+
+    def remove_finished_vehicle(self, vehicle: Vehicle) -> None:
+        self.vehicle_remove_buffer.add(vehicle)
+        if not vehicle.lane_change.has_finished():
+            del self.vehicle_map[vehicle.get_id()]
+
+            self.finished_vehicle_cnt += 1
+            self.cumulative_travel_time += self.get_current_time() - vehicle.enter_time
+
+        iter_vehicle_pool = self.vehicle_pool[vehicle.get_priority()]
+        self.thread_vehicle_pool[iter_vehicle_pool[1]].remove(vehicle)
+        del self.vehicle_pool[vehicle.get_priority()]
+        self.active_vehicle_count -= 1
+
     def update_action(self) -> None:
-        self.start_barrier.wait()
-        self.end_barrier.wait()
+        self.start_barrier.wait("update_action")
+        self.end_barrier.wait("update_action")
+        for vehicle in self.vehicle_remove_buffer:
+            self.vehicle_store.release(vehicle.slot)
         self.vehicle_remove_buffer.clear()
 
     def handle_waiting(self) -> None:
@@ -483,53 +600,132 @@ class Engine:
 
             vehicle = buffer[0]
             if lane.available(vehicle):
-                vehicle.controller_info.running = True
+                vehicle.set_running(True)
                 self.active_vehicle_count += 1
                 tail = lane.get_last_vehicle()
                 lane.push_vehicle(vehicle)
                 vehicle.update_leader_and_gap(tail)
                 buffer.popleft()
 
-    def update_log(self):
-        result = ""
-        for vehicle in self.get_running_vehicles():
-            pos = vehicle.get_point()
-            dir = vehicle.get_cur_drivable().get_direction_by_distance(vehicle.get_distance())
-
-            lc = vehicle.last_lane_change_direction()
-            result += (
-                f"{pos.x} {pos.y} {math.atan2(dir.y, dir.x)} "
-                f"{vehicle.get_id()} {lc} {vehicle.get_len()} "
-                f"{vehicle.get_width()},"
-            )
-        result += ";"
-
-        for road in self.roadnet.get_roads():
-            if road.get_end_intersection().is_virtual_intersection():
-                continue
-            result += road.get_id()
-            for lane in road.get_lanes():
-                if lane.get_end_intersection().is_implicit_intersection():
-                    result += " i"
-                    continue
-
-                can_go = all(lane_link.is_available() for lane_link in lane.get_lane_links())
-                result += " g" if can_go else " r"
-            result += ","
+    def open_replay_writer(self, log_file: str) -> None:
+        if self.replay_writer is not None:
+            self.replay_writer.close()
+
+        roads = [road for road in self.road_net.get_roads() if not road.get_end_intersection().is_virtual_intersection()]
+        self.replay_lanes = [lane for road in roads for lane in road.get_lanes()]
+        self.replay_writer = ReplayWriter(log_file, [(road.get_id(), len(road.get_lanes())) for road in roads],
+                                          self.replayCompression, self.replayKeyframeInterval)
+        self.replay_light_phases = None
+        if self.replayAsync:
+            self.replay_writer = AsyncReplayWriter(self.replay_writer)
+
+    def get_light_states(self) -> np.ndarray | None:
+        # Light states only change when some traffic light switches phase since the last written frame
+        phases = [intersection.get_traffic_light().get_current_phase_index()
+                  for intersection in self.road_net.get_intersections()]
+        if phases == self.replay_light_phases:
+            return None
+        self.replay_light_phases = phases
+
+        lights = np.empty(len(self.replay_lanes), dtype=np.uint8)
+        for i, lane in enumerate(self.replay_lanes):
+            if lane.get_end_intersection().is_implicit_intersection():
+                lights[i] = LIGHT_IMPLICIT
+            elif all(lane_link.is_available() for lane_link in lane.get_lane_links()):
+                lights[i] = LIGHT_GREEN
+            else:
+                lights[i] = LIGHT_RED
+        return lights
+
+    def update_log(self) -> None:
+        if self.replay_writer is None:
+            return
 
-        with open('logfile.txt', 'w') as log_out:  # Replace 'logfile.txt' with actual log file's path
-            log_out.write(f"{result}\n")
+        positions = self.get_vehicle_positions()
+        slots = positions["slot"]
+        store = self.vehicle_store
+        vehicles = [store.vehicles[slot] for slot in slots.tolist()]
+        columns = {"x": positions["x"], "y": positions["y"], "angle": positions["heading"],
+                   "len": store.len[slots], "width": store.width[slots],
+                   "lane_change": np.array([vehicle.last_lane_change_direction() for vehicle in vehicles],
+                                           dtype=np.int8)}
+
+        self.replay_writer.write_frame(self.step, [vehicle.get_id() for vehicle in vehicles], columns,
+                                       self.get_light_states())
+
+    def get_vehicle_positions(self) -> Dict[str, np.ndarray]:
+        store = self.vehicle_store
+        slots = store.running_slots()
+        # Lane change shadows share their partner's position and are not reported
+        slots = slots[np.array([store.vehicles[slot].is_real() for slot in slots.tolist()], dtype=np.bool_)]
+
+        drivable_indices = store.drivable_index[slots]
+        order = np.argsort(drivable_indices, kind="stable")
+        slots, drivable_indices = slots[order], drivable_indices[order]
+        distances = store.dis[slots]
+        offsets = store.offset[slots]
+
+        x, y, heading = np.empty(len(slots)), np.empty(len(slots)), np.empty(len(slots))
+        drivables = self.road_net.get_drivables()
+        boundaries = np.flatnonzero(np.diff(drivable_indices)) + 1
+        starts = np.r_[0, boundaries] if len(slots) > 0 else boundaries
+        for start, end in zip(starts.tolist(), np.r_[boundaries, len(slots)].tolist()):
+            drivable = drivables[drivable_indices[start]]
+            x[start:end], y[start:end] = drivable.get_points_by_distance(distances[start:end])
+            unit_x, unit_y = drivable.get_directions_by_distance(distances[start:end])
+            heading[start:end] = np.arctan2(unit_y, unit_x)
+            if drivable.is_lane():
+                self.apply_lane_change_offsets(drivable, distances[start:end], offsets[start:end],
+                                               x[start:end], y[start:end])
+
+        return {"slot": slots, "x": x, "y": y, "heading": heading}
+
+    def apply_lane_change_offsets(self, lane: Lane, distances: np.ndarray, offsets: np.ndarray,
+                                  x: np.ndarray, y: np.ndarray) -> None:
+        # Vehicles changing lanes are blended toward the neighbouring lane, as in Vehicle.get_point
+        lanes = lane.belong_road.get_lanes()
+        for direction in (1, -1):
+            changing = np.flatnonzero(offsets * direction >= Point.eps)
+            if len(changing) == 0:
+                continue
+            neighbour = lanes[lane.lane_index + direction]
+            next_x, next_y = neighbour.get_points_by_distance(distances[changing])
+            percentage = 2 * offsets[changing] * direction / (lane.get_width() + neighbour.get_width())
+            x[changing] = next_x * percentage + x[changing] * (1 - percentage)
+            y[changing] = next_y * percentage + y[changing] * (1 - percentage)
 
     def update_leader_and_gap(self) -> None:
-        self.start_barrier.wait()
-        self.end_barrier.wait()
+        self.start_barrier.wait("update_leader_and_gap")
+        self.end_barrier.wait("update_leader_and_gap")
+        # Lane history was just updated, but duration routes only go stale when a road's rounded duration changes
+        road_graph = self.road_net.get_road_graph()
+        if road_graph is not None and road_graph.update_durations() and self.route_cache is not None:
+            self.route_cache.invalidate(RouterType.DURATION)
 
     def notify_cross(self) -> None:
-        self.start_barrier.wait()
-        self.end_barrier.wait()
+        self.start_barrier.wait("notify_cross")
+        self.end_barrier.wait("notify_cross")
 
     def nextStep(self) -> None:
-        for flow in self.flows:
+        self.advance(self.flows, self.saveReplay)
+
+    def run(self, steps: int, observe_every: int = 1) -> List[Dict[str, np.ndarray]]:
+        observations: List[Dict[str, np.ndarray]] = []
+        save_replay = self.saveReplay
+
+        # Invalid or finished flows never spawn again, so they are dropped once for the whole batch
+        flows = [flow for flow in self.flows
+                 if flow.valid and (flow.end_time == -1 or flow.current_time <= flow.end_time)]
+
+        for i in range(steps):
+            self.advance(flows, save_replay)
+            if observe_every > 0 and (i + 1) % observe_every == 0:
+                observations.append(self.get_observation())
+
+        return observations
+
+    def advance(self, flows: List[Flow], save_replay: bool) -> None:
+        for flow in flows:
             flow.nextStep(self.interval)
 
         self.plan_route()
@@ -547,25 +743,28 @@ class Engine:
         self.update_action()
         self.update_leader_and_gap()
 
-        if self.rlTrafficLight is None:
+        if not self.rlTrafficLight:
             intersections = self.road_net.get_intersections()
             for intersection in intersections:
                 intersection.get_traffic_light().pass_time(self.interval)
 
-        if self.saveReplay:
+        if save_replay:
             self.update_log()
 
         self.step += 1
 
+        if self.thread_num > 1 and self.rebalanceInterval > 0 and self.step % self.rebalanceInterval == 0:
+            self.rebalance_partitions()
+
     def init_segments(self) -> None:
-        self.start_barrier.wait()
-        self.end_barrier.wait()
+        self.start_barrier.wait("init_segments")
+        self.end_barrier.wait("init_segments")
 
     def check_priority(self, priority: int) -> bool:
-        return self.vehicle_pool[priority] != self.vehicle_pool[-1]
+        return priority in self.vehicle_pool
 
     def push_vehicle(self, vehicle: Vehicle, push_to_drivable: bool) -> None:
-        threadIndex = np.random.randint(1, self.thread_num)
+        threadIndex = self.get_vehicle_partition(vehicle)
         self.vehicle_pool[vehicle.get_priority()] = (vehicle, threadIndex)
         self.vehicle_map[vehicle.get_id()] = vehicle
         self.thread_vehicle_pool[threadIndex].append(vehicle)
@@ -573,10 +772,31 @@ class Engine:
         if push_to_drivable:
             vehicle.get_cur_drivable().push_waiting_vehicle(vehicle)
 
+    def close(self) -> None:
+        if not self.finished and self.threads:
+            # Workers wait at the start of the next step and stop there once they see finished
+            self.finished = True
+            self.start_barrier.wait()
+
+            for thread in self.threads:
+                thread.join()
+
+        if self.replay_writer is not None:
+            self.replay_writer.close()
+            self.replay_writer = None
+
+    def get_barrier_stats(self) -> Dict[str, Tuple[int, float]]:
+        # Time the main thread spends at the end barrier is the wall time of each parallel phase
+        return self.end_barrier.get_stats()
+
+    def reset_barrier_stats(self) -> None:
+        self.start_barrier.reset_stats()
+        self.end_barrier.reset_stats()
+
     def get_vehicle_count(self) -> int:
         return self.active_vehicle_count
 
-    def get_vehicles(self, include_waiting) -> List[str]:
+    def get_vehicles(self, include_waiting: bool = False) -> List[str]:
         ret = []
         for vehicle in self.get_running_vehicles(include_waiting):  # Replace with your function call or attribute
             ret.append(vehicle.get_id())
@@ -600,6 +820,31 @@ class Engine:
             ret[lane.get_id()] = cnt
         return ret
 
+    def get_lane_ids(self) -> List[str]:
+        return [lane.get_id() for lane in self.road_net.get_lanes()]
+
+    def get_observation(self) -> Dict[str, np.ndarray]:
+        # Lanes are the first drivables of the roadnet, so drivable index == lane index
+        lanes = self.road_net.get_lanes()
+        lane_num = len(lanes)
+        assert lane_num == 0 or lanes[-1].index == lane_num - 1
+        drivable_num = len(self.road_net.get_drivables())
+        store = self.vehicle_store
+        slots = store.running_slots()
+        drivables = store.drivable_index[slots]
+        speeds = store.speed[slots]
+
+        count = np.bincount(drivables, minlength=drivable_num)[:lane_num]
+        waiting = np.bincount(drivables, weights=speeds < 0.1, minlength=drivable_num)[:lane_num]
+        speed_sum = np.bincount(drivables, weights=speeds, minlength=drivable_num)[:lane_num]
+
+        return {
+            "step": np.array(self.step),
+            "lane_vehicle_count": count,
+            "lane_waiting_vehicle_count": waiting.astype(np.int64),
+            "lane_average_speed": np.divide(speed_sum, count, out=np.zeros(lane_num), where=count > 0)
+        }
+
     def get_lane_vehicles(self) -> Dict[str, List[str]]:
         ret: Dict[str, List[str]] = {}
 
@@ -642,11 +887,8 @@ class Engine:
             print("saveReplay is not set to true in config file!", file=sys.stderr)
             return
 
-        if self.log_out is not None:
-            self.log_out.close()
-
         try:
-            self.log_out = open(self.dir + "/" + log_file, 'w')
+            self.open_replay_writer(self.dir + "/" + log_file)
         except IOError as e:
             print("Failed to open file: ", e, file=sys.stderr)
 
@@ -658,15 +900,15 @@ class Engine:
         self.saveReplay = open
 
     def reset(self, reset_rnd: bool) -> None:
-        for vehicle_pair in self.vehicle_pool.values():
-            del vehicle_pair[0]
-
+        # Vehicles only live in the pools, the drivables and their store slots, so clearing those drops them
         for pool in self.thread_vehicle_pool:
             pool.clear()
 
         self.vehicle_pool.clear()
         self.vehicle_map.clear()
+        self.vehicle_store.clear()
         self.road_net.reset()
+        self.invalidate_routes(RouterType.DURATION)
 
         self.finished_vehicle_cnt = 0
         self.cumulative_travel_time = 0
@@ -676,6 +918,7 @@ class Engine:
 
         self.step = 0
         self.active_vehicle_count = 0
+        self.last_snapshot = None
         if reset_rnd:
             np.random.seed(self.seed)
 
@@ -687,11 +930,11 @@ class Engine:
             print("write roadnet log file error", file=sys.stderr)
 
         try:
-            self.log_out = open(log_file, 'w')
+            self.open_replay_writer(log_file)
         except IOError as e:
             print("Failed to open log file: ", e, file=sys.stderr)
 
-    def get_running_vehicles(self, include_waiting):
+    def get_running_vehicles(self, include_waiting: bool = False) -> List[Vehicle]:
         ret = []
         for vehicle_pair in self.vehicle_pool.values():
             vehicle = vehicle_pair[0]  # Assuming that vehicle object is the first element of vehiclePair object
@@ -721,9 +964,28 @@ class Engine:
         self.active_vehicle_count += 1
 
     def loadFromFile(self, file_name: str) -> None:
-        pass
-        # Archive archive(*this, fileName);
-        # archive.resume(*this);
+        from src.engine.archive import Archive
+        Archive.load(file_name).resume(self)
+
+    def saveToFile(self, file_name: str) -> None:
+        from src.engine.archive import Archive
+        Archive(self).dump(file_name)
+
+    def snapshot(self, incremental: bool = False) -> 'Snapshot':
+        from src.engine.snapshot import Snapshot
+        self.last_snapshot = Snapshot(self, self.last_snapshot if incremental else None)
+        return self.last_snapshot
+
+    def restore(self, snapshot: 'Snapshot') -> None:
+        snapshot.restore(self)
+        self.last_snapshot = snapshot
+        self.invalidate_routes(RouterType.DURATION)
+
+    def invalidate_routes(self, router_type: RouterType | None = None) -> None:
+        if router_type in (None, RouterType.DURATION) and self.road_net.get_road_graph() is not None:
+            self.road_net.get_road_graph().invalidate_durations()
+        if self.route_cache is not None:
+            self.route_cache.invalidate(router_type)
 
     def set_vehicle_speed(self, vehicle_id: str, speed: float) -> None:
         if vehicle_id not in self.vehicle_map:
@@ -0,0 +1,324 @@
+from collections import deque
+from copy import copy
+from typing import Deque, Dict, List, Tuple
+
+import numpy as np
+
+from src.engine.engine import Engine
+from src.roadnet.drivable import Drivable
+from src.roadnet.history_record import HistoryRecord
+from src.vehicle.buffer import Buffer
+from src.vehicle.lane_change import LaneChange
+from src.vehicle.signal import Signal
+from src.vehicle.vehicle import Vehicle
+
+
+def _pack(slot_lists: List[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+    offsets = np.zeros(len(slot_lists) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(slots) for slots in slot_lists])
+    values = np.concatenate(slot_lists) if slot_lists else np.zeros(0, dtype=np.int64)
+    return offsets, values.astype(np.int64)
+
+
+def _copy_signal(signal: Signal | None, signals: Dict[int, Signal]) -> Signal | None:
+    # A received signal is the sender's own signal object, so copies are shared the same way
+    if signal is None:
+        return None
+    if id(signal) not in signals:
+        signals[id(signal)] = copy(signal)
+    return signals[id(signal)]
+
+
+def _copy_lane_change(lane_change: LaneChange, signals: Dict[int, Signal]) -> LaneChange:
+    result = copy(lane_change)
+    result.signal_send = _copy_signal(lane_change.signal_send, signals)
+    result.signal_recv = _copy_signal(lane_change.signal_recv, signals)
+    return result
+
+
+def _copy_buffer(buffer: Buffer) -> Buffer:
+    result = copy(buffer)
+    result.notifiedVehicles = list(buffer.notifiedVehicles)
+    return result
+
+
+class Snapshot:
+    def __init__(self, engine: Engine = None, parent: 'Snapshot' = None):
+        # An incremental snapshot only keeps what changed since its parent, which must be the state the
+        # engine was last snapshotted at or restored to
+        self.parent: Snapshot | None = parent
+        if engine is None:
+            # Filled in by the caller, e.g. when decoding a checkpoint
+            return
+
+        self.step: int = engine.step
+        self.active_vehicle_count: int = engine.active_vehicle_count
+        self.finished_vehicle_cnt: int = engine.finished_vehicle_cnt
+        self.cumulative_travel_time: float = engine.cumulative_travel_time
+        self.vehicle_map: Dict[str, Vehicle] = engine.vehicle_map.copy()
+        self.rng_state: Tuple = np.random.get_state()
+
+        pool = list(engine.vehicle_pool.items())
+        self.vehicles: List[Vehicle] = [vehicle for _, (vehicle, _) in pool]
+        self.priorities: np.ndarray = np.array([priority for priority, _ in pool], dtype=np.int64)
+        self.thread_indices: np.ndarray = np.array([thread_index for _, (_, thread_index) in pool], dtype=np.int64)
+        self.slots: np.ndarray = np.array([vehicle.slot for vehicle in self.vehicles], dtype=np.int64)
+        self.capture_vehicles(engine)
+        self.capture_drivables(engine)
+
+        self.flow_now_time = np.array([flow.now_time for flow in engine.flows], dtype=np.float64)
+        self.flow_current_time = np.array([flow.current_time for flow in engine.flows], dtype=np.float64)
+        self.flow_cnt = np.array([flow.cnt for flow in engine.flows], dtype=np.int64)
+        self.flow_valid = np.array([flow.valid for flow in engine.flows], dtype=np.bool_)
+
+        lights = [intersection.get_traffic_light() for intersection in engine.road_net.get_intersections()]
+        self.light_remain_duration = np.array([light.remain_duration for light in lights], dtype=np.float64)
+        self.light_phase_index = np.array([light.cur_phase_index for light in lights], dtype=np.int64)
+
+    def capture_vehicles(self, engine: Engine) -> None:
+        store = engine.vehicle_store
+        if self.parent is None:
+            changed = np.ones(len(self.slots), dtype=np.bool_)
+        else:
+            # Every writer of vehicle state outside the store marks the vehicle dirty, see Vehicle.mark_dirty
+            changed = store.dirty[self.slots]
+
+        self.changed_slots: np.ndarray = self.slots[changed]
+        self.columns: Dict[str, np.ndarray] = {
+            name: getattr(store, name)[self.changed_slots]
+            for fields in (store.float_fields, store.bool_fields, store.int_fields)
+            for name in fields
+        }
+
+        # Object state that has no column: identity, routing progress, lane change bookkeeping and the update
+        # buffer. Everything mutable is copied, so the live vehicles never write into a snapshot
+        self.vehicle_states: Dict[int, Tuple] = {}
+        signals: Dict[int, Signal] = {}
+        for i in np.flatnonzero(changed).tolist():
+            vehicle = self.vehicles[i]
+            router = vehicle.controller_info.router
+            self.vehicle_states[vehicle.slot] = (
+                vehicle.id,
+                vehicle.route_valid,
+                list(router.route),
+                list(router.anchor_points),
+                router.i_cur_road,
+                list(router.planned),
+                vehicle.lane_change_info.partnerType if vehicle.lane_change_info is not None else 0,
+                vehicle.lane_change_info.partner if vehicle.lane_change_info is not None else None,
+                _copy_lane_change(vehicle.lane_change, signals),
+                vehicle.controller_info.blocker,
+                _copy_buffer(vehicle.buffer)
+            )
+        store.dirty[:] = False
+
+    def capture_drivables(self, engine: Engine) -> None:
+        drivables = engine.road_net.get_drivables()
+        changed = [drivable for drivable in drivables if self.parent is None or drivable.dirty]
+        self.changed_drivables = np.array([drivable.index for drivable in changed], dtype=np.int64)
+        self.drivable_offsets, self.drivable_vehicle_slots = _pack(
+            [np.array([vehicle.slot for vehicle in drivable.get_vehicles()], dtype=np.int64) for drivable in changed])
+        self.waiting_offsets, self.waiting_vehicle_slots = _pack(
+            [np.array([vehicle.slot for vehicle in drivable.get_waiting_buffer()], dtype=np.int64)
+             if drivable.is_lane() else np.zeros(0, dtype=np.int64) for drivable in changed])
+        for drivable in changed:
+            drivable.dirty = False
+
+        # Histories only grow at the back, so only records appended since the parent are kept
+        lanes = engine.road_net.get_lanes()
+        self.history_versions = np.array([lane.history_version for lane in lanes], dtype=np.int64)
+        self.history_lengths = np.array([len(lane.history) for lane in lanes], dtype=np.int64)
+        self.history_vehicle_num = np.array([lane.historyVehicleNum for lane in lanes], dtype=np.int64)
+        self.history_average_speed = np.array([lane.historyAverageSpeed for lane in lanes], dtype=np.float64)
+        self.history_tails: List[List[HistoryRecord]] = []
+        for i, lane in enumerate(lanes):
+            count = len(lane.history)
+            if self.parent is not None:
+                count = min(count, lane.history_version - int(self.parent.history_versions[i]))
+            self.history_tails.append(lane.history[len(lane.history) - count:])
+
+    def chain(self) -> List['Snapshot']:
+        chain = []
+        snapshot = self
+        while snapshot is not None:
+            chain.append(snapshot)
+            snapshot = snapshot.parent
+        return chain[::-1]
+
+    def resolve_columns(self) -> Dict[str, np.ndarray]:
+        if self.parent is None:
+            return self.columns
+
+        chain = self.chain()
+        size = max([int(snapshot.changed_slots.max()) + 1 for snapshot in chain if len(snapshot.changed_slots) > 0],
+                   default=0)
+        result = {}
+        for name, column in self.columns.items():
+            values = np.zeros(size, dtype=column.dtype)
+            for snapshot in chain:
+                values[snapshot.changed_slots] = snapshot.columns[name]
+            result[name] = values[self.slots]
+        return result
+
+    def resolve_vehicle_states(self) -> List[Tuple]:
+        states: Dict[int, Tuple] = {}
+        for snapshot in self.chain():
+            states.update(snapshot.vehicle_states)
+        return [states[slot] for slot in self.slots.tolist()]
+
+    def resolve_drivables(self, drivable_num: int) -> Tuple[List[np.ndarray], List[np.ndarray]]:
+        vehicles: List[np.ndarray] = [np.zeros(0, dtype=np.int64)] * drivable_num
+        waiting: List[np.ndarray] = [np.zeros(0, dtype=np.int64)] * drivable_num
+        for snapshot in self.chain():
+            offsets, waiting_offsets = snapshot.drivable_offsets, snapshot.waiting_offsets
+            for j, index in enumerate(snapshot.changed_drivables.tolist()):
+                vehicles[index] = snapshot.drivable_vehicle_slots[offsets[j]:offsets[j + 1]]
+                waiting[index] = snapshot.waiting_vehicle_slots[waiting_offsets[j]:waiting_offsets[j + 1]]
+        return vehicles, waiting
+
+    def resolve_history(self, lane_index: int) -> List[HistoryRecord]:
+        length = int(self.history_lengths[lane_index])
+        records: List[HistoryRecord] = []
+        snapshot = self
+        while snapshot is not None and len(records) < length:
+            records = snapshot.history_tails[lane_index] + records
+            snapshot = snapshot.parent
+        return records[len(records) - length:]
+
+    def drivable_num(self) -> int:
+        return max(int(snapshot.changed_drivables.max(initial=-1)) + 1 for snapshot in self.chain())
+
+    def rebase(self) -> None:
+        if self.parent is None:
+            return
+
+        drivable_num = self.drivable_num()
+        vehicles, waiting = self.resolve_drivables(drivable_num)
+        columns = self.resolve_columns()
+        states = self.resolve_vehicle_states()
+        tails = [self.resolve_history(i) for i in range(len(self.history_lengths))]
+
+        self.changed_slots = self.slots
+        self.columns = columns
+        self.vehicle_states = dict(zip(self.slots.tolist(), states))
+        self.changed_drivables = np.arange(drivable_num, dtype=np.int64)
+        self.drivable_offsets, self.drivable_vehicle_slots = _pack(vehicles)
+        self.waiting_offsets, self.waiting_vehicle_slots = _pack(waiting)
+        self.history_tails = tails
+        self.parent = None
+
+    def restore(self, engine: Engine) -> None:
+        engine.step = self.step
+        engine.active_vehicle_count = self.active_vehicle_count
+        engine.finished_vehicle_cnt = self.finished_vehicle_cnt
+        engine.cumulative_travel_time = self.cumulative_travel_time
+        engine.vehicle_map = self.vehicle_map.copy()
+        np.random.set_state(self.rng_state)
+
+        store = engine.vehicle_store
+        store.restore_slots(self.slots, self.vehicles, self.resolve_columns())
+
+        engine.vehicle_pool = {}
+        for pool in engine.thread_vehicle_pool:
+            pool.clear()
+        for vehicle, priority, thread_index in zip(self.vehicles, self.priorities.tolist(),
+                                                   self.thread_indices.tolist()):
+            engine.vehicle_pool[priority] = (vehicle, thread_index)
+            engine.thread_vehicle_pool[thread_index].append(vehicle)
+
+        self.restore_vehicles(engine)
+        self.restore_drivables(engine)
+
+        for i, flow in enumerate(engine.flows):
+            flow.now_time = float(self.flow_now_time[i])
+            flow.current_time = float(self.flow_current_time[i])
+            flow.cnt = int(self.flow_cnt[i])
+            flow.valid = bool(self.flow_valid[i])
+
+        for i, intersection in enumerate(engine.road_net.get_intersections()):
+            light = intersection.get_traffic_light()
+            light.remain_duration = float(self.light_remain_duration[i])
+            light.cur_phase_index = int(self.light_phase_index[i])
+
+    def restore_vehicles(self, engine: Engine) -> None:
+        store = engine.vehicle_store
+        drivables: List[Drivable] = engine.road_net.get_drivables()
+
+        # Snapshots can be restored many times, so the live vehicles get fresh copies of the mutable state
+        signals: Dict[int, Signal] = {}
+        for vehicle, state in zip(self.vehicles, self.resolve_vehicle_states()):
+            slot = vehicle.slot
+            (vehicle.id, vehicle.route_valid, route, anchor_points, i_cur_road, planned,
+             partner_type, partner, lane_change, blocker, buffer) = state
+
+            controller_info = vehicle.controller_info
+            drivable_index = store.drivable_index[slot]
+            prev_drivable_index = store.prev_drivable_index[slot]
+            controller_info.drivable = drivables[drivable_index] if drivable_index >= 0 else None
+            controller_info.prevDrivable = drivables[prev_drivable_index] if prev_drivable_index >= 0 else None
+            controller_info.leader = store.get_vehicle(store.leader_slot[slot])
+            controller_info.blocker = blocker
+
+            router = controller_info.router
+            router.route = list(route)
+            router.anchor_points = list(anchor_points)
+            router.i_cur_road = i_cur_road
+            router.planned = deque(planned)
+
+            if vehicle.lane_change_info is not None:
+                vehicle.lane_change_info.partnerType = partner_type
+                vehicle.lane_change_info.partner = partner
+            vehicle.lane_change = _copy_lane_change(lane_change, signals)
+            vehicle.buffer = _copy_buffer(buffer)
+
+    def restore_drivables(self, engine: Engine) -> None:
+        vehicles = engine.vehicle_store.vehicles
+        drivables = engine.road_net.get_drivables()
+        vehicle_slots, waiting_slots = self.resolve_drivables(len(drivables))
+
+        for i, drivable in enumerate(drivables):
+            drivable.vehicles = [vehicles[slot] for slot in vehicle_slots[i].tolist()]
+            drivable.dirty = False
+
+            if drivable.is_lane():
+                drivable.waiting_buffer.clear()
+                drivable.waiting_buffer.extend(vehicles[slot] for slot in waiting_slots[i].tolist())
+
+        for i, lane in enumerate(engine.road_net.get_lanes()):
+            lane.history = self.resolve_history(i)
+            lane.history_version = int(self.history_versions[i])
+            lane.historyVehicleNum = int(self.history_vehicle_num[i])
+            lane.historyAverageSpeed = float(self.history_average_speed[i])
+
+
+class SnapshotRing:
+    def __init__(self, engine: Engine, capacity: int, full_interval: int = 32):
+        self.engine: Engine = engine
+        self.capacity: int = capacity
+        self.full_interval: int = full_interval
+        self.snapshots: Deque[Snapshot] = deque()
+        self.pushed: int = 0
+
+    def __len__(self) -> int:
+        return len(self.snapshots)
+
+    def push(self) -> Snapshot:
+        # A full snapshot every full_interval pushes bounds the parent chain walked on restore
+        snapshot = self.engine.snapshot(incremental=self.pushed % self.full_interval != 0)
+        self.pushed += 1
+        self.snapshots.append(snapshot)
+
+        if len(self.snapshots) > self.capacity:
+            evicted = self.snapshots.popleft()
+            if self.snapshots[0].parent is evicted:
+                self.snapshots[0].rebase()
+        return snapshot
+
+    def rollback(self, back: int = 0) -> Snapshot:
+        snapshot = self.snapshots[-1 - back]
+        self.engine.restore(snapshot)
+
+        # Snapshots taken after the restored one belong to the abandoned branch
+        for _ in range(back):
+            self.snapshots.pop()
+        return snapshot
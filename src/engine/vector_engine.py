@@ -0,0 +1,75 @@
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from src.engine.engine import Engine
+from src.engine.snapshot import Snapshot
+
+
+class VectorEngine:
+    def __init__(self, config_file: str, env_num: int, seeds: List[int] = None, thread_num: int = 1):
+        # One engine owns the roadnet geometry; every environment only keeps its own dynamic state
+        self.engine: Engine = Engine(config_file, thread_num)
+        self.env_num: int = env_num
+        self.seeds: List[int] = seeds if seeds is not None else [self.engine.seed + i for i in range(env_num)]
+        assert len(self.seeds) == env_num
+
+        self.lane_ids: List[str] = self.engine.get_lane_ids()
+        self.initial_snapshot: Snapshot = self.engine.snapshot()
+        self.snapshots: List[Snapshot] = [self.initial_snapshot] * env_num
+        self.rng_states: List[Tuple] = [np.random.get_state()] * env_num
+        self.pending_phases: List[List[Tuple[str, int]]] = [[] for _ in range(env_num)]
+        self.initial_observation: Dict[str, np.ndarray] = self.engine.get_observation()
+        self.observations: List[Dict[str, np.ndarray]] = [self.initial_observation] * env_num
+        self.reset()
+
+    def reset(self, env_index: int = None) -> None:
+        indices = range(self.env_num) if env_index is None else [env_index]
+        for i in indices:
+            np.random.seed(self.seeds[i])
+            self.rng_states[i] = np.random.get_state()
+            self.snapshots[i] = self.initial_snapshot
+            self.pending_phases[i].clear()
+            self.observations[i] = self.initial_observation
+
+    def activate(self, env_index: int) -> None:
+        self.engine.restore(self.snapshots[env_index])
+        np.random.set_state(self.rng_states[env_index])
+
+        for intersection_id, phase_index in self.pending_phases[env_index]:
+            self.engine.set_traffic_light_phase(intersection_id, phase_index)
+        self.pending_phases[env_index].clear()
+
+    def deactivate(self, env_index: int) -> None:
+        self.snapshots[env_index] = self.engine.snapshot()
+        self.rng_states[env_index] = np.random.get_state()
+
+    def step(self, steps: int = 1) -> Dict[str, np.ndarray]:
+        # Environments take turns on the shared engine; a swap costs about as much as one simulated step,
+        # so larger steps amortise it
+        for i in range(self.env_num):
+            self.activate(i)
+            self.engine.run(steps, observe_every=0)
+            self.observations[i] = self.engine.get_observation()
+            self.deactivate(i)
+
+        return self.get_observations()
+
+    def set_traffic_light_phase(self, env_index: int, intersection_id: str, phase_index: int) -> None:
+        self.pending_phases[env_index].append((intersection_id, phase_index))
+
+    def get_observations(self) -> Dict[str, np.ndarray]:
+        return {key: np.stack([observation[key] for observation in self.observations])
+                for key in self.observations[0]}
+
+    def get_lane_vehicle_count(self) -> np.ndarray:
+        return np.stack([observation["lane_vehicle_count"] for observation in self.observations])
+
+    def get_lane_waiting_vehicle_count(self) -> np.ndarray:
+        return np.stack([observation["lane_waiting_vehicle_count"] for observation in self.observations])
+
+    def get_lane_ids(self) -> List[str]:
+        return self.lane_ids
+
+    def close(self) -> None:
+        self.engine.close()
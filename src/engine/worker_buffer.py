@@ -0,0 +1,17 @@
+from typing import List, Tuple
+
+from src.vehicle.vehicle import Vehicle
+
+
+class WorkerBuffer:
+    def __init__(self):
+        self.push_buffer: List[Tuple[Vehicle, float]] = []
+        self.remove_buffer: List[Vehicle] = []
+        self.lane_change_notify_buffer: List[Vehicle] = []
+        self.vehicle_map_updates: List[Tuple[str, str, Vehicle]] = []
+
+    def clear(self) -> None:
+        self.push_buffer.clear()
+        self.remove_buffer.clear()
+        self.lane_change_notify_buffer.clear()
+        self.vehicle_map_updates.clear()
@@ -1,6 +1,12 @@
-from src.engine.engine import Engine
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
 from src.vehicle.vehicle import Vehicle
-from src.vehicle.vehicle_info import VehicleInfo
+
+if TYPE_CHECKING:
+    from src.engine.engine import Engine
+    from src.vehicle.vehicle_info import VehicleInfo
 
 
 class Flow:
@@ -19,7 +25,7 @@ class Flow:
         self.end_time: int = end_time
         self.id: str = id
         self.now_time: float = time_interval
-        self.valid: bool = False
+        self.valid: bool = True
         self.cnt: int = 0
 
     def nextStep(self, timeInterval: float) -> None:
@@ -31,7 +37,8 @@ class Flow:
 
         if self.current_time >= self.start_time:
             while self.now_time >= self.interval:
-                vehicle = Vehicle(self.vehicleInfo, id + "_" + self.cnt, self.engine, self)
+                vehicle = Vehicle(vehicle_info=self.vehicleInfo, id=self.id + "_" + str(self.cnt), engine=self.engine,
+                                  flow=self)
                 self.cnt += 1
                 priority = vehicle.get_priority()
 
@@ -54,9 +61,9 @@ class Flow:
     def setValid(self, valid: bool) -> None:
         if self.valid and valid is False:
             print(f"[warning] Invalid route '{self.id}'. Omitted by default.")
-        self.valid = valid;
+        self.valid = valid
 
     def reset(self) -> None:
-        self.now_time = self.time_interval
+        self.now_time = self.interval
         self.current_time = 0
         self.cnt = 0
@@ -1,6 +1,9 @@
-from typing import List
+from __future__ import annotations
 
-from src.roadnet.road import Road
+from typing import TYPE_CHECKING, List
+
+if TYPE_CHECKING:
+    from src.roadnet.road import Road
 
 
 class Route:
@@ -0,0 +1,72 @@
+import queue
+import threading
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from src.replay.replay_writer import ReplayWriter
+
+
+class AsyncReplayWriter:
+    def __init__(self, writer: ReplayWriter, batch_frames: int = 16, max_batches: int = 2):
+        self.writer: ReplayWriter = writer
+        self.batch_frames: int = batch_frames
+        # One batch fills on the simulation thread while the writer drains the other; put() blocks when both
+        # are taken, which keeps a slow disk from growing memory without bound
+        self.batches: queue.Queue = queue.Queue(maxsize=max_batches)
+        self.batch: List[Tuple] = []
+        self.error: BaseException | None = None
+        self.failed: bool = False
+        self.closed: bool = False
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def run(self) -> None:
+        while True:
+            batch = self.batches.get()
+            try:
+                if batch is None:
+                    return
+                if not self.failed:
+                    for frame in batch:
+                        self.writer.write_frame(*frame)
+            except BaseException as e:
+                self.error = e
+                self.failed = True
+            finally:
+                self.batches.task_done()
+
+    def check_error(self) -> None:
+        # A failure is reported once; later frames are dropped since the file is already incomplete
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise Exception("Replay writer failed") from error
+
+    def write_frame(self, step: int, vehicle_ids: List[str], vehicles: Dict[str, np.ndarray],
+                    lights: np.ndarray | None) -> None:
+        self.check_error()
+        # The engine builds fresh arrays every step, so frames are handed over without copying
+        self.batch.append((step, vehicle_ids, vehicles, lights))
+        if len(self.batch) >= self.batch_frames:
+            self.batches.put(self.batch)
+            self.batch = []
+
+    def flush(self) -> None:
+        if self.batch:
+            self.batches.put(self.batch)
+            self.batch = []
+        self.batches.join()
+        self.writer.flush()
+        self.check_error()
+
+    def close(self) -> None:
+        if self.closed:
+            return
+
+        self.closed = True
+        try:
+            self.flush()
+        finally:
+            self.batches.put(None)
+            self.thread.join()
+            self.writer.close()
@@ -0,0 +1,250 @@
+import json
+import struct
+import zlib
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+MAGIC = b"CFREPLAY"
+VERSION = 2
+
+# magic, format version, header length
+FILE_HEADER = struct.Struct("<8sIQ")
+# payload size, flags, step, vehicle count, new id count, light count
+FRAME_HEADER = struct.Struct("<IIqIII")
+
+INDEX_MAGIC = b"CFRPIDX\x00"
+# magic, format version
+INDEX_HEADER = struct.Struct("<8sI")
+# keyframe step, keyframe offset, ids known before the keyframe, ids first seen since the previous entry
+INDEX_ENTRY = struct.Struct("<qQII")
+
+FLAG_COMPRESSED = 1
+FLAG_KEYFRAME = 2
+FLAG_LIGHTS = 4
+
+LIGHT_GREEN = 0
+LIGHT_RED = 1
+LIGHT_IMPLICIT = 2
+LIGHT_CHARS = ("g", "r", "i")
+
+# Keyframes store every vehicle column at full precision, in this order
+VEHICLE_COLUMNS = (("x", np.float64), ("y", np.float64), ("angle", np.float64), ("id", np.int32),
+                   ("lane_change", np.int8), ("len", np.float64), ("width", np.float64))
+
+# Delta frames store headings as int16 in units of ANGLE_RESOLUTION, which covers [-pi, pi]
+ANGLE_RESOLUTION = 1e-4
+DELTA_LIMIT = np.iinfo(np.int16).max
+
+
+class Frame:
+    def __init__(self, step: int, vehicles: Dict[str, np.ndarray], new_ids: List[str], lights: np.ndarray | None):
+        self.step: int = step
+        self.vehicles: Dict[str, np.ndarray] = vehicles
+        self.new_ids: List[str] = new_ids
+        self.lights: np.ndarray | None = lights
+
+
+def encode_file_header(roads: List[Tuple[str, int]], position_resolution: float) -> bytes:
+    header = json.dumps({"roads": roads, "position_resolution": position_resolution}).encode("utf-8")
+    return FILE_HEADER.pack(MAGIC, VERSION, len(header)) + header
+
+
+def decode_file_header(data) -> Tuple[Dict, int]:
+    if len(data) < FILE_HEADER.size:
+        raise Exception("Replay file is truncated")
+
+    magic, version, header_length = FILE_HEADER.unpack_from(data, 0)
+    if magic != MAGIC:
+        raise Exception("Not a replay file")
+    if version != VERSION:
+        raise Exception("Unsupported replay version " + str(version))
+
+    start = FILE_HEADER.size
+    return json.loads(bytes(data[start:start + header_length]).decode("utf-8")), start + header_length
+
+
+def index_path(path: str) -> str:
+    return path + ".idx"
+
+
+def encode_index_entry(step: int, offset: int, id_count: int, new_ids: List[str]) -> bytes:
+    id_bytes = [vehicle_id.encode("utf-8") for vehicle_id in new_ids]
+    lengths = np.array([len(item) for item in id_bytes], dtype=np.uint32).tobytes()
+    return INDEX_ENTRY.pack(step, offset, id_count, len(new_ids)) + lengths + b"".join(id_bytes)
+
+
+def decode_index(data) -> Tuple[np.ndarray, np.ndarray, np.ndarray, List[str]]:
+    if len(data) < INDEX_HEADER.size:
+        raise Exception("Replay index is truncated")
+    magic, version = INDEX_HEADER.unpack_from(data, 0)
+    if magic != INDEX_MAGIC:
+        raise Exception("Not a replay index")
+    if version != VERSION:
+        raise Exception("Unsupported replay index version " + str(version))
+
+    steps, offsets, id_counts, ids = [], [], [], []
+    position = INDEX_HEADER.size
+    # A writer that did not close cleanly may leave a partial entry at the end, which is ignored
+    while position + INDEX_ENTRY.size <= len(data):
+        step, offset, id_count, new_id_count = INDEX_ENTRY.unpack_from(data, position)
+        if position + INDEX_ENTRY.size + 4 * new_id_count > len(data) or id_count != len(ids) + new_id_count:
+            break
+        lengths = np.frombuffer(data, dtype=np.uint32, count=new_id_count, offset=position + INDEX_ENTRY.size)
+        if position + INDEX_ENTRY.size + lengths.nbytes + int(lengths.sum()) > len(data):
+            break
+        position += INDEX_ENTRY.size + lengths.nbytes
+        for length in lengths.tolist():
+            ids.append(bytes(data[position:position + length]).decode("utf-8"))
+            position += length
+        steps.append(step)
+        offsets.append(offset)
+        id_counts.append(id_count)
+    return (np.array(steps, dtype=np.int64), np.array(offsets, dtype=np.uint64),
+            np.array(id_counts, dtype=np.int64), ids)
+
+
+def _grow(array: np.ndarray, size: int) -> np.ndarray:
+    if len(array) >= size:
+        return array
+    grown = np.zeros(max(size, 2 * len(array)), dtype=array.dtype)
+    grown[:len(array)] = array
+    return grown
+
+
+class FrameEncoder:
+    def __init__(self, compress: bool = False, keyframe_interval: int = 100, position_resolution: float = 0.01):
+        self.compress: bool = compress
+        self.keyframe_interval: int = max(keyframe_interval, 1)
+        self.position_resolution: float = position_resolution
+        self.frame_count: int = 0
+
+        # Positions as the decoder reconstructs them, so quantization error never accumulates
+        self.x: np.ndarray = np.zeros(0)
+        self.y: np.ndarray = np.zeros(0)
+        self.present: np.ndarray = np.zeros(0, dtype=np.bool_)
+        self.lights: np.ndarray | None = None
+
+    def next_is_keyframe(self) -> bool:
+        return self.frame_count % self.keyframe_interval == 0
+
+    def encode(self, frame: Frame) -> bytes:
+        vehicles = frame.vehicles
+        ids = np.ascontiguousarray(vehicles["id"], dtype=np.int32)
+        keyframe = self.next_is_keyframe()
+        self.frame_count += 1
+
+        size = int(ids.max()) + 1 if len(ids) > 0 else 0
+        self.x, self.y, self.present = _grow(self.x, size), _grow(self.y, size), _grow(self.present, size)
+
+        id_bytes = [vehicle_id.encode("utf-8") for vehicle_id in frame.new_ids]
+        parts = [np.array([len(item) for item in id_bytes], dtype=np.uint32).tobytes(), b"".join(id_bytes)]
+        flags = FLAG_KEYFRAME if keyframe else 0
+
+        if keyframe:
+            for name, dtype in VEHICLE_COLUMNS:
+                parts.append(np.ascontiguousarray(vehicles[name], dtype=dtype).tobytes())
+            x, y = vehicles["x"], vehicles["y"]
+        else:
+            dx = np.round((vehicles["x"] - self.x[ids]) / self.position_resolution)
+            dy = np.round((vehicles["y"] - self.y[ids]) / self.position_resolution)
+            fresh = ~self.present[ids] | (np.abs(dx) > DELTA_LIMIT) | (np.abs(dy) > DELTA_LIMIT)
+            moved = ~fresh
+
+            parts.append(ids.tobytes())
+            parts.append(np.round(np.asarray(vehicles["angle"]) / ANGLE_RESOLUTION).astype(np.int16).tobytes())
+            parts.append(np.ascontiguousarray(vehicles["lane_change"], dtype=np.int8).tobytes())
+            parts.append(fresh.astype(np.uint8).tobytes())
+            parts.append(dx[moved].astype(np.int16).tobytes())
+            parts.append(dy[moved].astype(np.int16).tobytes())
+            for name in ("x", "y", "len", "width"):
+                parts.append(np.ascontiguousarray(vehicles[name][fresh], dtype=np.float64).tobytes())
+
+            x = np.where(fresh, vehicles["x"], self.x[ids] + dx * self.position_resolution)
+            y = np.where(fresh, vehicles["y"], self.y[ids] + dy * self.position_resolution)
+
+        self.present[:] = False
+        self.present[ids] = True
+        self.x[ids] = x
+        self.y[ids] = y
+
+        # Keyframes repeat the light states so decoding can start at any of them
+        lights = frame.lights if frame.lights is not None or not keyframe else self.lights
+        if lights is not None:
+            self.lights = lights
+            flags |= FLAG_LIGHTS
+            parts.append(np.ascontiguousarray(lights, dtype=np.uint8).tobytes())
+
+        payload = b"".join(parts)
+        if self.compress:
+            payload = zlib.compress(payload)
+            flags |= FLAG_COMPRESSED
+
+        header = FRAME_HEADER.pack(len(payload), flags, frame.step, len(ids), len(frame.new_ids),
+                                   len(lights) if lights is not None else 0)
+        return header + payload
+
+
+class FrameDecoder:
+    def __init__(self, position_resolution: float = 0.01):
+        self.position_resolution: float = position_resolution
+        self.x: np.ndarray = np.zeros(0)
+        self.y: np.ndarray = np.zeros(0)
+        self.len: np.ndarray = np.zeros(0)
+        self.width: np.ndarray = np.zeros(0)
+        self.lights: np.ndarray | None = None
+
+    def decode(self, data, offset: int) -> Tuple[Frame, int]:
+        payload_size, flags, step, vehicle_count, new_id_count, light_count = FRAME_HEADER.unpack_from(data, offset)
+        start = offset + FRAME_HEADER.size
+        payload = bytes(data[start:start + payload_size])
+        if len(payload) < payload_size:
+            raise Exception("Replay frame at offset " + str(offset) + " is truncated")
+        if flags & FLAG_COMPRESSED:
+            payload = zlib.decompress(payload)
+
+        position = 0
+
+        def take(dtype, count: int) -> np.ndarray:
+            nonlocal position
+            array = np.frombuffer(payload, dtype=dtype, count=count, offset=position)
+            position += array.nbytes
+            return array
+
+        new_ids = []
+        for length in take(np.uint32, new_id_count).tolist():
+            new_ids.append(payload[position:position + length].decode("utf-8"))
+            position += length
+
+        if flags & FLAG_KEYFRAME:
+            vehicles = {name: take(dtype, vehicle_count) for name, dtype in VEHICLE_COLUMNS}
+        else:
+            ids = take(np.int32, vehicle_count)
+            angle = take(np.int16, vehicle_count) * ANGLE_RESOLUTION
+            lane_change = take(np.int8, vehicle_count)
+            fresh = take(np.uint8, vehicle_count).astype(np.bool_)
+            moved = ~fresh
+            moved_count = int(np.count_nonzero(moved))
+            dx, dy = take(np.int16, moved_count), take(np.int16, moved_count)
+
+            vehicles = {"x": np.empty(vehicle_count), "y": np.empty(vehicle_count), "angle": angle, "id": ids,
+                        "lane_change": lane_change, "len": np.empty(vehicle_count), "width": np.empty(vehicle_count)}
+            fresh_count = vehicle_count - moved_count
+            for name in ("x", "y", "len", "width"):
+                vehicles[name][fresh] = take(np.float64, fresh_count)
+            vehicles["x"][moved] = self.x[ids[moved]] + dx * self.position_resolution
+            vehicles["y"][moved] = self.y[ids[moved]] + dy * self.position_resolution
+            vehicles["len"][moved] = self.len[ids[moved]]
+            vehicles["width"][moved] = self.width[ids[moved]]
+
+        ids = vehicles["id"]
+        size = int(ids.max()) + 1 if len(ids) > 0 else 0
+        for name in ("x", "y", "len", "width"):
+            column = _grow(getattr(self, name), size)
+            column[ids] = vehicles[name]
+            setattr(self, name, column)
+
+        if flags & FLAG_LIGHTS:
+            self.lights = take(np.uint8, light_count)
+
+        return Frame(step, vehicles, new_ids, self.lights), start + payload_size
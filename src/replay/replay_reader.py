@@ -0,0 +1,82 @@
+import mmap
+import os
+from typing import Dict, Iterator, List, Tuple
+
+import numpy as np
+
+from src.replay.replay_format import (FRAME_HEADER, LIGHT_CHARS, Frame, FrameDecoder, decode_file_header,
+                                      decode_index, index_path)
+
+
+class ReplayReader:
+    def __init__(self, path: str):
+        self.path: str = path
+        with open(path, "rb") as file:
+            self.data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        header, self.frames_offset = decode_file_header(self.data)
+        self.roads: List[Tuple[str, int]] = [(road_id, lane_num) for road_id, lane_num in header["roads"]]
+        self.position_resolution: float = header["position_resolution"]
+        self.ids: List[str] = []
+
+        # Without an index, every seek decodes from the first frame
+        self.keyframe_steps: np.ndarray = np.zeros(0, dtype=np.int64)
+        self.keyframe_offsets: np.ndarray = np.zeros(0, dtype=np.uint64)
+        self.keyframe_id_counts: np.ndarray = np.zeros(0, dtype=np.int64)
+        self.index_ids: List[str] = []
+        if os.path.exists(index_path(path)):
+            with open(index_path(path), "rb") as file:
+                self.keyframe_steps, self.keyframe_offsets, self.keyframe_id_counts, self.index_ids = \
+                    decode_index(file.read())
+
+    def __iter__(self) -> Iterator[Frame]:
+        return self.frames()
+
+    def frames(self, start_step: int | None = None) -> Iterator[Frame]:
+        offset, id_count = self.frames_offset, 0
+        if start_step is not None:
+            position = int(np.searchsorted(self.keyframe_steps, start_step, side="right")) - 1
+            if position >= 0:
+                offset = int(self.keyframe_offsets[position])
+                id_count = int(self.keyframe_id_counts[position])
+
+        self.ids = self.index_ids[:id_count]
+        decoder = FrameDecoder(self.position_resolution)
+        while offset + FRAME_HEADER.size <= len(self.data):
+            frame, offset = decoder.decode(self.data, offset)
+            self.ids.extend(frame.new_ids)
+            if start_step is None or frame.step >= start_step:
+                yield frame
+
+    def seek(self, step: int) -> Frame | None:
+        # Returns the first frame at or after step
+        return next(self.frames(step), None)
+
+    def close(self) -> None:
+        if not self.data.closed:
+            self.data.close()
+
+    def to_text(self, frame: Frame) -> str:
+        vehicles: Dict = {name: column.tolist() for name, column in frame.vehicles.items()}
+        result = [f"{x} {y} {angle} {self.ids[index]} {lane_change} {length} {width},"
+                  for x, y, angle, index, lane_change, length, width in
+                  zip(vehicles["x"], vehicles["y"], vehicles["angle"], vehicles["id"], vehicles["lane_change"],
+                      vehicles["len"], vehicles["width"])]
+        result.append(";")
+
+        lights = frame.lights.tolist()
+        position = 0
+        for road_id, lane_num in self.roads:
+            result.append(road_id)
+            for light in lights[position:position + lane_num]:
+                result.append(" " + LIGHT_CHARS[light])
+            position += lane_num
+            result.append(",")
+        return "".join(result)
+
+
+def convert_to_text(replay_file: str, text_file: str) -> None:
+    reader = ReplayReader(replay_file)
+    with open(text_file, "w") as out:
+        for frame in reader:
+            out.write(reader.to_text(frame) + "\n")
+    reader.close()
@@ -0,0 +1,62 @@
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from src.replay.replay_format import (INDEX_HEADER, INDEX_MAGIC, VERSION, Frame, FrameEncoder, encode_file_header,
+                                      encode_index_entry, index_path)
+
+
+class ReplayWriter:
+    def __init__(self, path: str, roads: List[Tuple[str, int]], compress: bool = False,
+                 keyframe_interval: int = 100, position_resolution: float = 0.01, buffer_size: int = 1 << 20):
+        self.path: str = path
+        self.roads: List[Tuple[str, int]] = roads
+        self.encoder: FrameEncoder = FrameEncoder(compress, keyframe_interval, position_resolution)
+        self.id_table: Dict[str, int] = {}
+        self.ids: List[str] = []
+        self.indexed_id_count: int = 0
+        self.file = open(path, "wb", buffering=buffer_size)
+        self.file.write(encode_file_header(roads, position_resolution))
+        self.index_file = open(index_path(path), "wb")
+        self.index_file.write(INDEX_HEADER.pack(INDEX_MAGIC, VERSION))
+
+    def get_id_indices(self, vehicle_ids: List[str]) -> Tuple[np.ndarray, List[str]]:
+        # Ids are written once, in the frame where they first appear, and referred to by index afterwards
+        new_ids = []
+        indices = np.empty(len(vehicle_ids), dtype=np.int32)
+        for i, vehicle_id in enumerate(vehicle_ids):
+            index = self.id_table.get(vehicle_id)
+            if index is None:
+                index = len(self.id_table)
+                self.id_table[vehicle_id] = index
+                self.ids.append(vehicle_id)
+                new_ids.append(vehicle_id)
+            indices[i] = index
+        return indices, new_ids
+
+    def write_frame(self, step: int, vehicle_ids: List[str], vehicles: Dict[str, np.ndarray],
+                    lights: np.ndarray | None) -> None:
+        # lights is None when no traffic light changed phase since the previous frame
+        id_count = len(self.id_table)
+        indices, new_ids = self.get_id_indices(vehicle_ids)
+        vehicles = dict(vehicles, id=indices)
+        if self.encoder.next_is_keyframe():
+            self.write_index_entry(step, id_count)
+        self.file.write(self.encoder.encode(Frame(step, vehicles, new_ids, lights)))
+
+    def write_index_entry(self, step: int, id_count: int) -> None:
+        # Each entry carries the ids first seen since the previous one, so a reader seeking to a keyframe
+        # can name every vehicle without decoding the frames before it
+        new_ids = self.ids[self.indexed_id_count:id_count]
+        self.index_file.write(encode_index_entry(step, self.file.tell(), id_count, new_ids))
+        self.indexed_id_count = id_count
+
+    def flush(self) -> None:
+        self.file.flush()
+        self.index_file.flush()
+
+    def close(self) -> None:
+        if not self.file.closed:
+            self.file.close()
+        if not self.index_file.closed:
+            self.index_file.close()
@@ -1,7 +1,10 @@
-from typing import List
+from __future__ import annotations
 
-from src.roadnet.lane_link import LaneLink
-from src.vehicle.vehicle import Vehicle
+from typing import TYPE_CHECKING, List
+
+if TYPE_CHECKING:
+    from src.roadnet.lane_link import LaneLink
+    from src.vehicle.vehicle import Vehicle
 
 
 class Cross:
@@ -49,9 +52,9 @@ class Cross:
             yield_status = 1
 
         if yield_status == 0:
-            if t1 > t2:
+            if t1.value > t2.value:
                 yield_status = -1
-            elif t1 < t2:
+            elif t1.value < t2.value:
                 if d2 > 0:
                     foe_vehicle_reach_steps = foe_vehicle.get_reach_steps_on_lane_link(d2, self.lane_links[1 - i])
                     reach_steps = vehicle.get_reach_steps_on_lane_link(d1, self.lane_links[i])
@@ -1,13 +1,20 @@
+from __future__ import annotations
+
 from abc import ABC, abstractmethod
 from collections import deque
 from enum import Enum
-from typing import List, Deque
+from typing import TYPE_CHECKING, Deque, List, Tuple
+
+import numpy as np
 
-from src.roadnet.history_record import HistoryRecord
-from src.roadnet.lane import Lane
-from src.roadnet.road import Road
+from src.utility.polyline import Polyline
 from src.utility.utility import Point
-from src.vehicle.vehicle import Vehicle
+
+if TYPE_CHECKING:
+    from src.roadnet.history_record import HistoryRecord
+    from src.roadnet.lane import Lane
+    from src.roadnet.road import Road
+    from src.vehicle.vehicle import Vehicle
 
 
 class DrivableType(Enum):
@@ -22,8 +29,11 @@ class Drivable(ABC):
         self.max_speed = max_speed
         self.vehicles: List[Vehicle] = []
         self.points = []
+        self.polyline: Polyline | None = None
         self.drivable_type = DrivableType(drivable_type)
         self.belong_road: Road = None
+        self.index: int = -1
+        self.dirty: bool = True
 
         self.waiting_buffer: Deque[Vehicle] = deque()
         self.history: List[HistoryRecord] = []
@@ -62,26 +72,37 @@ class Drivable(ABC):
 
     def push_vehicle(self, vehicle):
         self.vehicles.append(vehicle)
+        self.dirty = True
 
     def pop_vehicle(self):
         if self.vehicles:
             self.vehicles.pop(0)
+            self.dirty = True
 
     @abstractmethod
     def get_id(self):
         raise NotImplementedError("Subclass must implement abstract method")
 
+    def init_polyline(self) -> None:
+        self.polyline = Polyline(self.points)
+        self.length = self.polyline.length
+
+    def get_polyline(self) -> Polyline:
+        if self.polyline is None or len(self.polyline) != len(self.points):
+            self.init_polyline()
+        return self.polyline
+
     def get_point_by_distance(self, distance: float) -> Point:
-        return Point.get_point_by_distance(self.points, distance)
+        return self.get_polyline().point_at(distance)
 
     def get_direction_by_distance(self, dis: float) -> Point:
-        remain = dis
-        for i in range(1, len(self.points)):
-            double_len = (self.points[i + 1] - self.points[i]).len()
-            if remain < double_len:
-                return (self.points[i + 1] - self.points[i]).unit()
-            else:
-                remain -= double_len
+        return self.get_polyline().direction_at(dis)
+
+    def get_points_by_distance(self, distances: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        return self.get_polyline().points_at(distances)
+
+    def get_directions_by_distance(self, distances: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        return self.get_polyline().directions_at(distances)
 
     def get_start_lane(self) -> Lane:
         pass
@@ -1,12 +1,17 @@
+from __future__ import annotations
+
 import math
-from typing import List
+from typing import TYPE_CHECKING, List, Tuple
 
 from src.roadnet.cross import Cross
-from src.roadnet.lane_link import LaneLink
-from src.roadnet.road import Road
-from src.roadnet.road_link import RoadLink
-from src.roadnet.traffic_light import TrafficLight
-from src.utility.utility import Point, cross_multiply, on_segment, calc_ang, calc_intersect_point
+from src.utility.geometry import points_to_array, polyline_crossings
+from src.utility.utility import Point, cross_multiply, calc_ang
+
+if TYPE_CHECKING:
+    from src.roadnet.lane_link import LaneLink
+    from src.roadnet.road import Road
+    from src.roadnet.road_link import RoadLink
+    from src.roadnet.traffic_light import TrafficLight
 
 
 class Intersection:
@@ -61,7 +66,7 @@ class Intersection:
     def get_outline(self) -> List[Point]:
         points = [self.point]
         for road in self.get_roads():
-            road_direct = road.get_end_intersection().get_position() - road.get_start_intersection().point
+            road_direct = road.get_end_intersection().point - road.get_start_intersection().point
             road_direct = road_direct.unit()
             p_direct = road_direct.normal()
             if road.get_start_intersection() == self:
@@ -115,51 +120,28 @@ class Intersection:
 
     def init_crosses(self):
         all_lane_links = [lane_link for road_link in self.road_links for lane_link in road_link.lane_links]
-        n = len(all_lane_links)
-
-        for i in range(n):
-            for j in range(i + 1, n):
-                la = all_lane_links[i]
-                lb = all_lane_links[j]
-                va = la.points
-                vb = lb.points
-                disa = 0.0
-
-                for ia in range(len(va) - 1):
-                    disb = 0.0
-                    for ib in range(len(vb) - 1):
-                        a1, a2 = va[ia], va[ia + 1]
-                        b1, b2 = vb[ib], vb[ib + 1]
-
-                        if Point.sign(cross_multiply(a2 - a1, b2 - b1)) == 0:
-                            continue
-
-                        p = calc_intersect_point(a1, a2, b1, b2)
-
-                        if on_segment(a1, a2, p) and on_segment(b1, b2, p):
-                            cross = Cross()
-                            cross.lane_links[0] = la
-                            cross.lane_links[1] = lb
-                            cross.notify_vehicles = [None, None]
-                            cross.distance_on_lane = [
-                                disa + (p - a1).length(),
-                                disb + (p - b1).length()
-                            ]
-                            cross.ang = calc_ang(a2 - a1, b2 - b1)
-
-                            w1, w2 = la.get_width(), lb.get_width()
-                            c1, c2 = w1 / math.sin(cross.ang), w2 / math.sin(cross.ang)
-                            diag = (c1 ** 2 + c2 ** 2 + 2 * c1 * c2 * math.cos(cross.ang)) / 4
-                            cross.safe_distances = [
-                                math.sqrt(diag - w2 ** 2 / 4),
-                                math.sqrt(diag - w1 ** 2 / 4)
-                            ]
-                            self.crosses.append(cross)
-                            break
-
-                        disb += (vb[ib + 1] - vb[ib]).length()
-
-                    disa += (va[ia + 1] - va[ia]).length()
+        self.build_crosses(polyline_crossings([points_to_array(lane_link.points) for lane_link in all_lane_links]))
+
+    def build_crosses(self, crossings: List[Tuple[int, int, int, int, float, float]]) -> None:
+        all_lane_links = [lane_link for road_link in self.road_links for lane_link in road_link.lane_links]
+        for i, j, ia, ib, distance_a, distance_b in crossings:
+            la = all_lane_links[i]
+            lb = all_lane_links[j]
+            cross = Cross()
+            cross.lane_links[0] = la
+            cross.lane_links[1] = lb
+            cross.notify_vehicles = [None, None]
+            cross.distance_on_lane = [distance_a, distance_b]
+            cross.ang = calc_ang(la.points[ia + 1] - la.points[ia], lb.points[ib + 1] - lb.points[ib])
+
+            w1, w2 = la.get_width(), lb.get_width()
+            c1, c2 = w1 / math.sin(cross.ang), w2 / math.sin(cross.ang)
+            diag = (c1 ** 2 + c2 ** 2 + 2 * c1 * c2 * math.cos(cross.ang)) / 4
+            cross.safe_distances = [
+                math.sqrt(diag - w2 ** 2 / 4),
+                math.sqrt(diag - w1 ** 2 / 4)
+            ]
+            self.crosses.append(cross)
 
         for cross in self.crosses:
             cross.lane_links[0].get_crosses().append(cross)
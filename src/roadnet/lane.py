@@ -1,30 +1,28 @@
+from __future__ import annotations
+
 from collections import deque
-from typing import List, Deque
+from typing import TYPE_CHECKING, Deque, List
 
 from src.roadnet.drivable import Drivable, DrivableType
 from src.roadnet.history_record import HistoryRecord
-from src.roadnet.lane_link import LaneLink
-from src.roadnet.road import Road
 from src.roadnet.segment import Segment
-from src.vehicle.vehicle import Vehicle
+
+if TYPE_CHECKING:
+    from src.roadnet.lane_link import LaneLink
+    from src.roadnet.road import Road
+    from src.vehicle.vehicle import Vehicle
 
 
 class Lane(Drivable):
     history_len = 240
 
     def __init__(self, width: float = 0, max_speed: float = 0, lane_index: int = -1, belong_road: Road = None):
-        self.width: float = width
-        self.max_speed: float = max_speed
+        super().__init__(0, width, max_speed, DrivableType.LANE)
         self.lane_index = lane_index
         self.segments: List[Segment] = []
         self.lane_links: List[LaneLink] = []
         self.belong_road: Road = belong_road
-        self.waiting_buffer: Deque[Vehicle] = deque()
-        self.history: List[HistoryRecord] = []
-        self.drivable_type = DrivableType.LANE
-
-        self.historyVehicleNum = 0
-        self.historyAverageSpeed = 0
+        self.history_version: int = 0
 
     def get_id(self):
         return self.belong_road.get_id() + '_' + str(self.lane_index)
@@ -59,18 +57,23 @@ class Lane(Drivable):
     def get_end_intersection(self):
         return self.belong_road.end_intersection
 
+    def get_lane_links(self) -> List[LaneLink]:
+        return self.lane_links
+
     def get_lane_links_to_road(self, road: Road) -> List[LaneLink]:
-        return [lane_link for lane_link in self.lane_links if lane_link.get_end_lane() == road]
+        return [lane_link for lane_link in self.lane_links if lane_link.get_end_lane().belong_road == road]
 
     def reset(self):
         self.waiting_buffer.clear()
         self.vehicles.clear()
+        self.dirty = True
 
     def get_waiting_buffer(self) -> Deque[Vehicle]:
         return self.waiting_buffer
 
     def push_waiting_vehicle(self, vehicle):
         self.waiting_buffer.append(vehicle)
+        self.dirty = True
 
     def build_segmentation(self, number_of_segments) -> None:
         self.segments = [
@@ -81,8 +84,9 @@ class Lane(Drivable):
         ]
 
     def initSegments(self):
+        # Vehicles run front to back, so segments are filled from the end of the lane
         iter_index = 0
-        for i in range(len(self.segments) - 1):
+        for i in reversed(range(len(self.segments))):
             seg = self.segments[i]
             seg.vehicles.clear()
 
@@ -134,9 +138,10 @@ class Lane(Drivable):
             self.historyAverageSpeed = speed_sum / self.historyVehicleNum
         else:
             self.historyAverageSpeed = 0
+        self.history_version += 1
 
     def get_vehicle_before_distance(self, dis: float, segment_index: int) -> Vehicle | None:
-        for i in reversed(range(segment_index)):
+        for i in reversed(range(segment_index + 1)):
             for vehicle in self.get_segment(i).get_vehicles():
                 if vehicle.get_distance() < dis:
                     return vehicle
@@ -145,7 +150,7 @@ class Lane(Drivable):
 
     def get_vehicle_after_distance(self, dis, segment_index: int) -> Vehicle | None:
         for i in range(segment_index, self.get_segment_num()):
-            for vehicle in self.get_segment(i).get_vehicles():
+            for vehicle in reversed(self.get_segment(i).get_vehicles()):
                 if vehicle.get_distance() >= dis:
                     return vehicle
 
@@ -1,47 +1,49 @@
-from typing import List
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, List
 
-from src.roadnet.cross import Cross
 from src.roadnet.drivable import Drivable, DrivableType
-from src.roadnet.lane import Lane
-from src.roadnet.road_link import RoadLink
+
+if TYPE_CHECKING:
+    from src.roadnet.cross import Cross
+    from src.roadnet.lane import Lane
+    from src.roadnet.road_link import RoadLink
 
 
 class LaneLink(Drivable):
     def __init__(self):
-        self.roadLink: RoadLink = None
-        self.startLane: Lane = None
-        self.endLane: Lane = None
+        super().__init__(0, 4, 10000, DrivableType.LANELINK)  # TODO
+        self.road_link: RoadLink = None
+        self.start_lane: Lane = None
+        self.end_lane: Lane = None
         self.crosses: List[Cross] = []
 
-        self.width = 4
-        self.maxSpeed = 10000  # TODO
-        self.drivableType = DrivableType.LANELINK  # Define DrivableType as an enumeration
-
     def get_road_link(self):
-        return self.roadLink
+        return self.road_link
 
     def get_road_link_type(self):
-        return self.roadLink.type
+        return self.road_link.type
 
     def get_crosses(self):
         return self.crosses
 
     def get_start_lane(self) -> Lane:
-        return self.startLane
+        return self.start_lane
 
     def get_end_lane(self):
-        return self.endLane
+        return self.end_lane
 
     def is_available(self):
-        return self.roadLink.isAvailable()
+        return self.road_link.is_available()
 
     def is_turn(self):
-        return self.roadLink.isTurn()
+        return self.road_link.is_turn()
 
     def reset(self):
         self.vehicles.clear()
+        self.dirty = True
 
     def get_id(self):
-        start_lane_id = self.startLane.getId() if self.startLane else ""
-        end_lane_id = self.endLane.getId() if self.endLane else ""
+        start_lane_id = self.start_lane.get_id() if self.start_lane else ""
+        end_lane_id = self.end_lane.get_id() if self.end_lane else ""
         return start_lane_id + "_TO_" + end_lane_id
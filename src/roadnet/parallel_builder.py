@@ -0,0 +1,31 @@
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Tuple
+
+import numpy as np
+
+from src.utility.geometry import bezier_points, polyline_crossings
+
+# One entry per lane link of an intersection, in road link order: (True, 4x2 Bezier control points) for links whose
+# curve is generated, (False, points) for links given explicitly in the roadnet file
+LaneLinkGeometry = Tuple[bool, np.ndarray]
+IntersectionGeometry = Tuple[List[np.ndarray], List[Tuple[int, int, int, int, float, float]]]
+
+CURVE_POINT_NUM = 10
+
+
+def build_intersection(lane_links: List[LaneLinkGeometry]) -> IntersectionGeometry:
+    polylines = [bezier_points(*geometry, CURVE_POINT_NUM) if is_curve else geometry
+                 for is_curve, geometry in lane_links]
+    return polylines, polyline_crossings(polylines)
+
+
+def build_intersections(intersections: List[List[LaneLinkGeometry]],
+                        worker_num: int = 1) -> List[IntersectionGeometry]:
+    # Intersections are independent, so their lane-link curves and crossings are computed in parallel and
+    # returned in input order; the caller merges them into the roadnet objects
+    if worker_num <= 1 or len(intersections) < 2:
+        return [build_intersection(lane_links) for lane_links in intersections]
+
+    chunk_size = max(1, len(intersections) // (worker_num * 4))
+    with ProcessPoolExecutor(max_workers=worker_num) as executor:
+        return list(executor.map(build_intersection, intersections, chunksize=chunk_size))
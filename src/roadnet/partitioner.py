@@ -0,0 +1,133 @@
+import heapq
+from collections import deque
+from typing import Dict, List
+
+import numpy as np
+
+
+class RoadNetPartitioner:
+    def __init__(self, road_net, part_num: int):
+        self.road_net = road_net
+        self.part_num: int = max(part_num, 1)
+        self.intersections: List = road_net.get_intersections()
+        self.intersection_index: Dict = {intersection: i for i, intersection in enumerate(self.intersections)}
+        self.adjacency: List[List[int]] = [[] for _ in self.intersections]
+        self.incoming_roads: List[List] = [[] for _ in self.intersections]
+        self.static_weight: np.ndarray = np.zeros(len(self.intersections), dtype=np.float64)
+        self.intersection_partition: np.ndarray = np.zeros(len(self.intersections), dtype=np.int64)
+        self.build_graph()
+
+    def build_graph(self) -> None:
+        for road in self.road_net.get_roads():
+            start = self.intersection_index[road.get_start_intersection()]
+            end = self.intersection_index[road.get_end_intersection()]
+            self.incoming_roads[end].append(road)
+            if start != end:
+                if end not in self.adjacency[start]:
+                    self.adjacency[start].append(end)
+                if start not in self.adjacency[end]:
+                    self.adjacency[end].append(start)
+
+        for i, intersection in enumerate(self.intersections):
+            lane_num = sum(len(road.get_lanes()) for road in self.incoming_roads[i])
+            self.static_weight[i] = 1 + lane_num + len(intersection.get_lane_links())
+
+    def choose_seeds(self, region_num: int) -> List[int]:
+        seeds = [0]
+        distance = self.hop_distance(seeds)
+        while len(seeds) < region_num:
+            seed = int(np.argmax(distance))
+            seeds.append(seed)
+            distance = np.minimum(distance, self.hop_distance([seed]))
+        return seeds
+
+    def hop_distance(self, sources: List[int]) -> np.ndarray:
+        distance = np.full(len(self.intersections), np.inf)
+        queue = deque(sources)
+        for source in sources:
+            distance[source] = 0
+        while queue:
+            node = queue.popleft()
+            for neighbor in self.adjacency[node]:
+                if distance[neighbor] == np.inf:
+                    distance[neighbor] = distance[node] + 1
+                    queue.append(neighbor)
+        return distance
+
+    def partition(self, load: np.ndarray = None) -> np.ndarray:
+        node_num = len(self.intersections)
+        if node_num == 0:
+            return self.intersection_partition
+
+        weight = self.static_weight if load is None else self.static_weight + load
+        region_num = min(self.part_num, node_num)
+        owner = np.full(node_num, -1, dtype=np.int64)
+        region_weight = [0.0] * region_num
+        frontiers = []
+
+        for region, seed in enumerate(self.choose_seeds(region_num)):
+            owner[seed] = region
+            region_weight[region] = weight[seed]
+            frontiers.append(deque([seed]))
+
+        # Grow the lightest region by one intersection at a time so regions stay connected and balanced
+        heap = [(region_weight[region], region) for region in range(region_num)]
+        heapq.heapify(heap)
+        while heap:
+            _, region = heapq.heappop(heap)
+            frontier = frontiers[region]
+            while frontier:
+                claimed = next((neighbor for neighbor in self.adjacency[frontier[0]] if owner[neighbor] < 0), None)
+                if claimed is None:
+                    frontier.popleft()
+                    continue
+
+                owner[claimed] = region
+                region_weight[region] += weight[claimed]
+                frontier.append(claimed)
+                heapq.heappush(heap, (region_weight[region], region))
+                break
+
+        # Components without a seed go to the currently lightest region
+        for node in range(node_num):
+            if owner[node] >= 0:
+                continue
+            region = int(np.argmin(region_weight))
+            component = np.flatnonzero(self.hop_distance([node]) < np.inf)
+            owner[component] = region
+            region_weight[region] += float(weight[component].sum())
+
+        self.intersection_partition = owner
+        return owner
+
+    def get_intersection_partition(self, intersection) -> int:
+        return int(self.intersection_partition[self.intersection_index[intersection]])
+
+    def get_road_partition(self, road) -> int:
+        # Roads live with the intersection they flow into, next to the lane links leaving their lanes
+        return self.get_intersection_partition(road.get_end_intersection())
+
+    def get_drivable_partition(self, drivable) -> int:
+        if drivable.is_lane():
+            return self.get_road_partition(drivable.belong_road)
+        return self.get_road_partition(drivable.get_start_lane().belong_road)
+
+    def drivable_partition_array(self) -> np.ndarray:
+        drivables = self.road_net.get_drivables()
+        result = np.zeros(len(drivables), dtype=np.int64)
+        for drivable in drivables:
+            result[drivable.index] = self.get_drivable_partition(drivable)
+        return result
+
+    def intersection_load(self) -> np.ndarray:
+        load = np.zeros(len(self.intersections), dtype=np.float64)
+        for i, intersection in enumerate(self.intersections):
+            load[i] = sum(lane.get_vehicle_count() for road in self.incoming_roads[i] for lane in road.get_lanes())
+            load[i] += sum(lane_link.get_vehicle_count() for lane_link in intersection.get_lane_links())
+        return load
+
+    def imbalance(self, load: np.ndarray) -> float:
+        weight = self.static_weight + load
+        partition_weight = np.bincount(self.intersection_partition, weights=weight, minlength=self.part_num)
+        mean = partition_weight.mean()
+        return float(partition_weight.max() / mean) if mean > 0 else 1.0
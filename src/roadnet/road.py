@@ -1,16 +1,24 @@
+from __future__ import annotations
+
 import math
-from typing import List
+from typing import TYPE_CHECKING, List
+
+import numpy as np
 
-from src.roadnet.lane import Lane
-from src.roadnet.traffic_light import Intersection
+from src.utility.geometry import array_to_points, normals, points_to_array, segment_vectors, units
 from src.utility.utility import Point
-from src.vehicle.vehicle import Vehicle
+
+if TYPE_CHECKING:
+    from src.roadnet.lane import Lane
+    from src.roadnet.traffic_light import Intersection
+    from src.vehicle.vehicle import Vehicle
 
 
 class Road:
     def __init__(self, id: str, start_intersection: Intersection = None, end_intersection: Intersection = None,
                  lanes: List[Lane] = None, points: List[Point] = None):
         self.id: str = id
+        self.index: int = -1
         self.start_intersection: Intersection = start_intersection
         self.end_intersection: Intersection = end_intersection
         self.lanes: List[Lane] = lanes if lanes is not None else []
@@ -85,47 +93,28 @@ class Road:
         self.plan_route_buffer.clear()
 
     def init_lanes_points(self) -> None:
-        dsum = 0.0
-        roadPoints = self.points
+        assert(len(self.points) >= 2)
+        road_points = points_to_array(self.points)
+
+        if self.start_intersection is not None and self.start_intersection.is_virtual_intersection() is False:
+            road_points[0] += units(road_points[1] - road_points[0]) * self.start_intersection.width
 
-        assert(len(roadPoints) >= 2)
+        if self.end_intersection is not None and self.end_intersection.is_virtual_intersection() is False:
+            road_points[-1] -= units(road_points[-1] - road_points[-2]) * self.end_intersection.width
 
-        if self.start_intersection.is_virtual_intersection() is False:
-            width = self.start_intersection.width
-            p1 = roadPoints[0]
-            p2 = roadPoints[1]
-            roadPoints[0] = p1 + (p2 - p1).unit() * width
+        self.points = array_to_points(road_points)
 
-        if self.end_intersection.is_virtual_intersection() is False:
-            width = self.end_intersection.width
-            p1 = roadPoints[len(roadPoints) - 2]
-            p2 = roadPoints[len(roadPoints) - 1]
-            roadPoints[len(roadPoints) - 1] = p2 - (p2 - p1).unit() * width
+        # Inner points are shifted along the bisector of their two segments
+        segment_units = units(segment_vectors(road_points))
+        directions = np.empty_like(road_points)
+        directions[0] = segment_units[0]
+        directions[-1] = segment_units[-1]
+        directions[1:-1] = units(segment_units[1:] + segment_units[:-1])
+        offsets = -normals(directions)
 
+        dsum = 0.0
         for lane in self.lanes:
-            dmin = dsum
-            dmax = dsum + lane.width
-            self.points.clear()
-
-            for j in range(len(roadPoints)):
-                lanePoints = lane.points
-                if j == 0:
-                    u = (roadPoints[1] - roadPoints[0]).unit()
-                    v = -u.normal()
-                    startPoint = roadPoints[j] + v * ((dmin + dmax) / 2.0)
-                    lanePoints.push_back(startPoint)
-                elif j + 1 == len(roadPoints):
-                    u = (roadPoints[j] - roadPoints[j - 1]).unit()
-                    v = -u.normal()
-                    endPoint = roadPoints[j] + v * ((dmin + dmax) / 2.0)
-                    lanePoints.push_back(endPoint)
-                else:
-                    u1 = (roadPoints[j + 1] - roadPoints[j]).unit()
-                    u2 = (roadPoints[j] - roadPoints[j - 1]).unit()
-                    u = (u1 + u2).unit()
-                    v = -u.normal()
-                    interPoint = roadPoints[j] + v * ((dmin + dmax) / 2.0)
-                    lanePoints.push_back(interPoint)
-            lane.length = Point.get_length_of_points(lane.points)
+            lane.points = array_to_points(road_points + offsets * (dsum + lane.width / 2.0))
+            lane.init_polyline()
             dsum += lane.width
 
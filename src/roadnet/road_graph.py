@@ -0,0 +1,99 @@
+import heapq
+from typing import Dict, List
+
+import numpy as np
+
+
+class RoadGraph:
+    # Average durations are rounded to this many seconds, so duration routes stay valid while lane history drifts
+    duration_resolution = 0.1
+
+    def __init__(self, roads: List):
+        self.roads: List = roads
+        for index, road in enumerate(roads):
+            road.index = index
+
+        # CSR adjacency: the successors of road i are targets[offsets[i]:offsets[i + 1]]
+        successors = [[adj_road.index for adj_road in road.get_end_intersection().get_roads()
+                       if road.connected_to_road(adj_road)] for road in roads]
+        self.offsets: np.ndarray = np.zeros(len(roads) + 1, dtype=np.int64)
+        self.offsets[1:] = np.cumsum([len(targets) for targets in successors])
+        self.targets: np.ndarray = np.array([target for targets in successors for target in targets], dtype=np.int64)
+
+        # Entering a road costs that road's length, so edge weights only depend on the target
+        self.lengths: np.ndarray = np.array([road.average_length() for road in roads], dtype=np.float64)
+        self.edge_lengths: np.ndarray = self.lengths[self.targets]
+        # The duration fallback keeps the original router's cost, which summed the lengths of all lanes
+        self.total_lengths: np.ndarray = np.array([road.get_length() for road in roads], dtype=np.float64)
+
+        # Plain lists are much faster than numpy for the scalar accesses of a heap search
+        self.successor_lists: List[List[int]] = successors
+        self.length_list: List[float] = self.lengths.tolist()
+        self.durations: np.ndarray | None = None
+        self.duration_weights: Dict[float, List[float]] = {}
+
+    def __len__(self) -> int:
+        return len(self.roads)
+
+    def get_successors(self, index: int) -> np.ndarray:
+        return self.targets[self.offsets[index]:self.offsets[index + 1]]
+
+    def compute_durations(self) -> np.ndarray:
+        durations = np.array([road.get_average_duration() for road in self.roads], dtype=np.float64)
+        return np.round(durations / self.duration_resolution) * self.duration_resolution
+
+    def update_durations(self) -> bool:
+        # Returns whether a rounded duration changed, which is the only time cached duration routes go stale
+        if self.durations is None:
+            return False
+        durations = self.compute_durations()
+        if np.array_equal(durations, self.durations):
+            return False
+        self.durations = durations
+        self.duration_weights.clear()
+        return True
+
+    def invalidate_durations(self) -> None:
+        self.durations = None
+        self.duration_weights.clear()
+
+    def get_duration_weights(self, max_speed: float) -> List[float]:
+        # Average durations come from lane history, so they and the weights of every max_speed are kept until
+        # a rounded duration changes; roads without history fall back to driving their total lane length at max_speed
+        weights = self.duration_weights.get(max_speed)
+        if weights is None:
+            if self.durations is None:
+                self.durations = self.compute_durations()
+            weights = np.where(self.durations < 0, self.total_lengths / max_speed, self.durations).tolist()
+            self.duration_weights[max_speed] = weights
+        return weights
+
+    def shortest_path(self, start: int, end: int, weights: List[float]) -> List[int] | None:
+        dis = {start: 0.0}
+        from_road = {}
+        visited = set()
+        successors = self.successor_lists
+
+        queue = [(0.0, start)]
+        while queue:
+            cur_dis, cur = heapq.heappop(queue)
+            if cur == end:
+                break
+            if cur in visited:
+                continue
+            visited.add(cur)
+
+            for adj in successors[cur]:
+                new_dis = cur_dis + weights[adj]
+                if adj not in dis or new_dis < dis[adj]:
+                    from_road[adj] = cur
+                    dis[adj] = new_dis
+                    heapq.heappush(queue, (new_dis, adj))
+        else:
+            return None
+
+        path = [end]
+        while path[-1] != start:
+            path.append(from_road[path[-1]])
+        path.reverse()
+        return path
@@ -1,9 +1,12 @@
+from __future__ import annotations
+
 from enum import Enum, auto
-from typing import List
+from typing import TYPE_CHECKING, List
 
-from src.roadnet.intersection import Intersection
-from src.roadnet.lane_link import LaneLink
-from src.roadnet.road import Road
+if TYPE_CHECKING:
+    from src.roadnet.intersection import Intersection
+    from src.roadnet.lane_link import LaneLink
+    from src.roadnet.road import Road
 
 
 class RoadLinkType(Enum):
@@ -1,17 +1,27 @@
-import json
-from typing import Dict, List
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Dict, List, Tuple
+
+import numpy as np
 
-from src.roadnet.drivable import Drivable
 from src.roadnet.intersection import Intersection
 from src.roadnet.lane import Lane
 from src.roadnet.lane_link import LaneLink
 from src.roadnet.road import Road
+from src.roadnet.road_graph import RoadGraph
+from src.roadnet.routing_engine import create_routing_engine
 from src.roadnet.road_link import RoadLinkType, RoadLink
-from src.roadnet.traffic_light import LightPhase
+from src.roadnet.traffic_light import LightPhase, TrafficLight
 from src.utility.config import CityFlow
+from src.roadnet.parallel_builder import build_intersections
+from src.utility.geometry import array_to_points, points_to_array
+from src.utility.json_stream import iter_json_array
 from src.utility.utility import Point
 from src.vehicle.vehicle_info import VehicleInfo
 
+if TYPE_CHECKING:
+    from src.roadnet.drivable import Drivable
+
 
 class RoadNet:
     def __init__(self):
@@ -23,194 +33,57 @@ class RoadNet:
         self._lanes: List[Lane] = []
         self._lane_links: List[LaneLink] = []
         self._drivables: List[Drivable] = []
+        self._road_graph: RoadGraph | None = None
+        self._routing_engines: Dict = {}
 
     def get_point(self, p1: Point, p2: Point, a: float):
         return Point((p2.x - p1.x) * a + p1.x, (p2.y - p1.y) * a + p1.y)
 
-    def load_from_json(self, json_file_name) -> bool:
-        with open(json_file_name, 'r') as file:
-            document = json.load(file)
-
-        # Check if the document is an object
-        if not isinstance(document, dict):
-            raise TypeError("roadnet config file should be an object")
-
-        inter_values = document["intersections"]
-        road_values = document["roads"]
-
+    def load_from_json(self, json_file_name, worker_num: int = 1) -> bool:
+        # Roads and intersections are streamed one item at a time and only the built objects are kept, so peak
+        # memory follows the size of the network rather than of its JSON
         self._roads.clear()
-        for index, road in enumerate(road_values):
-            self._road_map[road["id"]] = road
-            self._roads[index] = Road(road["id"])
-
-        for index, intersection in enumerate(inter_values):
-            self._inter_map[intersection["id"]] = intersection
-            self._intersections[index] = Intersection(intersection["id"])
+        self._intersections.clear()
+        road_ends: Dict[str, Tuple[str, str]] = {}
+        curve_controls: Dict[LaneLink, np.ndarray] = {}
 
-        for i, cur_road_value in enumerate(road_values):
+        for i, cur_road_value in enumerate(iter_json_array(json_file_name, "roads")):
             if not isinstance(cur_road_value, dict):
                 raise TypeError(f"road[{i}] should be an object")
+            road_ends[cur_road_value["id"]] = (cur_road_value.get("startIntersection"),
+                                               cur_road_value.get("endIntersection"))
+            self.load_road(cur_road_value)
 
-            start_intersection_id = cur_road_value.get("startIntersection")
-            end_intersection_id = cur_road_value.get("endIntersection")
-
-            road_values[i].start_intersection = self._inter_map.get(start_intersection_id)
-            road_values[i].end_intersection = self._inter_map.get(end_intersection_id)
-
-            if not self._roads[i].start_intersection:
-                raise ValueError("startIntersection does not exist.")
-            if not self._roads[i].end_intersection:
-                raise ValueError("endIntersection does not exist.")
-
-            lanes_value = cur_road_value.get("lanes", [])
-            for lane_index, lane_value in enumerate(lanes_value):
-                if not isinstance(lane_value, dict):
-                    raise TypeError("lane should be an object")
-
-                width = lane_value.get("width")
-                max_speed = lane_value.get("maxSpeed")
-                self._roads[i].lanes.append(Lane(width, max_speed, lane_index, self._roads[i]))
-
-            for lane in self._roads[i].lanes:
-                self._drivable_map[lane.get_id()] = lane
-
-            # Read points
-            points_value = cur_road_value.get("points", [])
-            for point_value in points_value:
-                if not isinstance(point_value, dict):
-                    raise TypeError("point of road should be an object")
-
-                x = point_value.get("x")
-                y = point_value.get("y")
-                self._roads[i].points.append(Point(x, y))
-
+        # Lane points are built before intersection widths are known; lane links start from these full-length lanes
         for road in self._roads:
             road.init_lanes_points()
 
-        typeMap: Dict[str, RoadLinkType] = {'turn_left': RoadLinkType.turn_left,
-                                            "turn_right": RoadLinkType.turn_right,
-                                            "go_straight": RoadLinkType.go_straight}
-
-        for i in range(len(inter_values)):
-            curInterValue = inter_values[i]
-            if not isinstance(curInterValue, dict):
+        for i, cur_inter_value in enumerate(iter_json_array(json_file_name, "intersections")):
+            if not isinstance(cur_inter_value, dict):
                 raise TypeError(f"intersection[{i}] should be an object")
+            self.load_intersection(cur_inter_value, road_ends, curve_controls)
 
-            pointValue = curInterValue["point"]
-            self._intersections[i].is_virtual = curInterValue["virtual"]
-            self._intersections[i].point = Point(pointValue["x"], pointValue["y"])
-
-            for roadNameValue in curInterValue["roads"]:
-                roadName = roadNameValue
-                if roadName in self._road_map:
-                    raise TypeError("No such road: " + roadName)
-
-                self._intersections[i].roads.append(self._road_map[roadName])
-
-            self._intersections[i].trafficLight.intersection = self._intersections[i]
-            self._intersections[i].width = curInterValue.width
-            self._intersections[i].road_links.clear()
-
-            roadLinkIndex = 0
-            for roadLinkValue in curInterValue["roadLinks"]:
-                roadLink = RoadLink()
-                roadLink.index = roadLinkIndex
-                roadLinkIndex += 1
-
-                roadLink.type = typeMap.get(roadLinkValue.type)
-                roadLink.startRoad = roadLinkValue.startRoad
-                roadLink.endRoad = roadLinkValue.endRoad
-                self._intersections[i].road_links.append(roadLink)
-
-                roadLink.lane_links.clear()
-                laneLinkIndex = 0
-                for laneLinkValue in roadLinkValue.laneLinks:
-                    if not isinstance(roadLinkIndex, dict):
-                        raise TypeError("laneLink should be an object")
-
-                    lane_link = LaneLink()  # Assuming a LaneLink class exists
-                    roadLink.lane_links.append(lane_link)
-                    roadLinkIndex += 1
-
-                    start_lane_index = laneLinkValue.get("startLaneIndex")
-                    end_lane_index = laneLinkValue.get("endLaneIndex")
-                    if not 0 <= start_lane_index < len(roadLink.start_road.lanes):
-                        raise ValueError("startLaneIndex out of range")
-                    if not 0 <= end_lane_index < len(roadLink.end_road.lanes):
-                        raise ValueError("endLaneIndex out of range")
-
-                    start_lane: Lane = roadLink.start_road.lanes[start_lane_index]
-                    end_lane: Lane = roadLink.end_road.lanes[end_lane_index]
-
-                    if "points" in roadLinkValue:
-                        points = roadLinkValue["points"]
-                        if not isinstance(points, list):
-                            raise TypeError("points in laneLink should be an array")
-                        for p_value in points:
-                            lane_link.points.append(Point(p_value["x"], p_value["y"]))  # Assuming a Point class exists
-                    else:
-                        start = Point(start_lane.get_point_by_distance(
-                            start_lane.get_length() - start_lane.get_end_intersection().width))
-                        end = Point(end_lane.get_point_by_distance(0.0 + end_lane.get_start_intersection().width))
-                        len = (Point(end.x - start.x, end.y - start.y)).len()
-                        startDirection = start_lane.get_direction_by_distance(
-                            start_lane.get_length() - start_lane.get_end_intersection().width)
-                        endDirection = end_lane.get_direction_by_distance(0.0 + end_lane.get_start_intersection().width)
-                        minGap = 5
-                        gap1X = startDirection.x * len * 0.5
-                        gap1Y = startDirection.y * len * 0.5
-                        gap2X = -endDirection.x * len * 0.5
-                        gap2Y = -endDirection.y * len * 0.5
-                        if gap1X * gap1X + gap1Y * gap1Y < 25 and start_lane.get_end_intersection().width >= 5:
-                            gap1X = minGap * startDirection.x
-                            gap1Y = minGap * startDirection.y
-                        if gap2X * gap2X + gap2Y * gap2Y < 25 and end_lane.get_start_intersection().width >= 5:
-                            gap2X = minGap * endDirection.x
-                            gap2Y = minGap * endDirection.y
-                        mid1 = Point(start.x + gap1X, start.y + gap1Y)
-                        mid2 = Point(end.x + gap2X, end.y + gap2Y)
-                        numPoints = 10.0
-                        for y in range(int(numPoints + 1)):
-                            p1 = self.get_point(start, mid1, y / numPoints)
-                            p2 = self.get_point(mid1, mid2, y / numPoints)
-                            p3 = self.get_point(mid2, end, y / numPoints)
-                            p4 = self.get_point(p1, p2, y / numPoints)
-                            p5 = self.get_point(p2, p3, y / numPoints)
-                            p6 = self.get_point(p4, p5, y / numPoints)
-                            lane_link.points.append(p6.x, p6.y)
-
-                    lane_link.road_link = roadLink
-                    lane_link.start_lane = start_lane
-                    lane_link.end_lane = end_lane
-                    lane_link.length = Point.get_length_of_points(lane_link.points)
-                    start_lane.lane_links.append(lane_link)
-                    self._drivable_map[lane_link.get_id()] = lane_link
-
-            for lightPhaseValue in curInterValue.trafficLight.lightphases:
-                if not isinstance(lightPhaseValue, dict):
-                    raise TypeError("lightphase should be an object")
-
-                lightPhase = LightPhase()
-                lightPhase.time = lightPhaseValue.get("time")
-                lightPhase.road_link_available = [False] * len(self._intersections[i].road_links)
-
-                availableRoadLinksValue = lightPhaseValue.get("availableRoadLinks")
-                if not isinstance(availableRoadLinksValue, list):
-                    raise TypeError("availableRoadLinks in lightphase should be an array")
-
-                for index in availableRoadLinksValue:
-                    if not isinstance(index, int):
-                        raise TypeError("availableRoadLink should be an int")
-                    if index >= len(lightPhase.road_link_available):
-                        raise ValueError("index out of range")
-                    lightPhase.road_link_available[index] = True
-
-                self._intersections[i].traffic_light.phases.append(lightPhase)
-
-            self._intersections[i].traffic_light.init(0)
+        for road in self._roads:
+            if not road.start_intersection:
+                raise ValueError("startIntersection does not exist.")
+            if not road.end_intersection:
+                raise ValueError("endIntersection does not exist.")
 
-        for intersection in self._intersections:
-            intersection.init_crosses()
+        # Lane-link curves and crossings only depend on their own intersection and are built in parallel
+        lane_links = [[lane_link for road_link in intersection.road_links for lane_link in road_link.lane_links]
+                      for intersection in self._intersections]
+        geometries = build_intersections(
+            [[(True, curve_controls[lane_link]) if lane_link in curve_controls
+              else (False, points_to_array(lane_link.points)) for lane_link in intersection_lane_links]
+             for intersection_lane_links in lane_links], worker_num)
+
+        for intersection, intersection_lane_links, (polylines, crossings) in \
+                zip(self._intersections, lane_links, geometries):
+            for lane_link, polyline in zip(intersection_lane_links, polylines):
+                if lane_link in curve_controls:
+                    lane_link.points = array_to_points(polyline)
+                lane_link.init_polyline()
+            intersection.build_crosses(crossings)
 
         vehicleTemplate = VehicleInfo()
 
@@ -219,7 +92,7 @@ class RoadNet:
 
         for road in self._roads:
             road.build_segmentation_by_interval(
-                (vehicleTemplate.len + vehicleTemplate.minGap) * CityFlow.MAX_NUM_CARS_ON_SEGMENT)
+                (vehicleTemplate.len + vehicleTemplate.min_gap) * CityFlow.MAX_NUM_CARS_ON_SEGMENT)
 
         for road in self._roads:
             roadLanes = road.get_lane_pointers()
@@ -231,8 +104,157 @@ class RoadNet:
             self._lane_links.extend(intersectionLaneLinks)
             self._drivables.extend(intersectionLaneLinks)
 
+        for index, drivable in enumerate(self._drivables):
+            drivable.index = index
+
+        self._road_graph = RoadGraph(self._roads)
+        self._routing_engines = {}
+
         return True
 
+    def load_road(self, cur_road_value: Dict) -> Road:
+        road = Road(cur_road_value["id"])
+        self._road_map[road.id] = road
+        self._roads.append(road)
+
+        lanes_value = cur_road_value.get("lanes", [])
+        for lane_index, lane_value in enumerate(lanes_value):
+            if not isinstance(lane_value, dict):
+                raise TypeError("lane should be an object")
+
+            width = lane_value.get("width")
+            max_speed = lane_value.get("maxSpeed")
+            road.lanes.append(Lane(width, max_speed, lane_index, road))
+
+        for lane in road.lanes:
+            self._drivable_map[lane.get_id()] = lane
+
+        # Read points
+        points_value = cur_road_value.get("points", [])
+        for point_value in points_value:
+            if not isinstance(point_value, dict):
+                raise TypeError("point of road should be an object")
+
+            x = point_value.get("x")
+            y = point_value.get("y")
+            road.points.append(Point(x, y))
+        return road
+
+    def load_intersection(self, cur_inter_value: Dict, road_ends: Dict[str, Tuple[str, str]],
+                          curve_controls: Dict[LaneLink, np.ndarray]) -> Intersection:
+        pointValue = cur_inter_value["point"]
+        intersection = Intersection(cur_inter_value["id"], cur_inter_value["virtual"], cur_inter_value.get("width", 0.0),
+                                    Point(pointValue["x"], pointValue["y"]), TrafficLight(), [], [], [], [])
+        self._inter_map[intersection.id] = intersection
+        self._intersections.append(intersection)
+
+        for roadName in cur_inter_value["roads"]:
+            road = self._road_map.get(roadName)
+            if road is None:
+                raise TypeError("No such road: " + roadName)
+
+            intersection.roads.append(road)
+            start_id, end_id = road_ends[roadName]
+            if start_id == intersection.id:
+                road.start_intersection = intersection
+            if end_id == intersection.id:
+                road.end_intersection = intersection
+
+        intersection.traffic_light.intersection = intersection
+
+        typeMap: Dict[str, RoadLinkType] = {'turn_left': RoadLinkType.turn_left,
+                                            "turn_right": RoadLinkType.turn_right,
+                                            "go_straight": RoadLinkType.go_straight}
+
+        roadLinkIndex = 0
+        for roadLinkValue in cur_inter_value["roadLinks"]:
+            roadLink = RoadLink()
+            roadLink.index = roadLinkIndex
+            roadLinkIndex += 1
+
+            roadLink.intersection = intersection
+            roadLink.type = typeMap.get(roadLinkValue["type"])
+            roadLink.startRoad = self._road_map.get(roadLinkValue["startRoad"])
+            roadLink.endRoad = self._road_map.get(roadLinkValue["endRoad"])
+            intersection.road_links.append(roadLink)
+
+            for laneLinkValue in roadLinkValue["laneLinks"]:
+                if not isinstance(laneLinkValue, dict):
+                    raise TypeError("laneLink should be an object")
+
+                lane_link = LaneLink()  # Assuming a LaneLink class exists
+                roadLink.lane_links.append(lane_link)
+
+                start_lane_index = laneLinkValue.get("startLaneIndex")
+                end_lane_index = laneLinkValue.get("endLaneIndex")
+                if not 0 <= start_lane_index < len(roadLink.startRoad.lanes):
+                    raise ValueError("startLaneIndex out of range")
+                if not 0 <= end_lane_index < len(roadLink.endRoad.lanes):
+                    raise ValueError("endLaneIndex out of range")
+
+                start_lane: Lane = roadLink.startRoad.lanes[start_lane_index]
+                end_lane: Lane = roadLink.endRoad.lanes[end_lane_index]
+
+                if "points" in laneLinkValue:
+                    points = laneLinkValue["points"]
+                    if not isinstance(points, list):
+                        raise TypeError("points in laneLink should be an array")
+                    for p_value in points:
+                        lane_link.points.append(Point(p_value["x"], p_value["y"]))  # Assuming a Point class exists
+                else:
+                    start = start_lane.get_point_by_distance(
+                        start_lane.get_length() - start_lane.get_end_intersection().width)
+                    end = end_lane.get_point_by_distance(0.0 + end_lane.get_start_intersection().width)
+                    length = (Point(end.x - start.x, end.y - start.y)).len()
+                    startDirection = start_lane.get_direction_by_distance(
+                        start_lane.get_length() - start_lane.get_end_intersection().width)
+                    endDirection = end_lane.get_direction_by_distance(0.0 + end_lane.get_start_intersection().width)
+                    minGap = 5
+                    gap1X = startDirection.x * length * 0.5
+                    gap1Y = startDirection.y * length * 0.5
+                    gap2X = -endDirection.x * length * 0.5
+                    gap2Y = -endDirection.y * length * 0.5
+                    if gap1X * gap1X + gap1Y * gap1Y < 25 and start_lane.get_end_intersection().width >= 5:
+                        gap1X = minGap * startDirection.x
+                        gap1Y = minGap * startDirection.y
+                    if gap2X * gap2X + gap2Y * gap2Y < 25 and end_lane.get_start_intersection().width >= 5:
+                        gap2X = minGap * endDirection.x
+                        gap2Y = minGap * endDirection.y
+                    curve_controls[lane_link] = np.array([[start.x, start.y],
+                                                          [start.x + gap1X, start.y + gap1Y],
+                                                          [end.x + gap2X, end.y + gap2Y],
+                                                          [end.x, end.y]])
+
+                lane_link.road_link = roadLink
+                lane_link.start_lane = start_lane
+                lane_link.end_lane = end_lane
+                start_lane.lane_links.append(lane_link)
+                self._drivable_map[lane_link.get_id()] = lane_link
+
+        for lightPhaseValue in cur_inter_value["trafficLight"]["lightphases"]:
+            if not isinstance(lightPhaseValue, dict):
+                raise TypeError("lightphase should be an object")
+
+            lightPhase = LightPhase()
+            lightPhase.time = lightPhaseValue.get("time")
+            lightPhase.road_link_available = [False] * len(intersection.road_links)
+
+            availableRoadLinksValue = lightPhaseValue.get("availableRoadLinks")
+            if not isinstance(availableRoadLinksValue, list):
+                raise TypeError("availableRoadLinks in lightphase should be an array")
+
+            for index in availableRoadLinksValue:
+                if not isinstance(index, int):
+                    raise TypeError("availableRoadLink should be an int")
+                if index >= len(lightPhase.road_link_available):
+                    raise ValueError("index out of range")
+                lightPhase.road_link_available[index] = True
+
+            intersection.traffic_light.phases.append(lightPhase)
+
+        intersection.traffic_light.init(0)
+        return intersection
+
     def convert_to_json(self):
         return {
             "nodes": list(map(lambda intersection: {
@@ -243,14 +265,14 @@ class RoadNet:
                 **({
                        "width": intersection.width} if not intersection.is_virtual and intersection.width is not None else {})
             }, self._intersections)),
-            "edges": list(map(self._roads, lambda road: {
+            "edges": list(map(lambda road: {
                 "id": road.id,
                 "from": road.start_intersection.id if road.start_intersection else "null",
                 "to": road.end_intersection.id if road.end_intersection else "null",
                 "points": [[point.x, point.y] for point in road.points],
                 "nLane": len(road.lanes),
                 "laneWidths": [lane.width for lane in road.lanes]
-            }))
+            }, self._roads))
         }
 
     def get_roads(self):
@@ -264,6 +286,15 @@ class RoadNet:
             return None
         return self._road_map.get(road_id)
 
+    def get_road_graph(self) -> RoadGraph:
+        return self._road_graph
+
+    def get_routing_engine(self, name: str):
+        # Engines are kept on the roadnet so their preprocessing is built once and travels with the roadnet cache
+        if name not in self._routing_engines:
+            self._routing_engines[name] = create_routing_engine(name, self._road_graph)
+        return self._routing_engines[name]
+
     def get_intersection_by_id(self, id):
         return self._inter_map.get(id)
 
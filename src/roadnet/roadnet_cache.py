@@ -0,0 +1,202 @@
+import hashlib
+import io
+import os
+import pickle
+import struct
+import tempfile
+import types
+from collections import deque
+from enum import Enum
+from functools import lru_cache
+from typing import Any, Dict, List, Tuple
+
+MAGIC = b"CFRNCACH"
+
+# magic, digest of the source the cache was built from
+_PREAMBLE = struct.Struct("<8s32s")
+
+# Packages under src/ whose classes make up a cached roadnet
+_SOURCE_PACKAGES = ("roadnet", "utility")
+
+# Cache files are pickles, so loading one runs whatever callables it names. Only classes from these modules and
+# the few globals the roadnet attributes pickle through may be referenced; anything else rejects the file
+TRUSTED_MODULES = ("src.roadnet.", "src.utility.")
+TRUSTED_GLOBALS = frozenset({
+    ("collections", "deque"),
+    ("numpy", "dtype"),
+    ("numpy", "ndarray"),
+    ("numpy._core.numeric", "_frombuffer"),
+    ("numpy.core.numeric", "_frombuffer"),
+    ("numpy._core.multiarray", "_reconstruct"),
+    ("numpy.core.multiarray", "_reconstruct"),
+    ("numpy._core.multiarray", "scalar"),
+    ("numpy.core.multiarray", "scalar"),
+})
+
+_OPAQUE_TYPES = (type, Enum, types.FunctionType, types.BuiltinFunctionType, types.MethodType, types.ModuleType)
+_CONTAINER_TYPES = (list, tuple, set, frozenset, deque, dict)
+
+
+def file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+@lru_cache(maxsize=None)
+def source_digest() -> bytes:
+    # Editing any roadnet class changes the digest, so caches built from older code are never loaded
+    src_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    digest = hashlib.sha256()
+    for package in _SOURCE_PACKAGES:
+        package_dir = os.path.join(src_dir, package)
+        for name in sorted(os.listdir(package_dir)):
+            if name.endswith(".py"):
+                digest.update(os.path.join(package, name).encode())
+                with open(os.path.join(package_dir, name), "rb") as file:
+                    digest.update(file.read())
+    return digest.digest()
+
+
+@lru_cache(maxsize=None)
+def _is_graph_type(cls: type) -> bool:
+    return (cls.__module__ != "builtins" and not issubclass(cls, _OPAQUE_TYPES + _CONTAINER_TYPES)
+            and ("__dict__" in dir(cls) or hasattr(cls, "__slots__")))
+
+
+@lru_cache(maxsize=None)
+def _slot_names(cls: type) -> Tuple[str, ...]:
+    return tuple(name for base in cls.__mro__ for name in getattr(base, "__slots__", ()) if name != "__dict__")
+
+
+def _get_state(value: Any) -> Tuple[Dict | None, Dict | None]:
+    slots = {name: getattr(value, name) for name in _slot_names(type(value)) if hasattr(value, name)}
+    return getattr(value, "__dict__", None), slots or None
+
+
+def _collect(root: Any) -> List[Any]:
+    # Iterative walk, since a city roadnet links lanes, lane links and roads into chains far deeper than the
+    # recursion limit that pickle would hit following them
+    objects, seen, pending = [], set(), [root]
+    while pending:
+        value = pending.pop()
+        if id(value) in seen:
+            continue
+        if _is_graph_type(type(value)):
+            seen.add(id(value))
+            objects.append(value)
+            for state in _get_state(value):
+                if state is not None:
+                    pending.extend(state.values())
+        elif isinstance(value, (list, tuple, set, frozenset, deque)):
+            seen.add(id(value))
+            pending.extend(value)
+        elif isinstance(value, dict):
+            seen.add(id(value))
+            pending.extend(value.keys())
+            pending.extend(value.values())
+    return objects
+
+
+class _GraphPickler(pickle.Pickler):
+    def __init__(self, file, indices: Dict[int, int]):
+        super().__init__(file, pickle.HIGHEST_PROTOCOL)
+        self.indices: Dict[int, int] = indices
+
+    def persistent_id(self, obj):
+        return self.indices.get(id(obj))
+
+
+class _RestrictedUnpickler(pickle.Unpickler):
+    def __init__(self, file, trusted_modules: Tuple[str, ...]):
+        super().__init__(file)
+        self.trusted_modules: Tuple[str, ...] = trusted_modules
+
+    def find_class(self, module: str, name: str):
+        if (module, name) in TRUSTED_GLOBALS:
+            return super().find_class(module, name)
+        if module.startswith(self.trusted_modules):
+            value = super().find_class(module, name)
+            if isinstance(value, type):
+                return value
+        raise pickle.UnpicklingError(f"roadnet cache references untrusted global {module}.{name}")
+
+
+class _GraphUnpickler(_RestrictedUnpickler):
+    def __init__(self, file, trusted_modules: Tuple[str, ...], objects: List[Any]):
+        super().__init__(file, trusted_modules)
+        self.objects: List[Any] = objects
+
+    def persistent_load(self, pid):
+        return self.objects[pid]
+
+
+def dumps_graph(root: Any) -> bytes:
+    # Objects are written as bare classes first and their states second, with every reference between them
+    # replaced by an index, so neither pass recurses along the object graph
+    objects = _collect(root)
+    indices = {id(value): i for i, value in enumerate(objects)}
+    buffer = io.BytesIO()
+    pickle.dump([type(value) for value in objects], buffer, pickle.HIGHEST_PROTOCOL)
+    _GraphPickler(buffer, indices).dump([_get_state(value) for value in objects])
+    return buffer.getvalue()
+
+
+def loads_graph(data: bytes, trusted_modules: Tuple[str, ...] = TRUSTED_MODULES) -> Any:
+    buffer = io.BytesIO(data)
+    objects = [cls.__new__(cls) for cls in _RestrictedUnpickler(buffer, trusted_modules).load()]
+    states = _GraphUnpickler(buffer, trusted_modules, objects).load()
+    for value, (attributes, slots) in zip(objects, states):
+        if attributes is not None:
+            value.__dict__.update(attributes)
+        for name, slot_value in (slots or {}).items():
+            setattr(value, name, slot_value)
+    return objects[0]
+
+
+class RoadNetCache:
+    # The cache directory must only be writable by users trusted to run code in this process: the restricted
+    # loading keeps a tampered file from naming arbitrary callables, but it is not a sandbox for the roadnet classes
+    def __init__(self, cache_dir: str, trusted_modules: Tuple[str, ...] = TRUSTED_MODULES):
+        self.cache_dir: str = cache_dir
+        self.trusted_modules: Tuple[str, ...] = trusted_modules
+        self.source_digest: bytes = source_digest()
+
+    def get_path(self, json_file: str) -> str:
+        return os.path.join(self.cache_dir, f"{file_digest(json_file)}-{self.source_digest.hex()[:16]}.roadnet")
+
+    def load(self, json_file: str):
+        path = self.get_path(json_file)
+        if not os.path.exists(path):
+            return None
+
+        with open(path, "rb") as file:
+            data = file.read()
+        if len(data) < _PREAMBLE.size:
+            return None
+        magic, digest = _PREAMBLE.unpack_from(data, 0)
+        if magic != MAGIC or digest != self.source_digest:
+            return None
+        try:
+            return loads_graph(data[_PREAMBLE.size:], self.trusted_modules)
+        except Exception:
+            # A corrupt or tampered cache is rebuilt rather than trusted
+            return None
+
+    def store(self, json_file: str, road_net) -> None:
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self.get_path(json_file)
+        data = _PREAMBLE.pack(MAGIC, self.source_digest) + dumps_graph(road_net)
+
+        # Written to a temporary file and renamed, so workers starting concurrently never read a partial cache
+        descriptor, temporary_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(descriptor, "wb") as file:
+                file.write(data)
+            os.replace(temporary_path, path)
+        except BaseException:
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
+            raise
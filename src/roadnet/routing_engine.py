@@ -0,0 +1,245 @@
+import heapq
+import math
+from typing import Dict, List, Tuple
+
+from src.roadnet.road_graph import RoadGraph
+
+# All engines answer length queries: the cost of a path is the summed average length of every road entered after
+# the start road, the same cost RoadGraph.shortest_path uses with RoadGraph.length_list
+
+
+def _reconstruct(from_road: Dict[int, int], start: int, end: int) -> List[int]:
+    path = [end]
+    while path[-1] != start:
+        path.append(from_road[path[-1]])
+    path.reverse()
+    return path
+
+
+class DijkstraRoutingEngine:
+    def __init__(self, graph: RoadGraph):
+        self.graph: RoadGraph = graph
+
+    def shortest_length_path(self, start: int, end: int) -> List[int] | None:
+        return self.graph.shortest_path(start, end, self.graph.length_list)
+
+
+class AStarRoutingEngine:
+    def __init__(self, graph: RoadGraph):
+        self.graph: RoadGraph = graph
+        self.x: List[float] = [road.points[-1].x for road in graph.roads]
+        self.y: List[float] = [road.points[-1].y for road in graph.roads]
+
+        # Intersections are crossed for free, so straight-line distance between road ends can exceed the cost of a
+        # path; scaling it by the smallest cost per unit of distance over all edges keeps the heuristic admissible
+        self.scale: float = 1.0
+        for road, successors in enumerate(graph.successor_lists):
+            for adj in successors:
+                distance = math.hypot(self.x[adj] - self.x[road], self.y[adj] - self.y[road])
+                if distance > 0:
+                    self.scale = min(self.scale, graph.length_list[adj] / distance)
+
+    def shortest_length_path(self, start: int, end: int) -> List[int] | None:
+        weights, successors = self.graph.length_list, self.graph.successor_lists
+        x, y, scale = self.x, self.y, self.scale
+        end_x, end_y = x[end], y[end]
+
+        dis = {start: 0.0}
+        from_road = {}
+        visited = set()
+        queue = [(scale * math.hypot(end_x - x[start], end_y - y[start]), start)]
+        while queue:
+            _, cur = heapq.heappop(queue)
+            if cur == end:
+                return _reconstruct(from_road, start, end)
+            if cur in visited:
+                continue
+            visited.add(cur)
+
+            cur_dis = dis[cur]
+            for adj in successors[cur]:
+                new_dis = cur_dis + weights[adj]
+                if adj not in dis or new_dis < dis[adj]:
+                    from_road[adj] = cur
+                    dis[adj] = new_dis
+                    heapq.heappush(queue, (new_dis + scale * math.hypot(end_x - x[adj], end_y - y[adj]), adj))
+        return None
+
+
+class ContractionHierarchyRoutingEngine:
+    def __init__(self, graph: RoadGraph, witness_settle_limit: int = 500):
+        self.graph: RoadGraph = graph
+        self.witness_settle_limit: int = witness_settle_limit
+        node_num = len(graph)
+
+        # Roads carry the cost of entering them, so edge u -> v weighs the length of v. Each edge keeps the road it
+        # bypasses, -1 for an original edge, so shortcuts can be unpacked into roads again
+        self.edges: Dict[Tuple[int, int], Tuple[float, int]] = {}
+        out_edges: List[Dict[int, float]] = [{} for _ in range(node_num)]
+        in_edges: List[Dict[int, float]] = [{} for _ in range(node_num)]
+        for road, successors in enumerate(graph.successor_lists):
+            for adj in successors:
+                if adj != road:
+                    self.add_edge(out_edges, in_edges, road, adj, graph.length_list[adj], -1)
+
+        self.rank: List[int] = [0] * node_num
+        contracted_neighbors = [0] * node_num
+        queue = [(self.priority(out_edges, in_edges, contracted_neighbors, node)[0], node) for node in range(node_num)]
+        heapq.heapify(queue)
+        order = 0
+        while queue:
+            _, node = heapq.heappop(queue)
+            # Priorities go stale as neighbours are contracted, so they are refreshed lazily
+            priority, shortcuts = self.priority(out_edges, in_edges, contracted_neighbors, node)
+            if queue and priority > queue[0][0]:
+                heapq.heappush(queue, (priority, node))
+                continue
+
+            for source, target, weight in shortcuts:
+                self.add_edge(out_edges, in_edges, source, target, weight, node)
+            self.rank[node] = order
+            order += 1
+
+            # Contracted roads leave the remaining graph; their edges are kept in self.edges for queries
+            for neighbor in out_edges[node]:
+                contracted_neighbors[neighbor] += 1
+                del in_edges[neighbor][node]
+            for neighbor in in_edges[node]:
+                contracted_neighbors[neighbor] += 1
+                del out_edges[neighbor][node]
+            out_edges[node], in_edges[node] = {}, {}
+
+        # Queries only move to higher ranked roads: forward along edges, backward against them
+        self.up_out: List[List[Tuple[int, float]]] = [[] for _ in range(node_num)]
+        self.up_in: List[List[Tuple[int, float]]] = [[] for _ in range(node_num)]
+        for (source, target), (weight, _) in self.edges.items():
+            if self.rank[target] > self.rank[source]:
+                self.up_out[source].append((target, weight))
+            else:
+                self.up_in[target].append((source, weight))
+
+    def add_edge(self, out_edges: List[Dict[int, float]], in_edges: List[Dict[int, float]], source: int,
+                 target: int, weight: float, middle: int) -> None:
+        current = self.edges.get((source, target))
+        if current is not None and current[0] <= weight:
+            return
+        self.edges[(source, target)] = (weight, middle)
+        out_edges[source][target] = weight
+        in_edges[target][source] = weight
+
+    def find_shortcuts(self, out_edges: List[Dict[int, float]], in_edges: List[Dict[int, float]],
+                       node: int) -> List[Tuple[int, int, float]]:
+        shortcuts = []
+        for source, in_weight in in_edges[node].items():
+            limits = {target: in_weight + out_weight for target, out_weight in out_edges[node].items()
+                      if target != source}
+            if not limits:
+                continue
+            witness = self.witness_search(out_edges, source, node, limits)
+            for target, weight in limits.items():
+                if witness.get(target, math.inf) > weight:
+                    shortcuts.append((source, target, weight))
+        return shortcuts
+
+    def witness_search(self, out_edges: List[Dict[int, float]], source: int, excluded: int,
+                       limits: Dict[int, float]) -> Dict[int, float]:
+        # A search cut short only finds fewer witnesses, which adds shortcuts that are unnecessary but still exact
+        limit = max(limits.values())
+        remaining = len(limits)
+        dis = {source: 0.0}
+        queue = [(0.0, source)]
+        settled = 0
+        while queue and settled < self.witness_settle_limit:
+            cur_dis, cur = heapq.heappop(queue)
+            if cur_dis > dis[cur]:
+                continue
+            if cur_dis > limit:
+                break
+            if cur in limits:
+                remaining -= 1
+                if remaining == 0:
+                    break
+            settled += 1
+            for adj, weight in out_edges[cur].items():
+                if adj == excluded:
+                    continue
+                new_dis = cur_dis + weight
+                if new_dis < dis.get(adj, math.inf):
+                    dis[adj] = new_dis
+                    heapq.heappush(queue, (new_dis, adj))
+        return dis
+
+    def priority(self, out_edges: List[Dict[int, float]], in_edges: List[Dict[int, float]],
+                 contracted_neighbors: List[int], node: int) -> Tuple[int, List[Tuple[int, int, float]]]:
+        # Edge difference: roads whose contraction adds fewer shortcuts than it removes edges go first
+        shortcuts = self.find_shortcuts(out_edges, in_edges, node)
+        return len(shortcuts) - len(out_edges[node]) - len(in_edges[node]) + contracted_neighbors[node], shortcuts
+
+    def shortest_length_path(self, start: int, end: int) -> List[int] | None:
+        if start == end:
+            return [start]
+
+        # Bidirectional upward search; each direction also keeps the edges pointing into it from above, which lets
+        # it stall roads that are reached more cheaply from a higher ranked road than by its own label
+        forward = ({start: 0.0}, {}, [(0.0, start)], self.up_out, self.up_in)
+        backward = ({end: 0.0}, {}, [(0.0, end)], self.up_in, self.up_out)
+        best, meeting = math.inf, -1
+        while True:
+            forward_min = forward[2][0][0] if forward[2] else math.inf
+            backward_min = backward[2][0][0] if backward[2] else math.inf
+            if min(forward_min, backward_min) >= best:
+                break
+            dis, parents, queue, edges, stall_edges = forward if forward_min <= backward_min else backward
+            other = backward[0] if forward_min <= backward_min else forward[0]
+
+            cur_dis, cur = heapq.heappop(queue)
+            if cur_dis > dis[cur]:
+                continue
+            if cur in other and cur_dis + other[cur] < best:
+                best, meeting = cur_dis + other[cur], cur
+            if any(dis.get(adj, math.inf) + weight < cur_dis for adj, weight in stall_edges[cur]):
+                continue
+            for adj, weight in edges[cur]:
+                new_dis = cur_dis + weight
+                if new_dis < dis.get(adj, math.inf):
+                    dis[adj] = new_dis
+                    parents[adj] = cur
+                    heapq.heappush(queue, (new_dis, adj))
+        if meeting < 0:
+            return None
+
+        roads = [meeting]
+        while roads[-1] != start:
+            roads.append(forward[1][roads[-1]])
+        roads.reverse()
+        while roads[-1] != end:
+            roads.append(backward[1][roads[-1]])
+
+        path = [start]
+        for source, target in zip(roads, roads[1:]):
+            path.extend(self.unpack(source, target))
+        return path
+
+    def unpack(self, source: int, target: int) -> List[int]:
+        # Roads after source up to and including target, expanding shortcuts without recursion
+        path = []
+        stack = [(source, target)]
+        while stack:
+            edge_source, edge_target = stack.pop()
+            middle = self.edges[(edge_source, edge_target)][1]
+            if middle < 0:
+                path.append(edge_target)
+            else:
+                stack.append((middle, edge_target))
+                stack.append((edge_source, middle))
+        return path
+
+
+ROUTING_ENGINES = {"dijkstra": DijkstraRoutingEngine, "astar": AStarRoutingEngine,
+                   "ch": ContractionHierarchyRoutingEngine}
+
+
+def create_routing_engine(name: str, graph: RoadGraph):
+    if name not in ROUTING_ENGINES:
+        raise Exception("Unknown routing engine '" + name + "', expected one of " + ", ".join(ROUTING_ENGINES))
+    return ROUTING_ENGINES[name](graph)
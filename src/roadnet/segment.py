@@ -1,6 +1,9 @@
-from typing import List
+from __future__ import annotations
 
-from src.vehicle.vehicle import Vehicle
+from typing import TYPE_CHECKING, List
+
+if TYPE_CHECKING:
+    from src.vehicle.vehicle import Vehicle
 
 
 class Segment:
@@ -32,10 +35,9 @@ class Segment:
     def remove_vehicle(self, vehicle):
         self.vehicles.remove(vehicle)
 
-    def insert_vehicle(self, vehicle: List[Vehicle]):
+    def insert_vehicle(self, vehicle: Vehicle):
+        # Vehicles are kept front to back, like the lane's own list
         index = 0
-        for v in self.vehicles:
-            if v.get_distance() > vehicle.get_distance():
-                break
+        while index < len(self.vehicles) and self.vehicles[index].get_distance() > vehicle.get_distance():
             index += 1
         self.vehicles.insert(index, vehicle)
\ No newline at end of file
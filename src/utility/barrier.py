@@ -1,17 +1,52 @@
 import threading
+import time
+from typing import Dict, Tuple
 
 
 class Barrier:
-    def __init__(self, num_threads):
+    def __init__(self, num_threads, spin_count: int = 0):
         self.num_threads = num_threads
         self.count = 0
+        self.generation = 0
+        self.spin_count = spin_count
         self.mutex = threading.Lock()
         self.cv = threading.Condition(lock=self.mutex)
+        self.wait_time: Dict[str, float] = {}
+        self.wait_count: Dict[str, int] = {}
 
-    def wait(self):
+    def wait(self, phase: str = None):
+        start = time.perf_counter()
         with self.mutex:
+            generation = self.generation
             self.count += 1
-            if self.count == self.num_threads:
+            released = self.count == self.num_threads
+            if released:
+                self.count = 0
+                self.generation += 1
                 self.cv.notify_all()
-            while self.count < self.num_threads:
-                self.cv.wait()
+
+        if not released:
+            # Phases on small networks are short, so yield a few times before sleeping on the condition
+            for _ in range(self.spin_count):
+                if self.generation != generation:
+                    break
+                time.sleep(0)
+            else:
+                with self.mutex:
+                    while self.generation == generation:
+                        self.cv.wait()
+
+        if phase is not None:
+            elapsed = time.perf_counter() - start
+            with self.mutex:
+                self.wait_time[phase] = self.wait_time.get(phase, 0.0) + elapsed
+                self.wait_count[phase] = self.wait_count.get(phase, 0) + 1
+
+    def get_stats(self) -> Dict[str, Tuple[int, float]]:
+        with self.mutex:
+            return {phase: (self.wait_count[phase], self.wait_time[phase]) for phase in self.wait_time}
+
+    def reset_stats(self) -> None:
+        with self.mutex:
+            self.wait_time.clear()
+            self.wait_count.clear()
@@ -0,0 +1,133 @@
+from typing import List, Tuple
+
+import numpy as np
+
+from src.utility.utility import Point
+
+# Polylines are (n, 2) float64 arrays of x, y rows
+
+
+def points_to_array(points: List[Point]) -> np.ndarray:
+    array = np.empty((len(points), 2), dtype=np.float64)
+    for i, point in enumerate(points):
+        array[i, 0] = point.x
+        array[i, 1] = point.y
+    return array
+
+
+def array_to_points(array: np.ndarray) -> List[Point]:
+    return [Point(x, y) for x, y in array.tolist()]
+
+
+def segment_vectors(points: np.ndarray) -> np.ndarray:
+    return np.diff(points, axis=0)
+
+
+def lengths(vectors: np.ndarray) -> np.ndarray:
+    return np.hypot(vectors[..., 0], vectors[..., 1])
+
+
+def polyline_length(points: np.ndarray) -> float:
+    return float(lengths(segment_vectors(points)).sum())
+
+
+def units(vectors: np.ndarray) -> np.ndarray:
+    # Zero vectors stay zero instead of becoming NaN
+    norms = lengths(vectors)[..., np.newaxis]
+    return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+
+def normals(vectors: np.ndarray) -> np.ndarray:
+    return np.stack((-vectors[..., 1], vectors[..., 0]), axis=-1)
+
+
+def cross(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    return a[..., 0] * b[..., 1] - a[..., 1] * b[..., 0]
+
+
+def dot(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    return a[..., 0] * b[..., 0] + a[..., 1] * b[..., 1]
+
+
+def sign(x: np.ndarray) -> np.ndarray:
+    return (x + Point.eps > 0).astype(np.int8) - (x < Point.eps).astype(np.int8)
+
+
+def on_segments(a: np.ndarray, b: np.ndarray, p: np.ndarray) -> np.ndarray:
+    return (sign(cross(b - a, p - a)) == 0) & (dot(p - a, p - b) <= 0)
+
+
+def segment_intersections(a1: np.ndarray, a2: np.ndarray, b1: np.ndarray,
+                          b2: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    # Broadcasting version of calc_intersect_point + on_segment; parallel segments never intersect
+    u, v = a2 - a1, b2 - b1
+    denominator = cross(u, v)
+    parallel = sign(denominator) == 0
+    with np.errstate(invalid="ignore", divide="ignore"):
+        ratio = np.where(parallel, 0.0, cross(b1 - a1, v) / np.where(parallel, 1.0, denominator))
+    p = a1 + u * ratio[..., np.newaxis]
+    return ~parallel & on_segments(a1, a2, p) & on_segments(b1, b2, p), p
+
+
+def bezier_points(start: np.ndarray, mid1: np.ndarray, mid2: np.ndarray, end: np.ndarray,
+                  num_points: int) -> np.ndarray:
+    # Same de Casteljau steps as RoadNet.get_point, evaluated for every t at once
+    t = (np.arange(num_points + 1) / num_points)[:, np.newaxis]
+
+    def lerp(p1, p2):
+        return (p2 - p1) * t + p1
+
+    p1, p2, p3 = lerp(start, mid1), lerp(mid1, mid2), lerp(mid2, end)
+    return lerp(lerp(p1, p2), lerp(p2, p3))
+
+
+def _exclusive_cumsum(values: np.ndarray) -> np.ndarray:
+    # Sequential sums, so the distances match a running "+=" bit for bit
+    zeros = np.zeros(values.shape[:-1] + (1,))
+    return np.cumsum(np.concatenate((zeros, values), axis=-1), axis=-1)[..., :-1]
+
+
+def polyline_crossings(polylines: List[np.ndarray],
+                       tolerance: float = 1e-6) -> List[Tuple[int, int, int, int, float, float]]:
+    # For every pair i < j and every segment ia of polyline i, reports the first segment ib of polyline j that
+    # crosses it as (i, j, ia, ib, distance along i, distance along j). The distance along j skips segments
+    # parallel to ia, as the original pairwise loop in Intersection.init_crosses did
+    count = len(polylines)
+    lows = np.full((count, 2), np.inf)
+    highs = np.full((count, 2), -np.inf)
+    for i, points in enumerate(polylines):
+        if len(points) >= 2:
+            lows[i], highs[i] = points.min(axis=0) - tolerance, points.max(axis=0) + tolerance
+
+    # Only pairs with overlapping bounding boxes can cross
+    overlap = np.all(lows[:, np.newaxis] <= highs[np.newaxis], axis=2) & \
+        np.all(lows[np.newaxis] <= highs[:, np.newaxis], axis=2)
+    candidates = np.argwhere(np.triu(overlap, 1))
+
+    result = []
+    for i, j in candidates.tolist():
+        a, b = polylines[i], polylines[j]
+        a1, a2 = a[:-1, np.newaxis], a[1:, np.newaxis]
+        b1, b2 = b[np.newaxis, :-1], b[np.newaxis, 1:]
+        mask, points = segment_intersections(a1, a2, b1, b2)
+        rows = np.flatnonzero(mask.any(axis=1))
+        if len(rows) == 0:
+            continue
+
+        columns = mask[rows].argmax(axis=1)
+        a_vectors, b_vectors = a[1:] - a[:-1], b[1:] - b[:-1]
+        a_lengths = np.sqrt(dot(a_vectors, a_vectors))
+        b_lengths = np.sqrt(dot(b_vectors, b_vectors))
+        parallel = sign(cross(a_vectors[:, np.newaxis], b_vectors[np.newaxis])) == 0
+
+        hits = points[rows, columns]
+        a_offsets = hits - a[rows]
+        b_offsets = hits - b[columns]
+        distances_a = _exclusive_cumsum(a_lengths)[rows] + np.sqrt(dot(a_offsets, a_offsets))
+        distances_b = _exclusive_cumsum(np.where(parallel[rows], 0.0, b_lengths))[np.arange(len(rows)), columns] + \
+            np.sqrt(dot(b_offsets, b_offsets))
+
+        for ia, ib, distance_a, distance_b in zip(rows.tolist(), columns.tolist(), distances_a.tolist(),
+                                                  distances_b.tolist()):
+            result.append((i, j, ia, ib, distance_a, distance_b))
+    return result
@@ -0,0 +1,119 @@
+import json
+from typing import Any, Iterator, TextIO
+
+from src.utility.utility import JsonFormatError, JsonMemberMiss, JsonTypeError
+
+_WHITESPACE = " \t\n\r"
+
+
+class JsonStreamReader:
+    def __init__(self, file: TextIO, chunk_size: int = 1 << 20):
+        self.file: TextIO = file
+        self.chunk_size: int = chunk_size
+        self.decoder: json.JSONDecoder = json.JSONDecoder()
+        self.buffer: str = ""
+        self.position: int = 0
+        self.eof: bool = False
+
+    def fill(self, size: int) -> bool:
+        if self.eof:
+            return False
+        # Consumed text is dropped, so the buffer only ever holds the item being parsed
+        if self.position > 0:
+            self.buffer = self.buffer[self.position:]
+            self.position = 0
+        chunk = self.file.read(size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer += chunk
+        return True
+
+    def peek(self) -> str:
+        while True:
+            while self.position < len(self.buffer) and self.buffer[self.position] in _WHITESPACE:
+                self.position += 1
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+            if not self.fill(self.chunk_size):
+                return ""
+
+    def consume(self, char: str) -> bool:
+        if self.peek() != char:
+            return False
+        self.position += 1
+        return True
+
+    def expect(self, char: str) -> None:
+        if not self.consume(char):
+            raise JsonFormatError(f"expected '{char}' at offset {self.position} of the JSON stream")
+
+    def decode_value(self) -> Any:
+        self.peek()
+        size = self.chunk_size
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.position)
+                # A number cut off by the chunk boundary still decodes, so a value must end before the buffer does
+                if end < len(self.buffer) or self.eof:
+                    self.position = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            # Large values read ever bigger chunks, so reparsing them stays linear overall
+            self.fill(size)
+            size *= 2
+
+    def iter_array(self, name: str = "array") -> Iterator[Any]:
+        if not self.consume("["):
+            raise JsonTypeError(name, "array")
+        if self.consume("]"):
+            return
+        while True:
+            yield self.decode_value()
+            if self.consume(","):
+                continue
+            self.expect("]")
+            return
+
+    def iter_object(self, name: str = "object") -> Iterator[str]:
+        # Yields each member name with the reader positioned at its value, which the caller must consume
+        if not self.consume("{"):
+            raise JsonTypeError(name, "object")
+        if self.consume("}"):
+            return
+        while True:
+            key = self.decode_value()
+            if not isinstance(key, str):
+                raise JsonFormatError(f"expected a member name at offset {self.position} of the JSON stream")
+            self.expect(":")
+            yield key
+            if self.consume(","):
+                continue
+            self.expect("}")
+            return
+
+    def skip_value(self) -> None:
+        # Arrays and objects are skipped element by element rather than decoded whole
+        char = self.peek()
+        if char == "[":
+            for _ in self.iter_array():
+                pass
+        elif char == "{":
+            for _ in self.iter_object():
+                self.skip_value()
+        else:
+            self.decode_value()
+
+
+def iter_json_array(file_name: str, name: str, chunk_size: int = 1 << 20) -> Iterator[Any]:
+    # Streams the items of the array member `name` of a top-level JSON object
+    with open(file_name, "r", encoding="utf-8") as file:
+        reader = JsonStreamReader(file, chunk_size)
+        for key in reader.iter_object("document"):
+            if key == name:
+                yield from reader.iter_array(name)
+                return
+            reader.skip_value()
+    raise JsonMemberMiss(name)
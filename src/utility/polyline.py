@@ -0,0 +1,66 @@
+from bisect import bisect_left, bisect_right
+from typing import List, Tuple
+
+import numpy as np
+
+from src.utility.utility import Point
+
+
+class Polyline:
+    def __init__(self, points: List[Point]):
+        self.x: np.ndarray = np.array([point.x for point in points], dtype=np.float64)
+        self.y: np.ndarray = np.array([point.y for point in points], dtype=np.float64)
+
+        dx, dy = np.diff(self.x), np.diff(self.y)
+        segment_lengths = np.hypot(dx, dy)
+        self.offsets: np.ndarray = np.concatenate(([0.0], np.cumsum(segment_lengths)))
+        self.length: float = float(self.offsets[-1]) if len(points) > 0 else 0.0
+
+        # Zero-length segments get a zero direction instead of NaN
+        with np.errstate(invalid="ignore", divide="ignore"):
+            self.unit_x: np.ndarray = np.where(segment_lengths > 0, dx / segment_lengths, 0.0)
+            self.unit_y: np.ndarray = np.where(segment_lengths > 0, dy / segment_lengths, 0.0)
+
+        # Scalar lookups bisect plain lists, which is much faster than numpy calls on single values
+        self.offset_list: List[float] = self.offsets.tolist()
+        self.x_list: List[float] = self.x.tolist()
+        self.y_list: List[float] = self.y.tolist()
+        self.unit_list: List[Tuple[float, float]] = list(zip(self.unit_x.tolist(), self.unit_y.tolist()))
+
+    def __len__(self) -> int:
+        return len(self.x_list)
+
+    def point_at(self, distance: float) -> Point:
+        distance = min(max(distance, 0.0), self.length)
+        if distance <= 0.0:
+            return Point(self.x_list[0], self.y_list[0])
+
+        i = bisect_left(self.offset_list, distance, 1)
+        start = self.offset_list[i - 1]
+        ratio = (distance - start) / (self.offset_list[i] - start)
+        x0, y0 = self.x_list[i - 1], self.y_list[i - 1]
+        return Point(x0 + (self.x_list[i] - x0) * ratio, y0 + (self.y_list[i] - y0) * ratio)
+
+    def direction_at(self, distance: float) -> Point:
+        if not self.unit_list:
+            return Point()
+        i = min(max(bisect_right(self.offset_list, distance), 1), len(self.offset_list) - 1)
+        unit_x, unit_y = self.unit_list[i - 1]
+        return Point(unit_x, unit_y)
+
+    def points_at(self, distances: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        distances = np.clip(np.asarray(distances, dtype=np.float64), 0.0, self.length)
+        i = np.clip(np.searchsorted(self.offsets, distances, side="left"), 1, len(self.offsets) - 1)
+        start = self.offsets[i - 1]
+        span = self.offsets[i] - start
+        with np.errstate(invalid="ignore", divide="ignore"):
+            ratio = np.where(span > 0, (distances - start) / span, 0.0)
+        x = self.x[i - 1] + (self.x[i] - self.x[i - 1]) * ratio
+        y = self.y[i - 1] + (self.y[i] - self.y[i - 1]) * ratio
+        return x, y
+
+    def directions_at(self, distances: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        if len(self.unit_x) == 0:
+            return np.zeros(len(distances)), np.zeros(len(distances))
+        i = np.clip(np.searchsorted(self.offsets, distances, side="right"), 1, len(self.offsets) - 1)
+        return self.unit_x[i - 1], self.unit_y[i - 1]
@@ -6,6 +6,8 @@ from typing import List
 
 
 class Point:
+    __slots__ = ('x', 'y')
+
     eps = 1e-8
 
     @staticmethod
@@ -1,24 +1,15 @@
-from typing import List
-from vehicle import Vehicle
+from __future__ import annotations
 
-from src.roadnet.drivable import Drivable
+from typing import TYPE_CHECKING, List
+
+if TYPE_CHECKING:
+    from src.roadnet.drivable import Drivable
+    from src.vehicle.vehicle import Vehicle
 
 
 class Buffer:
-    isDisSet: bool = False
-    isSpeedSet: bool = False
-    isDrivableSet: bool = False
-    isNotifiedVehicles: bool = False
-    isEndSet: bool = False
-    isEnterLaneLinkTimeSet: bool = False
-    isBlockerSet: bool = False
-    isCustomSpeedSet: bool = False
-    dis: float
-    deltaDis: float
-    speed: float
-    customSpeed: float
-    drivable: Drivable
-    notifiedVehicles: List[Vehicle]
-    end: bool
-    blocker: Vehicle = None
-    enterLaneLinkTime: int
+    # Buffer flags and scalar values live in the engine's VehicleStore
+    def __init__(self):
+        self.drivable: Drivable | None = None
+        self.notifiedVehicles: List[Vehicle] = []
+        self.blocker: Vehicle | None = None
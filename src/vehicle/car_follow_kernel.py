@@ -0,0 +1,54 @@
+import numpy as np
+
+from src.vehicle.vehicle_store import VehicleStore
+
+
+def get_no_collision_speeds(vL: np.ndarray, dL: np.ndarray, vF: np.ndarray, dF: np.ndarray, gap: np.ndarray,
+                            interval: float, target_gap) -> np.ndarray:
+    c = vF * interval / 2 + target_gap - 0.5 * vL * vL / dL - gap
+    a = 0.5 / dF
+    b = 0.5 * interval
+    discriminant = b * b - 4 * a * c
+    valid = discriminant >= 0
+
+    v1 = 0.5 / a * (np.sqrt(np.where(valid, discriminant, 0)) - b)
+    v2 = 2 * vL - dL * interval + 2 * (gap - target_gap) / interval
+    return np.where(valid, np.minimum(v1, v2), -100)
+
+
+def get_car_follow_speeds(store: VehicleStore, slots: np.ndarray, interval: float) -> np.ndarray:
+    speed = store.speed[slots]
+    has_custom = store.is_custom_speed_set[slots]
+    custom = store.buffer_custom_speed[slots]
+    free_speed = np.where(has_custom, custom, store.max_speed[slots])
+
+    leader_slots = store.leader_slot[slots]
+    has_leader = leader_slots >= 0
+    if not has_leader.any():
+        return free_speed
+
+    leader_slots = np.where(has_leader, leader_slots, slots)
+    leader_speed = store.speed[leader_slots]
+    gap = store.gap[slots]
+
+    v = get_no_collision_speeds(leader_speed, store.max_neg_acc[leader_slots], speed, store.max_neg_acc[slots],
+                                gap, interval, 0)
+    custom_follow = np.minimum(custom, v)
+
+    assume_decel = np.maximum(speed - leader_speed, 0)
+    v = np.minimum(v, get_no_collision_speeds(leader_speed, store.usual_neg_acc[leader_slots], speed,
+                                              store.usual_neg_acc[slots], gap, interval, store.min_gap[slots]))
+    v = np.minimum(v, (gap + (leader_speed + assume_decel / 2) * interval - speed * interval / 2)
+                   / (store.headway_time[slots] + interval / 2))
+
+    follow = np.where(has_custom, custom_follow, v)
+    return np.where(has_leader, follow, free_speed)
+
+
+def get_next_speeds(store: VehicleStore, slots: np.ndarray, drivable_max_speed: np.ndarray,
+                    interval: float) -> np.ndarray:
+    speed = store.speed[slots]
+    v = np.minimum(store.max_speed[slots], speed + store.max_pos_acc[slots] * interval)
+    v = np.minimum(v, drivable_max_speed[store.drivable_index[slots]])
+    v = np.minimum(v, get_car_follow_speeds(store, slots, interval))
+    return np.maximum(v, speed - store.max_neg_acc[slots] * interval)
@@ -1,9 +1,13 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
 import sys
 from copy import copy
 
-from src.vehicle.signal import Signal
-from src.vehicle.vehicle import Vehicle
-from src.roadnet.lane import Lane
+if TYPE_CHECKING:
+    from src.roadnet.lane import Lane
+    from src.vehicle.signal import Signal
+    from src.vehicle.vehicle import Vehicle
 
 
 class LaneChange:
@@ -31,6 +35,7 @@ class LaneChange:
         self.last_change_time: float = 0 if other is None else other.last_change_time
 
     def update_leader_and_follower(self) -> None:
+        self.vehicle.mark_dirty()
         self.target_follower = None
         self.target_leader = None
         target: Lane = self.signal_send.target
@@ -80,6 +85,7 @@ class LaneChange:
 
         self.changing = True
         self.waiting_time = 0
+        self.vehicle.mark_dirty()
 
         assert self.vehicle.get_cur_drivable().is_lane()
         targetLane: Lane = self.signal_send.target
@@ -89,13 +95,15 @@ class LaneChange:
         shadow.set_parent(self.vehicle)
         self.vehicle.set_shadow(shadow)
 
-        shadow.controllerInfo.blocker = None
-        shadow.controllerInfo.drivable = targetLane
-        shadow.controllerInfo.router.update()
+        shadow.controller_info.blocker = None
+        shadow.set_cur_drivable(targetLane)
+        shadow.controller_info.router.update()
 
-        targetFollowerItr = [vehicle for vehicle in (self.target_follower.get_list_iterator() if self.target_follower else targetLane.get_vehicles())]
-        targetLane.get_vehicles().insert(targetFollowerItr, shadow)
-        targetSeg.insert_vehicle(targetLane.get_vehicles())
+        # The shadow goes right in front of its follower, or to the back of the lane
+        vehicles = targetLane.get_vehicles()
+        vehicles.insert(vehicles.index(self.target_follower) if self.target_follower else len(vehicles), shadow)
+        targetLane.dirty = True
+        targetSeg.insert_vehicle(shadow)
 
         shadow.update_leader_and_gap(self.target_leader)
         if self.target_follower:
@@ -123,22 +131,25 @@ class LaneChange:
         self.changing = False
         self.finished = True
         self.last_change_time = self.vehicle.engine.get_current_time()
+        self.vehicle.mark_dirty()
         partner = self.vehicle.get_partner()
-        if partner.is_real():
+        if not partner.is_real():
             partner.set_id(self.vehicle.get_id())
 
         partner.lane_change_info.partnerType = 0
-        partner.lane_change_info.offset = 0
+        partner.set_offset(0)
         partner.lane_change_info.partner = None
         self.vehicle.lane_change_info.partner = None
         self.clear_signal()
 
     def abort_changing(self) -> None:
         partner = self.vehicle.get_partner()
+        partner.mark_dirty()
+        self.vehicle.mark_dirty()
         partner.lane_change.changing = False
-        partner.lane_change.partnerType = 0
-        partner.lane_change.offset = 0
-        partner.lane_change.partner = None
+        partner.lane_change_info.partnerType = 0
+        partner.set_offset(0)
+        partner.lane_change_info.partner = None
         self.clear_signal()
 
     def yield_speed(self, interval):
@@ -147,8 +158,15 @@ class LaneChange:
     def send_signal(self):
         raise NotImplementedError
 
+    def make_signal(self, interval: float) -> None:
+        if self.changing:
+            return
+        if self.signal_send is not None:
+            self.signal_send.direction = self.get_direction()
+            self.vehicle.mark_dirty()
+
     def get_direction(self) -> int:
-        if self.vehicle.get_cur_drivable().is_lane():
+        if not self.vehicle.get_cur_drivable().is_lane():
             return 0
 
         curLane: Lane = self.vehicle.get_cur_drivable()
@@ -167,6 +185,11 @@ class LaneChange:
         return 0
 
     def clear_signal(self):
+        # Runs for every vehicle each step, so an idle vehicle is left clean
+        if self.signal_send is None and self.signal_recv is None and self.target_leader is None \
+                and self.target_follower is None and self.last_dir == 0:
+            return
+        self.vehicle.mark_dirty()
         self.target_leader = None
         self.target_follower = None
         if self.signal_send is not None:
@@ -0,0 +1,51 @@
+import threading
+from collections import OrderedDict
+from typing import List, Tuple
+
+from src.vehicle.router_type import RouterType
+
+
+class RouteCache:
+    def __init__(self, capacity: int = 4096):
+        self.capacity: int = capacity
+        self.entries: OrderedDict[Tuple, Tuple[bool, Tuple]] = OrderedDict()
+        self.hits: int = 0
+        self.misses: int = 0
+        # Routes are planned from every worker thread
+        self.lock: threading.Lock = threading.Lock()
+
+    @staticmethod
+    def make_key(anchor_points: List, router_type: RouterType, max_speed: float) -> Tuple:
+        # Duration routes fall back to the vehicle's max speed on roads without history, so it is part of the key
+        return tuple(anchor_points), router_type, max_speed if router_type == RouterType.DURATION else None
+
+    def get(self, key: Tuple) -> Tuple[bool, Tuple] | None:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: Tuple, success: bool, route: List) -> None:
+        if self.capacity <= 0:
+            return
+        with self.lock:
+            self.entries[key] = (success, tuple(route))
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.capacity:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, router_type: RouterType | None = None) -> None:
+        # Length routes only change with the roadnet; duration routes change whenever lane history does
+        with self.lock:
+            if router_type is None:
+                self.entries.clear()
+                return
+            for key in [key for key in self.entries if key[1] == router_type]:
+                del self.entries[key]
+
+    def __len__(self) -> int:
+        return len(self.entries)
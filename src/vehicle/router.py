@@ -1,29 +1,34 @@
-import heapq
+from __future__ import annotations
+
 import sys
 from collections import deque
-from random import Random
-from typing import List, Deque
-
-from src.flow.route import Route
-from src.roadnet.drivable import Drivable
-from src.roadnet.lane import Lane
-from src.roadnet.lane_link import LaneLink
-from src.roadnet.road import Road
+from typing import TYPE_CHECKING, Callable, Deque, List
+
+from src.vehicle.route_cache import RouteCache
 from src.vehicle.router_type import RouterType
-from src.vehicle.vehicle import Vehicle
+
+if TYPE_CHECKING:
+    from src.flow.route import Route
+    from src.roadnet.drivable import Drivable
+    from src.roadnet.lane import Lane
+    from src.roadnet.lane_link import LaneLink
+    from src.roadnet.road import Road
+    from src.roadnet.road_graph import RoadGraph
+    from src.vehicle.vehicle import Vehicle
 
 
 class Router:
-    def __init__(self, other: 'Router' = None, vehicle: Vehicle = None, route: Route = None, rnd: Random = None):
+    def __init__(self, other: 'Router' = None, vehicle: Vehicle = None, route: Route = None,
+                 rnd: Callable[[], int] = None):
         if other:
             self.vehicle: Vehicle = other.vehicle
             self.route: List[Road] = other.route
-            self.anchor_points: List[Road] = self.anchor_points
-            self.rnd: Random = other.rnd
+            self.anchor_points: List[Road] = other.anchor_points
+            self.rnd: Callable[[], int] = other.rnd
         else:
             self.vehicle: Vehicle = vehicle
             self.anchor_points: List[Road] = route.get_route()
-            self.rnd: Random = rnd
+            self.rnd: Callable[[], int] = rnd
             assert len(self.anchor_points) > 0
             self.route = route.get_route()
 
@@ -58,6 +63,7 @@ class Router:
                     else self.vehicle.get_cur_drivable()
                 )
                 self.planned.append(ret)
+                self.vehicle.mark_dirty()
                 return ret
         else:
             if curr_drivable.is_lane_link():
@@ -65,23 +71,21 @@ class Router:
                 return curr_drivable.get_end_lane()
             else:
                 cur_lane: Lane = curr_drivable
-                tmpCurRoad: Road = self.i_cur_road
-
-                while tmpCurRoad is not cur_lane.belong_road and tmpCurRoad is not self.route[-1]:
-                    tmpCurRoad = self.route[self.route.index(tmpCurRoad) + 1]
+                index = self.route.index(self.i_cur_road)
+                while index < len(self.route) and self.route[index] is not cur_lane.belong_road:
+                    index += 1
 
-                assert (tmpCurRoad is not self.route[-1] and cur_lane.belong_road == tmpCurRoad)
-
-                if tmpCurRoad == self.route[-2]:
+                assert index < len(self.route)
+                if index == len(self.route) - 1:
                     return None
-                elif tmpCurRoad == self.route[-3]:
-                    lane_links = cur_lane.get_lane_links_to_road(self.route[self.route.index(self.i_cur_road) + 1])
+
+                lane_links = cur_lane.get_lane_links_to_road(self.route[index + 1])
+                if index == len(self.route) - 2:
                     return self.select_lane_link(cur_lane, lane_links)
-                else:
-                    lane_links = cur_lane.get_lane_links_to_road(self.route[self.route.index(self.i_cur_road) + 1])
-                    candidateLaneLinks = [a for a in lane_links if len(a.get_end_lane().get_lane_links_to_road(
-                        self.route[self.route.index(tmpCurRoad) + 2])) > 0]
-                    return self.select_lane_link(cur_lane, candidateLaneLinks)
+
+                candidateLaneLinks = [a for a in lane_links
+                                      if len(a.get_end_lane().get_lane_links_to_road(self.route[index + 2])) > 0]
+                return self.select_lane_link(cur_lane, candidateLaneLinks)
 
     def update(self) -> None:
         cur_drivable = self.vehicle.get_cur_drivable()
@@ -92,7 +96,10 @@ class Router:
                 self.i_cur_road = self.route[self.route.index(self.i_cur_road) + 1]
             assert self.route.index(self.i_cur_road) < len(self.route)
 
-        self.planned = [drivable for drivable in self.planned if drivable == cur_drivable]
+        # Drop the planned drivables up to and including the one the vehicle has just entered
+        planned = list(self.planned)
+        self.planned = deque(planned[planned.index(cur_drivable) + 1:] if cur_drivable in planned else [])
+        self.vehicle.mark_dirty()
 
     def is_last_road(self, drivable: Drivable) -> bool:
         if drivable.is_lane_link():
@@ -103,7 +110,7 @@ class Router:
         return self.is_last_road(self.vehicle.get_cur_drivable())
 
     def on_valid_lane(self) -> bool:
-        return (self.get_next_drivable() is None and self.on_last_road() is False) is False
+        return not (self.get_next_drivable(0) is None and not self.on_last_road())
 
     def get_valid_lane(self, cur_lane: Lane) -> Lane | None:
         if self.is_last_road(cur_lane):
@@ -111,6 +118,7 @@ class Router:
 
         next_road: Road = self.i_cur_road
         self.i_cur_road = self.route[self.route.index(self.i_cur_road) + 1]
+        self.vehicle.mark_dirty()
         min_diff: int = len(cur_lane.belong_road.get_lanes())
 
         chosen: Lane
@@ -127,70 +135,57 @@ class Router:
         self.vehicle = vehicle
 
     def dijkstra(self, start: Road, end: Road, buffer: List[Road]) -> bool:
-        dis = {start: 0}
-        from_road = {}
-        visited = set()
-        success = False
-
-        queue = []
-        heapq.heappush(queue, (0, start))  # Priority queue with (distance, road)
-
-        while queue:
-            cur_dis, cur_road = heapq.heappop(queue)
-            if cur_road == end:
-                success = True
-                break
-
-            if cur_road in visited:
-                continue
-            visited.add(cur_road)
-
-            for adj_road in cur_road.get_end_intersection().get_roads():
-                if not cur_road.connected_to_road(adj_road):
-                    continue
+        graph: RoadGraph = self.vehicle.engine.road_net.get_road_graph()
+        if self.type == RouterType.LENGTH:
+            path = self.vehicle.engine.routing_engine.shortest_length_path(start.index, end.index)
+        elif self.type == RouterType.DURATION:
+            path = graph.shortest_path(start.index, end.index, graph.get_duration_weights(self.vehicle.get_max_speed()))
+        else:
+            path = graph.shortest_path(start.index, end.index, [0.0] * len(graph))
 
-                new_dis = cur_dis
-                if self.type == RouterType.LENGTH:
-                    new_dis += adj_road.average_length()
-                elif self.type == RouterType.DURATION:
-                    avg_dur = adj_road.get_average_duration()
-                    if avg_dur < 0:
-                        avg_dur = adj_road.get_length() / self.vehicle.get_max_speed()
-                    new_dis += avg_dur
+        if path is None:
+            buffer.append(start)
+            return False
 
-                if adj_road not in dis or new_dis < dis[adj_road]:
-                    from_road[adj_road] = cur_road
-                    dis[adj_road] = new_dis
-                    heapq.heappush(queue, (new_dis, adj_road))
+        # The start road is already the last road of the buffer
+        buffer.extend(graph.roads[index] for index in path[1:])
+        return True
 
-        path = []
-        iter_road = end
-        while iter_road != start and iter_road in from_road:
-            path.append(iter_road)
-            iter_road = from_road[iter_road]
-        path.append(start)
+    def update_shortest_path(self) -> bool:
+        self.planned.clear()
+        self.vehicle.mark_dirty()
+
+        cache: RouteCache | None = self.vehicle.engine.route_cache
+        key = RouteCache.make_key(self.anchor_points, self.type,
+                                  self.vehicle.get_max_speed() if self.type == RouterType.DURATION else 0)
+        cached = cache.get(key) if cache is not None else None
+        if cached is not None:
+            success, route = cached
+            self.route = list(route)
+        else:
+            # A fresh list, since a router built from a Route starts with route and anchor_points sharing one
+            self.route = []
+            success = self.find_route(self.route)
+            if cache is not None:
+                cache.put(key, success, self.route)
 
-        buffer.extend(list(reversed(path)))
+        if not success:
+            return False
 
-        return success
+        self.i_cur_road = self.route[0]
+        return True
 
-    def update_shortest_path(self) -> bool:
-        self.planned.clear()
-        self.route.clear()
-        self.route.append(self.anchor_points[0])
+    def find_route(self, route: List[Road]) -> bool:
+        route.append(self.anchor_points[0])
 
         for i in range(1, len(self.anchor_points)):
             if self.anchor_points[i - 1] == self.anchor_points[i]:
                 continue
 
-            if self.dijkstra(self.anchor_points[i - 1], self.anchor_points[i], self.route) is False:
+            if self.dijkstra(self.anchor_points[i - 1], self.anchor_points[i], route) is False:
                 return False
 
-        if len(self.route) <= 1:
-            return False
-
-        self.i_cur_road = self.route[0]
-        return True
+        return len(route) > 1
 
     def set_route(self, anchor: List[Road]) -> bool:
         if self.vehicle.get_cur_drivable().is_lane_link():
@@ -211,6 +206,7 @@ class Router:
         self.route = backup_route
 
         self.planned.clear()
+        self.vehicle.mark_dirty()
         self.i_cur_road = next((i for i, road in enumerate(self.route) if road == cur_road), len(self.route))
         return False
 
@@ -221,12 +217,12 @@ class Router:
         return lane_links[self.select_lane_index(cur_lane, [x.get_end_lane() for x in lane_links])]
 
     def get_following_roads(self) -> List[Road]:
-        return self.route[self.i_cur_road:]
+        return self.route[self.route.index(self.i_cur_road):]
 
     def select_lane_index(self, cur_lane: Lane, lanes: List[Lane]) -> int:
         assert len(lanes) > 0
         if cur_lane is None:
-            return self.rnd.randint(0, len(lanes) - 1)
+            return self.rnd() % len(lanes)
 
         lane_diff: int = sys.maxsize
         selected: int = -1
@@ -1,5 +1,10 @@
-from src.roadnet.lane import Lane
-from src.vehicle.vehicle import Vehicle
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from src.roadnet.lane import Lane
+    from src.vehicle.vehicle import Vehicle
 
 
 class Signal:
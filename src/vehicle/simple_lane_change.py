@@ -1,8 +1,13 @@
-from src.roadnet.lane import Lane
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
 from src.vehicle.lane_change import LaneChange
-from src.vehicle.router import Router
 from src.vehicle.signal import Signal
-from src.vehicle.vehicle import Vehicle
+
+if TYPE_CHECKING:
+    from src.roadnet.lane import Lane
+    from src.vehicle.router import Router
+    from src.vehicle.vehicle import Vehicle
 
 
 class SimpleLaneChange(LaneChange):
@@ -15,6 +20,7 @@ class SimpleLaneChange(LaneChange):
 
         self.signal_send = Signal()
         self.signal_send.source = self.vehicle
+        self.vehicle.mark_dirty()
 
         if self.vehicle.get_cur_drivable().is_lane():
             curLane: Lane = self.vehicle.get_cur_drivable()
@@ -42,7 +48,7 @@ class SimpleLaneChange(LaneChange):
 
             self.signal_send.urgency = 1
 
-        self.make_signal(interval)
+        super().make_signal(interval)
 
     def estimate_gap(self, lane: Lane) -> float:
         curSegIndex: int = self.vehicle.get_segment_index()
@@ -55,6 +61,7 @@ class SimpleLaneChange(LaneChange):
     def yield_speed(self, interval: float) -> float:
         if self.plan_change():
             self.waiting_time += interval
+            self.vehicle.mark_dirty()
 
         if self.signal_recv:
             if self.vehicle == self.signal_recv.source.get_target_leader():
@@ -85,7 +92,7 @@ class SimpleLaneChange(LaneChange):
             self.target_follower.receive_signal(self.vehicle)
 
     def safe_gap_before(self) -> float:
-        return self.target_follower.getMinBrakeDistance() if self.target_follower is not None else 0
+        return self.target_follower.get_min_brake_distance() if self.target_follower is not None else 0
 
     def safe_gap_after(self) -> float:
-        return self.vehicle.getMinBrakeDistance()
+        return self.vehicle.get_min_brake_distance()
@@ -1,22 +1,28 @@
+from __future__ import annotations
+
 import math
-from typing import List, Dict
-
-from src.engine.engine import Engine
-from src.flow.flow import Flow
-from src.roadnet.lane import Lane
-from src.roadnet.lane_link import LaneLink
-from src.roadnet.road import Road
-from src.roadnet.segment import Segment
+from copy import copy
+from typing import TYPE_CHECKING, Dict, List
+
 from src.utility.control_info import ControlInfo
 from src.utility.utility import min2double, Point, max2double
 from src.vehicle.buffer import Buffer
 from src.vehicle.controller_info import ControllerInfo
-from src.vehicle.lane_change import LaneChange
 from src.vehicle.lane_change_info import LaneChangeInfo
-from src.vehicle.signal import Signal
 from src.vehicle.simple_lane_change import SimpleLaneChange
-from src.vehicle.vehicle_info import VehicleInfo
-from src.roadnet.drivable import Drivable
+
+if TYPE_CHECKING:
+    from src.engine.engine import Engine
+    from src.flow.flow import Flow
+    from src.roadnet.drivable import Drivable
+    from src.roadnet.lane import Lane
+    from src.roadnet.lane_link import LaneLink
+    from src.roadnet.road import Road
+    from src.roadnet.segment import Segment
+    from src.vehicle.lane_change import LaneChange
+    from src.vehicle.signal import Signal
+    from src.vehicle.vehicle_info import VehicleInfo
+    from src.vehicle.vehicle_store import VehicleStore
 
 
 class Vehicle:
@@ -26,137 +32,185 @@ class Vehicle:
                  id: str = None,
                  engine: Engine = None,
                  flow: Flow = None):
-        self.controllerInfo: ControllerInfo = None
         self.lane_change: SimpleLaneChange | None = None
         if vehicle is not None and vehicle_info is None:
             # Acting as the copy constructor
             self.vehicle_info = vehicle.vehicle_info
             self.controller_info = ControllerInfo(self, other=vehicle.controller_info)
-            self.lane_change_info = vehicle.lane_change_info
-            self.buffer: Buffer = vehicle.buffer
+            self.lane_change_info: LaneChangeInfo = copy(vehicle.lane_change_info)
+            self.buffer: Buffer = copy(vehicle.buffer)
+            self.buffer.notifiedVehicles = list(vehicle.buffer.notifiedVehicles)
             self.priority = vehicle.priority
             self.id = vehicle.id if id is None else id
             self.engine: Engine = vehicle.engine if engine is None else engine
-            self.lane_change = SimpleLaneChange(self, vehicle.lane_change)  # Assuming SimpleLaneChange class exists
+            self.store: VehicleStore = self.engine.vehicle_store
+            self.slot: int = self.store.allocate_copy(self, vehicle.slot)
+            self.lane_change = SimpleLaneChange(self, vehicle.lane_change)
             self.flow = flow
             self.enter_time = vehicle.enter_time
+            self.route_valid = vehicle.route_valid
 
-            if id is not None:
-                while self.engine.check_priority():
-                    self.priority = self.engine.rnd()  # Assuming rnd method in engine returns a random number
-                self.controller_info.router.set_vehicle(self)
+            while self.engine.check_priority(self.priority):
+                self.priority = self.engine.rnd()
+            self.controller_info.router.set_vehicle(self)
 
         elif vehicle_info is not None:
             # Acting as the constructor with VehicleInfo
             self.vehicle_info = vehicle_info
-            self.controller_info: ControllerInfo = ControllerInfo(self, route=vehicle_info.route, rnd=engine.rnd)
             self.id = id
             self.engine: Engine = engine
-            self.lane_change: SimpleLaneChange = SimpleLaneChange(self)  # Assuming SimpleLaneChange class exists
+            self.controller_info: ControllerInfo = ControllerInfo(self, route=vehicle_info.route, rnd=engine.rnd)
+            self.lane_change_info: LaneChangeInfo = LaneChangeInfo(self)
+            self.store: VehicleStore = engine.vehicle_store
+            self.slot: int = self.store.allocate(self, vehicle_info)
+            self.buffer: Buffer = Buffer()
+            self.lane_change: SimpleLaneChange = SimpleLaneChange(self)
             self.flow = flow
-            self.controller_info.approaching_intersection_distance = \
+            self.store.approaching_intersection_distance[self.slot] = \
                 vehicle_info.max_speed ** 2 / vehicle_info.usual_neg_acc / 2 + \
                 vehicle_info.max_speed * engine.get_interval() * 2
-            while self.engine.check_priority():
-                self.priority = self.engine.rnd()
+            self.priority = self.engine.rnd()
             self.enter_time = self.engine.get_current_time()
-
-        self.route_valid = False
-        self.lane_change_info: LaneChangeInfo = None  # Init
+            self.route_valid = False
+
+    @classmethod
+    def restored(cls, vehicle_info: VehicleInfo, id: str, engine: Engine, flow: Flow | None, slot: int,
+                 priority: int, enter_time: float) -> 'Vehicle':
+        # Rebuilds a vehicle around a slot that a snapshot restore fills in, so nothing is allocated in the
+        # store and no priority is drawn from the engine's generator
+        vehicle = cls.__new__(cls)
+        vehicle.vehicle_info = vehicle_info
+        vehicle.id = id
+        vehicle.engine = engine
+        vehicle.controller_info = ControllerInfo(vehicle, route=vehicle_info.route, rnd=engine.rnd)
+        vehicle.lane_change_info = LaneChangeInfo(vehicle)
+        vehicle.store = engine.vehicle_store
+        vehicle.slot = slot
+        vehicle.buffer = Buffer()
+        vehicle.lane_change = SimpleLaneChange(vehicle)
+        vehicle.flow = flow
+        vehicle.priority = priority
+        vehicle.enter_time = enter_time
+        vehicle.route_valid = False
+        return vehicle
 
     def set_delta_distance(self, dis: float) -> None:
-        if self.buffer.isDisSet or dis < self.buffer.deltaDis:
+        if not self.store.is_dis_set[self.slot] or dis < self.store.buffer_delta_dis[self.slot]:
             self.un_set_end()
             self.un_set_drivable()
-            self.buffer.deltaDis = dis
-            dis = dis + self.controller_info.dis
+            if self.store.buffer_delta_dis[self.slot] != dis:
+                self.store.buffer_delta_dis[self.slot] = dis
+                self.store.dirty[self.slot] = True
+            dis = dis + self.store.dis[self.slot]
             drivable: Drivable = self.get_cur_drivable()
-            for i in range(drivable.get_length()):
+            i = 0
+            while drivable is not None and dis > drivable.get_length():
                 dis -= drivable.get_length()
-                nextDrivable = self.controller_info.router.get_next_drivable(i=i)
-                if nextDrivable is None:
+                next_drivable = self.controller_info.router.get_next_drivable(i=i)
+                if next_drivable is None:
                     assert (self.controller_info.router.is_last_road(drivable))
                     self.set_end(True)
 
-                drivable = nextDrivable
+                drivable = next_drivable
                 self.set_drivable(drivable)
+                i += 1
 
             self.set_dis(dis)
 
     def get_point(self) -> Point:
-        if math.fabs(self.lane_change_info.offset) < Point.eps or self.controller_info.drivable.is_lane():
-            return self.controller_info.drivable.get_point_by_distance(self.controller_info.dis);
+        if math.fabs(self.store.offset[self.slot]) < Point.eps or not self.controller_info.drivable.is_lane():
+            return self.controller_info.drivable.get_point_by_distance(self.store.dis[self.slot]);
         else:
             assert self.controller_info.drivable.is_lane()
             lane: Lane = self.controller_info.drivable
 
-            origin = lane.get_point_by_distance(self.controller_info.dis)
+            origin = lane.get_point_by_distance(self.store.dis[self.slot])
             next_point: Point
             percentage: float
             lanes = lane.belong_road.get_lanes()
 
-            if self.lane_change_info.offset > 0:
-                next_point = lanes[lane.lane_index + 1].get_point_by_distance(self.controller_info.dis)
-                percentage = 2 * self.lane_change_info.offset / lane.get_width() + lanes[
-                    lane.lane_index + 1].get_width()
+            if self.store.offset[self.slot] > 0:
+                next_point = lanes[lane.lane_index + 1].get_point_by_distance(self.store.dis[self.slot])
+                percentage = 2 * self.store.offset[self.slot] / (
+                        lane.get_width() + lanes[lane.lane_index + 1].get_width())
             else:
-                next_point = lanes[lane.lane_index - 1].get_point_by_distance(self.controller_info.dis)
-                percentage = -2 * self.lane_change_info.offset / (
-                        lane.get_width() + lanes[lane.lane_index - 1].getWidth())
+                next_point = lanes[lane.lane_index - 1].get_point_by_distance(self.store.dis[self.slot])
+                percentage = -2 * self.store.offset[self.slot] / (
+                        lane.get_width() + lanes[lane.lane_index - 1].get_width())
 
             return Point(next_point.x * percentage + origin.x * (1 - percentage),
                          next_point.y * percentage + origin.y * (1 - percentage))
 
     def update(self) -> None:
-        if self.buffer.isEndSet:
-            self.controller_info.end = self.buffer.end
-            self.buffer.isEndSet = False
-
-        if self.buffer.isDisSet:
-            self.controller_info.dis = self.buffer.dis
-            self.buffer.isDisSet = False
-
-        if self.buffer.isSpeedSet:
-            self.vehicle_info.speed = self.buffer.speed
-            self.buffer.isSpeedSet = False
-
-        if self.buffer.isCustomSpeedSet:
-            self.buffer.isCustomSpeedSet = False
-
-        if self.buffer.isDrivableSet:
+        # Stopped vehicles rewrite the same values every step and stay clean for incremental snapshots
+        dirty = False
+        if self.store.is_end_set[self.slot]:
+            self.store.end[self.slot] = self.store.buffer_end[self.slot]
+            self.store.is_end_set[self.slot] = False
+            dirty = True
+
+        if self.store.is_dis_set[self.slot]:
+            dirty = dirty or self.store.dis[self.slot] != self.store.buffer_dis[self.slot]
+            self.store.dis[self.slot] = self.store.buffer_dis[self.slot]
+            self.store.is_dis_set[self.slot] = False
+
+        if self.store.is_speed_set[self.slot]:
+            dirty = dirty or self.store.speed[self.slot] != self.store.buffer_speed[self.slot]
+            self.store.speed[self.slot] = self.store.buffer_speed[self.slot]
+            self.store.is_speed_set[self.slot] = False
+
+        if self.store.is_custom_speed_set[self.slot]:
+            self.store.is_custom_speed_set[self.slot] = False
+            dirty = True
+
+        if self.store.is_drivable_set[self.slot]:
+            dirty = True
             self.controller_info.prevDrivable = self.controller_info.drivable
             self.controller_info.drivable = self.buffer.drivable
-            self.buffer.isDrivableSet = False
+            self.store.prev_drivable_index[self.slot] = self.store.drivable_index[self.slot]
+            self.store.drivable_index[self.slot] = self.buffer.drivable.index
+            self.store.is_drivable_set[self.slot] = False
             self.controller_info.router.update()
 
-        if self.buffer.isEnterLaneLinkTimeSet:
-            self.controller_info.enterLaneLinkTime = self.buffer.enterLaneLinkTime
-            self.buffer.isEnterLaneLinkTimeSet = False
+        if self.store.is_enter_lane_link_time_set[self.slot]:
+            self.store.enter_lane_link_time[self.slot] = self.store.buffer_enter_lane_link_time[self.slot]
+            self.store.is_enter_lane_link_time_set[self.slot] = False
+            dirty = True
 
-        if self.buffer.isBlockerSet:
+        if self.store.is_blocker_set[self.slot]:
+            dirty = dirty or self.controller_info.blocker is not self.buffer.blocker
             self.controller_info.blocker = self.buffer.blocker
-            self.buffer.isBlockerSet = False
+            self.store.is_blocker_set[self.slot] = False
         else:
+            dirty = dirty or self.controller_info.blocker is not None
             self.controller_info.blocker = None
 
-        if self.buffer.isNotifiedVehicles:
+        if dirty:
+            self.store.dirty[self.slot] = True
+
+        if self.store.is_notified_vehicles[self.slot]:
             self.buffer.notifiedVehicles.clear()
-            self.buffer.isNotifiedVehicles = False
+            self.store.is_notified_vehicles[self.slot] = False
 
     def get_distance(self) -> float:
-        return self.controller_info.dis
+        return self.store.dis[self.slot]
 
     def set_segment_index(self, segment_index: int) -> None:
-        self.lane_change_info.segmentIndex = segment_index
+        if self.store.segment_index[self.slot] != segment_index:
+            self.store.segment_index[self.slot] = segment_index
+            self.store.dirty[self.slot] = True
 
     def get_len(self) -> float:
-        return self.vehicle_info.len
+        return self.store.len[self.slot]
+
+    def get_width(self) -> float:
+        return self.store.width[self.slot]
 
     def get_speed(self) -> float:
-        return self.vehicle_info.speed
+        return self.store.speed[self.slot]
 
     def get_enter_lane_link_time(self) -> float:
-        return self.controller_info.enterLaneLinkTime
+        return self.store.enter_lane_link_time[self.slot]
 
     def get_priority(self) -> int:
         return self.priority
@@ -168,10 +222,10 @@ class Vehicle:
         self.priority = priority
 
     def get_segment_index(self) -> int:
-        return self.lane_change_info.segmentIndex
+        return self.store.segment_index[self.slot]
 
     def get_offset(self) -> float:
-        return self.lane_change_info.offset
+        return self.store.offset[self.slot]
 
     def get_list_iterator(self) -> List['Vehicle']:
         assert self.get_cur_drivable().is_lane()
@@ -181,22 +235,33 @@ class Vehicle:
     def set_shadow(self, shadow: 'Vehicle') -> None:
         self.lane_change_info.partnerType = 1
         self.lane_change_info.partner = shadow
+        self.mark_dirty()
 
     def set_parent(self, vehicle: 'Vehicle'):
         self.lane_change_info.partnerType = 2
         self.lane_change_info.partner = vehicle
+        self.mark_dirty()
 
     def update_leader_and_gap(self, leader: 'Vehicle') -> None:
+        gap = self.store.gap[self.slot]
+        self.search_leader_and_gap(leader)
+        leader = self.controller_info.leader
+        leader_slot = leader.slot if leader is not None else -1
+        if leader_slot != self.store.leader_slot[self.slot] or gap != self.store.gap[self.slot]:
+            self.store.leader_slot[self.slot] = leader_slot
+            self.store.dirty[self.slot] = True
+
+    def search_leader_and_gap(self, leader: 'Vehicle') -> None:
         if leader is not None and leader.get_cur_drivable() == self.get_cur_drivable():
             self.controller_info.leader = leader
-            self.controller_info.gap = leader.get_distance() - leader.get_len() - self.controller_info.dis
+            self.store.gap[self.slot] = leader.get_distance() - leader.get_len() - self.store.dis[self.slot]
         else:
             self.controller_info.leader = None
-            dis = self.controller_info.drivable.get_length() - self.controller_info.dis
+            dis = self.controller_info.drivable.get_length() - self.store.dis[self.slot]
             i = 0
             while True:
-                i += 1
                 drivable = self.get_next_drivable(i)
+                i += 1
                 if drivable is None:
                     return
 
@@ -205,32 +270,32 @@ class Vehicle:
                         candidateLeader = lane_link.get_last_vehicle()
                         if candidateLeader is not None:
                             candidateGap = dis + candidateLeader.get_distance() - candidateLeader.get_len()
-                            if self.controller_info.leader is None or candidateGap < self.controller_info.gap:
+                            if self.controller_info.leader is None or candidateGap < self.store.gap[self.slot]:
                                 self.controller_info.leader = candidateLeader;
-                                self.controller_info.gap = candidateGap;
+                                self.store.gap[self.slot] = candidateGap;
                     if self.controller_info.leader:
                         return
                 else:
                     self.controller_info.leader = drivable.get_last_vehicle()
                     if self.controller_info.leader is not None:
-                        self.controller_info.gap = (dis + self.controller_info.leader.get_distance()
+                        self.store.gap[self.slot] = (dis + self.controller_info.leader.get_distance()
                                                     - self.controller_info.leader.get_len())
                         return
 
                 dis += drivable.get_length()
-                if (dis > self.vehicle_info.max_speed
-                        * self.vehicle_info.max_speed
-                        / self.vehicle_info.usual_neg_acc
+                if (dis > self.store.max_speed[self.slot]
+                        * self.store.max_speed[self.slot]
+                        / self.store.usual_neg_acc[self.slot]
                         / 2
-                        + self.vehicle_info.max_speed
+                        + self.store.max_speed[self.slot]
                         * self.engine.get_interval() * 2):
                     return
 
     def get_gap(self) -> float:
-        return self.controllerInfo.gap
+        return self.store.gap[self.slot]
 
     def get_max_speed(self) -> float:
-        return self.vehicle_info.max_speed
+        return self.store.max_speed[self.slot]
 
     def get_partner(self) -> 'Vehicle':
         return self.lane_change_info.partner
@@ -240,6 +305,7 @@ class Vehicle:
 
     def set_id(self, new_identifier: str):
         self.id = new_identifier
+        self.mark_dirty()
 
     def get_id(self):
         return self.id
@@ -263,77 +329,85 @@ class Vehicle:
     def get_car_follow_speed(self, interval: float) -> float:
         leader = self.get_leader()
         if leader is None:
-            return self.buffer.customSpeed if self.hasSetCustomSpeed() else self.vehicle_info.max_speed
+            return self.store.buffer_custom_speed[self.slot] if self.hasSetCustomSpeed() else self.store.max_speed[self.slot]
 
-        v = self.get_no_collision_speed(leader.get_speed(), leader.get_max_neg_acc(), self.vehicle_info.speed,
-                                        self.vehicle_info.max_neg_acc, self.controller_info.gap, interval, 0)
+        v = self.get_no_collision_speed(leader.get_speed(), leader.get_max_neg_acc(), self.store.speed[self.slot],
+                                        self.store.max_neg_acc[self.slot], self.store.gap[self.slot], interval, 0)
 
         if self.hasSetCustomSpeed():
-            return min2double(self.buffer.customSpeed, v)
+            return min2double(self.store.buffer_custom_speed[self.slot], v)
 
         assume_decel = 0.0
         leaderSpeed = leader.get_speed()
-        if self.vehicle_info.speed > leaderSpeed:
-            assume_decel = self.vehicle_info.speed - leaderSpeed
+        if self.store.speed[self.slot] > leaderSpeed:
+            assume_decel = self.store.speed[self.slot] - leaderSpeed
 
         v = min2double(v,
-                       self.get_no_collision_speed(leader.get_speed(), leader.getUsualNegAcc(), self.vehicle_info.speed,
-                                                   self.vehicle_info.usual_neg_acc, self.controller_info.gap, interval,
-                                                   self.vehicle_info.min_gap))
+                       self.get_no_collision_speed(leader.get_speed(), leader.getUsualNegAcc(), self.store.speed[self.slot],
+                                                   self.store.usual_neg_acc[self.slot], self.store.gap[self.slot], interval,
+                                                   self.store.min_gap[self.slot]))
         v = min2double(v,
-                       (self.controller_info.gap + (leaderSpeed + assume_decel / 2) * interval -
-                        self.vehicle_info.speed * interval / 2) / (self.vehicle_info.headway_time + interval / 2))
+                       (self.store.gap[self.slot] + (leaderSpeed + assume_decel / 2) * interval -
+                        self.store.speed[self.slot] * interval / 2) / (self.store.headway_time[self.slot] + interval / 2))
 
         return v
 
     def get_stop_before_speed(self, distance: float, interval: float) -> float:
         assert (distance >= 0);
         if self.get_brake_distance_after_accel(
-                self.vehicle_info.usual_pos_acc,
-                self.vehicle_info.usual_neg_acc, interval) < distance:
-            return self.vehicle_info.speed + self.vehicle_info.usual_pos_acc * interval
+                self.store.usual_pos_acc[self.slot],
+                self.store.usual_neg_acc[self.slot], interval) < distance:
+            return self.store.speed[self.slot] + self.store.usual_pos_acc[self.slot] * interval
 
-        take_interval = 2 * distance / (self.vehicle_info.speed.speed + Point.eps) / interval
+        take_interval = 2 * distance / (self.store.speed[self.slot] + Point.eps) / interval
         if take_interval >= 1:
-            return self.vehicle_info.speed - self.vehicle_info.speed / take_interval
+            return self.store.speed[self.slot] - self.store.speed[self.slot] / int(take_interval)
 
-        return self.vehicle_info.speed - self.vehicle_info.speed / take_interval
+        return self.store.speed[self.slot] - self.store.speed[self.slot] / take_interval
 
     def get_reach_steps(self, distance: float, target_speed: float, acc: float) -> int:
         if distance <= 0:
             return 0
 
-        if self.vehicle_info.speed > target_speed:
-            return math.ceil(distance / self.vehicle_info.speed)
+        if self.store.speed[self.slot] > target_speed:
+            return math.ceil(distance / self.store.speed[self.slot])
 
         distance_until_target_speed = self.get_distance_until_speed(target_speed, acc)
         interval = self.engine.get_interval()
         if distance_until_target_speed > distance:
             return math.ceil((math.sqrt(
-                self.vehicle_info.speed * self.vehicle_info.speed + 2 * acc * distance) - self.vehicle_info.speed) / acc / interval)
+                self.store.speed[self.slot] * self.store.speed[self.slot] + 2 * acc * distance) - self.store.speed[self.slot]) / acc / interval)
         else:
-            return math.ceil((target_speed - self.vehicle_info.speed) / acc / interval) + math.ceil(
+            return math.ceil((target_speed - self.store.speed[self.slot]) / acc / interval) + math.ceil(
                 (distance - distance_until_target_speed) / target_speed / interval)
 
     def get_reach_steps_on_lane_link(self, distance: float, lane_link: LaneLink) -> int:
         return self.get_reach_steps(distance,
-                                    self.vehicle_info.turn_speed if lane_link.is_turn() else self.vehicle_info.max_speed,
-                                    self.vehicle_info.usual_pos_acc)
+                                    self.store.turn_speed[self.slot] if lane_link.is_turn() else self.store.max_speed[self.slot],
+                                    self.store.usual_pos_acc[self.slot])
 
     def get_distance_until_speed(self, speed: float, acc: float) -> float:
-        if speed <= self.vehicle_info.speed:
+        if speed <= self.store.speed[self.slot]:
             return 0
 
         interval = self.engine.get_interval()
-        stage1steps = math.floor((speed - self.vehicle_info.speed) / acc / interval)
-        stage1speed = self.vehicle_info.speed + stage1steps * acc / interval
-        stage1dis = (self.vehicle_info.speed + stage1speed) * (stage1steps * interval) / 2
+        stage1steps = math.floor((speed - self.store.speed[self.slot]) / acc / interval)
+        stage1speed = self.store.speed[self.slot] + stage1steps * acc / interval
+        stage1dis = (self.store.speed[self.slot] + stage1speed) * (stage1steps * interval) / 2
 
         return stage1dis + (stage1speed + speed) * interval / 2 if stage1speed < speed else 0
 
     def can_yield(self, dist: float) -> bool:
-        return (dist > 0 and self.get_min_brake_distance() < dist - self.vehicle_info.yield_distance) or (
-                dist < 0 and dist + self.vehicle_info.len < 0)
+        return (dist > 0 and self.get_min_brake_distance() < dist - self.store.yield_distance[self.slot]) or (
+                dist < 0 and dist + self.store.len[self.slot] < 0)
+
+    def is_batch_controllable(self) -> bool:
+        if self.has_set_speed() or self.get_partner() is not None or self.is_intersection_related():
+            return False
+
+        return (self.lane_change.signal_recv is None
+                and not self.lane_change.plan_change()
+                and self.controller_info.router.on_valid_lane())
 
     def is_intersection_related(self) -> bool:
         if self.controller_info.drivable.is_lane_link():
@@ -341,16 +415,16 @@ class Vehicle:
         if self.controller_info.drivable.is_lane():
             drivable = self.get_next_drivable()
             if (
-                    drivable and drivable.is_lane_link() and self.controller_info.drivable.get_length() - self.controller_info.dis <=
-                    self.controller_info.approachingIntersectionDistance):
+                    drivable and drivable.is_lane_link() and self.controller_info.drivable.get_length() - self.store.dis[self.slot] <=
+                    self.store.approaching_intersection_distance[self.slot]):
                 return True
 
         return False
 
     def get_next_speed(self, interval: float) -> ControlInfo:
         drivable = self.controller_info.drivable
-        v = self.vehicle_info.max_speed
-        v = min2double(v, self.vehicle_info.speed + self.vehicle_info.max_pos_acc * interval)
+        v = self.store.max_speed[self.slot]
+        v = min2double(v, self.store.speed[self.slot] + self.store.max_pos_acc[self.slot] * interval)
         v = min2double(v, drivable.get_max_speed())
         v = min2double(v, self.get_car_follow_speed(interval))
 
@@ -365,49 +439,48 @@ class Vehicle:
                                                  self.get_min_gap())
                 v = min2double(v, vn)
 
-        v = max2double(v, self.vehicle_info.speed - self.vehicle_info.max_neg_acc * interval)
+        v = max2double(v, self.store.speed[self.slot] - self.store.max_neg_acc[self.slot] * interval)
         return ControlInfo(speed=v)
 
     def get_intersection_related_speed(self, interval: float) -> float:
-        v = self.vehicle_info.max_speed
+        v = self.store.max_speed[self.slot]
         next_drivable = self.get_next_drivable()
-        # const LaneLink *laneLink = nullptr;
+        laneLink: LaneLink | None = None
         if next_drivable and next_drivable.is_lane_link():
-            laneLink: LaneLink = next_drivable
-            if laneLink.is_available() is False or laneLink.get_end_lane().can_enter(self) is False:
-                if self.get_min_brake_distance() > self.controller_info.drivable.get_length() - self.controller_info.dis:
+            laneLink = next_drivable
+            if not laneLink.is_available() or not laneLink.get_end_lane().can_enter(self):
+                if self.get_min_brake_distance() > self.controller_info.drivable.get_length() - self.store.dis[self.slot]:
                     # TODO: what if it cannot brake before red light?
-                    print('')
+                    pass
                 else:
                     v = min2double(v, self.get_stop_before_speed(
-                        self.controller_info.drivable.get_length() - self.controller_info.dis, interval))
+                        self.controller_info.drivable.get_length() - self.store.dis[self.slot], interval))
                     return v
             if laneLink.is_turn():
-                v = min2double(v, self.vehicle_info.turn_speed)  # TODO define turn speed
+                v = min2double(v, self.store.turn_speed[self.slot])  # TODO define turn speed
 
         if laneLink is None and self.controller_info.drivable.is_lane_link():
-            laneLink: LaneLink = self.controller_info.drivable
+            laneLink = self.controller_info.drivable
 
-        self.controller_info.drivable.get_length()
-        distanceToLaneLinkStart = -(self.controller_info.drivable.get_length() - self.controller_info.dis) \
+        distanceToLaneLinkStart = -(self.controller_info.drivable.get_length() - self.store.dis[self.slot]) \
             if self.controller_info.drivable.is_lane() \
-            else self.controller_info.dis
+            else self.store.dis[self.slot]
 
         for cross in laneLink.get_crosses():
             distanceOnLaneLink = cross.get_safe_distance_by_lane(laneLink)
             if distanceOnLaneLink < distanceToLaneLinkStart:
                 continue
 
-            if cross.can_pass(self, laneLink, distanceToLaneLinkStart):
+            if not cross.can_pass(self, laneLink, distanceToLaneLinkStart):
                 v = min2double(v, self.get_stop_before_speed(
-                    distanceOnLaneLink - distanceToLaneLinkStart - self.vehicle_info.yield_distance, interval))
+                    distanceOnLaneLink - distanceToLaneLinkStart - self.store.yield_distance[self.slot], interval))
                 self.set_blocker(cross.get_foe_vehicle(laneLink))
                 break
 
         return v
 
     def get_max_neg_acc(self):
-        return self.vehicle_info.max_neg_acc
+        return self.store.max_neg_acc[self.slot]
 
     def receive_signal(self, sender: 'Vehicle') -> None:
         if self.lane_change.changing:
@@ -420,34 +493,35 @@ class Vehicle:
 
         if (signal_recv is None or curPriority < newPriority) and (signal_send is None or self.priority < newPriority):
             self.lane_change.signal_recv = sender.lane_change.signal_send
+            self.mark_dirty()
 
     def un_set_end(self):
-        self.buffer.isEndSet = False
+        self.store.is_end_set[self.slot] = False
 
     def un_set_drivable(self):
-        self.buffer.isDrivableSet = False
+        self.store.is_drivable_set[self.slot] = False
 
     def get_cur_drivable(self) -> Drivable:
         return self.controller_info.drivable
 
     def set_end(self, end: bool) -> None:
-        self.buffer.end = end
-        self.buffer.isEndSet = True
+        self.store.buffer_end[self.slot] = end
+        self.store.is_end_set[self.slot] = True
 
     def set_drivable(self, drivable: Drivable) -> None:
         self.buffer.drivable = drivable
-        self.buffer.isDrivableSet = True
+        self.store.is_drivable_set[self.slot] = True
 
     def set_dis(self, dis: float):
-        self.buffer.dis = dis
-        self.buffer.isDisSet = True
+        self.store.buffer_dis[self.slot] = dis
+        self.store.is_dis_set[self.slot] = True
 
     def set_speed(self, speed: float) -> None:
-        self.buffer.speed = speed
-        self.buffer.isSpeedSet = True
+        self.store.buffer_speed[self.slot] = speed
+        self.store.is_speed_set[self.slot] = True
 
     def get_changed_drivable(self) -> Drivable | None:
-        if self.buffer.isDrivableSet is False:
+        if not self.store.is_drivable_set[self.slot]:
             return None
         return self.buffer.drivable
 
@@ -458,25 +532,25 @@ class Vehicle:
         return self.controller_info.leader
 
     def hasSetCustomSpeed(self) -> bool:
-        return self.buffer.isCustomSpeedSet
+        return bool(self.store.is_custom_speed_set[self.slot])
 
     def getUsualNegAcc(self):
-        return self.vehicle_info.usual_neg_acc
+        return self.store.usual_neg_acc[self.slot]
 
     def get_brake_distance_after_accel(self, acc: float, dec: float, interval: float) -> float:
-        current_speed = self.vehicle_info.speed
+        current_speed = self.store.speed[self.slot]
         next_speed = current_speed + acc * interval
         return (current_speed + next_speed) * interval / 2 + (next_speed * next_speed / dec / 2)
 
     def get_min_brake_distance(self) -> float:
-        return 0.5 * self.vehicle_info.speed * self.vehicle_info.speed / self.vehicle_info.max_neg_acc
+        return 0.5 * self.store.speed[self.slot] * self.store.speed[self.slot] / self.store.max_neg_acc[self.slot]
 
     def set_blocker(self, blocker: 'Vehicle' | None) -> None:
         self.buffer.blocker = blocker
-        self.buffer.isBlockerSet = True
+        self.store.is_blocker_set[self.slot] = True
 
     def get_min_gap(self) -> float:
-        return self.vehicle_info.min_gap
+        return self.store.min_gap[self.slot]
 
     def finish_changing(self) -> None:
         self.lane_change.finish_changing()
@@ -491,7 +565,11 @@ class Vehicle:
         return self.controller_info.router.get_first_road()
 
     def set_first_drivable(self) -> None:
-        self.controller_info.drivable = self.controller_info.router.get_first_drivable()
+        self.set_cur_drivable(self.controller_info.router.get_first_drivable())
+
+    def set_cur_drivable(self, drivable: Drivable) -> None:
+        self.controller_info.drivable = drivable
+        self.store.drivable_index[self.slot] = drivable.index
 
     def update_route(self) -> None:
         self.route_valid = self.controller_info.router.update_shortest_path()
@@ -504,7 +582,7 @@ class Vehicle:
             "running": str(self.is_running())
         }
 
-        if self.is_running() is False:
+        if not self.is_running():
             return info
 
         drivable = self.get_cur_drivable()
@@ -522,26 +600,33 @@ class Vehicle:
         }
 
     def is_running(self) -> bool:
-        return self.controller_info.running
+        return bool(self.store.running[self.slot])
+
+    def last_lane_change_direction(self) -> int:
+        return self.lane_change.last_dir if self.lane_change.last_dir is not None else 0
+
+    def set_running(self, running: bool) -> None:
+        self.store.running[self.slot] = running
+        self.store.dirty[self.slot] = True
 
     def get_buffer_speed(self) -> float:
-        return self.buffer.speed
+        return self.store.buffer_speed[self.slot]
 
     def has_set_speed(self) -> bool:
-        return self.buffer.isSpeedSet
+        return bool(self.store.is_speed_set[self.slot])
 
     def has_set_end(self) -> bool:
-        return self.buffer.isEndSet
+        return bool(self.store.is_end_set[self.slot])
 
     def is_changing(self) -> bool:
         return self.lane_change.changing
 
     def get_lane_change_direction(self) -> int:
-        return self.lane_change.signal_send.direction if self.lane_change.signal_recv is not None else 0
+        return self.lane_change.get_direction()
 
     def get_max_offset(self) -> float:
-        target = self.lane_change.signal_send.target
-        return target.get_width() + self.get_cur_lane().get_width() / 2
+        target = self.lane_change.get_target()
+        return (target.get_width() + self.get_cur_lane().get_width()) / 2
 
     def get_cur_lane(self) -> Lane | None:
         if self.get_cur_drivable().is_lane():
@@ -549,13 +634,18 @@ class Vehicle:
         return None
 
     def set_offset(self, offset: float) -> None:
-        self.lane_change_info.offset = offset
+        self.store.offset[self.slot] = offset
+        self.store.dirty[self.slot] = True
+
+    def mark_dirty(self) -> None:
+        # Routing and lane change state live outside the store, so their writers flag the vehicle for snapshots
+        self.store.dirty[self.slot] = True
 
     def has_set_drivable(self) -> bool:
-        return self.buffer.isDrivableSet
+        return bool(self.store.is_drivable_set[self.slot])
 
     def get_buffer_dis(self) -> float:
-        return self.buffer.dis
+        return self.store.buffer_dis[self.slot]
 
     def get_prev_drivable(self) -> Drivable:
         return self.controller_info.prevDrivable
@@ -576,8 +666,8 @@ class Vehicle:
         return self.route_valid
 
     def set_enter_lane_link_time(self, enter_lane_link_time: int) -> None:
-        self.buffer.enterLaneLinkTime = enter_lane_link_time
-        self.buffer.isEnterLaneLinkTimeSet = True
+        self.store.buffer_enter_lane_link_time[self.slot] = enter_lane_link_time
+        self.store.is_enter_lane_link_time_set[self.slot] = True
 
     def lane_change_urgency(self) -> int:
         return self.lane_change.signal_send.urgency
@@ -598,6 +688,7 @@ class Vehicle:
         self.lane_change.insert_shadow(shadow=vehicle)
 
     def set_custom_speed(self, speed: float) -> None:
-        self.buffer.customSpeed = speed
-        self.buffer.isCustomSpeedSet = True
+        self.store.buffer_custom_speed[self.slot] = speed
+        self.store.is_custom_speed_set[self.slot] = True
+        self.store.dirty[self.slot] = True
 
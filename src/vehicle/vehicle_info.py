@@ -1,4 +1,9 @@
-from src.flow.route import Route
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from src.flow.route import Route
 
 
 class VehicleInfo:
@@ -0,0 +1,133 @@
+import sys
+from typing import List
+
+import numpy as np
+
+
+class VehicleStore:
+    float_fields = ('speed', 'dis', 'gap', 'offset', 'len', 'width',
+                    'max_pos_acc', 'max_neg_acc', 'usual_pos_acc', 'usual_neg_acc',
+                    'min_gap', 'max_speed', 'headway_time', 'yield_distance', 'turn_speed',
+                    'approaching_intersection_distance',
+                    'buffer_dis', 'buffer_delta_dis', 'buffer_speed', 'buffer_custom_speed')
+    bool_fields = ('active', 'running', 'end', 'buffer_end',
+                   'is_dis_set', 'is_speed_set', 'is_drivable_set', 'is_end_set', 'is_custom_speed_set',
+                   'is_enter_lane_link_time_set', 'is_blocker_set', 'is_notified_vehicles')
+    int_fields = ('drivable_index', 'prev_drivable_index', 'leader_slot', 'segment_index',
+                  'enter_lane_link_time', 'buffer_enter_lane_link_time')
+
+    # Set whenever a vehicle's state changes, cleared when an engine snapshot is taken or restored
+    tracking_fields = ('dirty',)
+
+    # Columns copied from VehicleInfo when a slot is allocated
+    info_fields = ('speed', 'len', 'width', 'max_pos_acc', 'max_neg_acc', 'usual_pos_acc', 'usual_neg_acc',
+                   'min_gap', 'max_speed', 'headway_time', 'yield_distance', 'turn_speed')
+
+    def __init__(self, capacity: int = 1024):
+        self.capacity: int = 0
+        self.vehicles: List = []
+        self.free_slots: List[int] = []
+        self.size: int = 0
+        self.resize(max(capacity, 1))
+
+    def allocate_column(self, name: str, dtype, capacity: int) -> np.ndarray:
+        return np.zeros(capacity, dtype=dtype)
+
+    def resize(self, capacity: int) -> None:
+        old_capacity = self.capacity
+        for fields, dtype in ((self.float_fields, np.float64),
+                              (self.bool_fields, np.bool_),
+                              (self.int_fields, np.int64),
+                              (self.tracking_fields, np.bool_)):
+            for name in fields:
+                column = self.allocate_column(name, dtype, capacity)
+                if old_capacity > 0:
+                    column[:old_capacity] = getattr(self, name)[:old_capacity]
+                setattr(self, name, column)
+
+        self.vehicles.extend([None] * (capacity - old_capacity))
+        self.free_slots.extend(reversed(range(old_capacity, capacity)))
+        self.capacity = capacity
+
+    def _take_slot(self, vehicle) -> int:
+        if len(self.free_slots) == 0:
+            self.resize(self.capacity * 2)
+
+        slot = self.free_slots.pop()
+        self.vehicles[slot] = vehicle
+        self.dirty[slot] = True
+        self.size += 1
+        return slot
+
+    def reset_slot(self, slot: int) -> None:
+        for name in self.float_fields:
+            getattr(self, name)[slot] = 0
+        for name in self.bool_fields:
+            getattr(self, name)[slot] = False
+
+        self.drivable_index[slot] = -1
+        self.prev_drivable_index[slot] = -1
+        self.leader_slot[slot] = -1
+        self.segment_index[slot] = 0
+        self.enter_lane_link_time[slot] = sys.maxsize
+        self.buffer_enter_lane_link_time[slot] = sys.maxsize
+        self.active[slot] = True
+
+    def allocate(self, vehicle, vehicle_info) -> int:
+        slot = self._take_slot(vehicle)
+        self.reset_slot(slot)
+        for name in self.info_fields:
+            getattr(self, name)[slot] = getattr(vehicle_info, name)
+        return slot
+
+    def allocate_copy(self, vehicle, other_slot: int) -> int:
+        slot = self._take_slot(vehicle)
+        self.copy_slot(other_slot, slot)
+        return slot
+
+    def copy_slot(self, src: int, dst: int) -> None:
+        for fields in (self.float_fields, self.bool_fields, self.int_fields):
+            for name in fields:
+                column = getattr(self, name)
+                column[dst] = column[src]
+
+    def release(self, slot: int) -> None:
+        if not self.active[slot]:
+            return
+
+        self.active[slot] = False
+        self.running[slot] = False
+        self.vehicles[slot] = None
+        self.free_slots.append(slot)
+        self.size -= 1
+
+    def clear(self) -> None:
+        self.active[:] = False
+        self.running[:] = False
+        self.vehicles = [None] * self.capacity
+        self.free_slots = list(reversed(range(self.capacity)))
+        self.size = 0
+
+    def get_vehicle(self, slot: int):
+        return self.vehicles[slot] if slot >= 0 else None
+
+    def active_slots(self) -> np.ndarray:
+        return np.flatnonzero(self.active)
+
+    def running_slots(self) -> np.ndarray:
+        return np.flatnonzero(self.active & self.running)
+
+    def restore_slots(self, slots: np.ndarray, vehicles: List, columns) -> None:
+        if len(slots) > 0 and slots.max() >= self.capacity:
+            self.resize(max(self.capacity * 2, int(slots.max()) + 1))
+
+        self.clear()
+        for name, values in columns.items():
+            getattr(self, name)[slots] = values
+        for slot, vehicle in zip(slots.tolist(), vehicles):
+            self.vehicles[slot] = vehicle
+
+        self.dirty[:] = False
+        taken = set(slots.tolist())
+        self.free_slots = [slot for slot in reversed(range(self.capacity)) if slot not in taken]
+        self.size = len(taken)
@@ -0,0 +1 @@
+# pytest puts this directory on sys.path, which makes the shared helpers importable from every test package
@@ -0,0 +1,75 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from helpers import engine_state, make_engine
+from src.engine.archive import Archive
+
+
+class TestArchive(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "state.ckpt")
+        self.network = {"lane_num": 2, "flow_interval": 2, "phases": ((8, (0,)), (8, ()))}
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def make_engine(self, name):
+        directory = os.path.join(self.directory.name, name)
+        os.mkdir(directory)
+        engine = make_engine(directory, **self.network)
+        self.addCleanup(engine.close)
+        return engine
+
+    def test_dump_and_load_resume_the_source_engine(self):
+        # Arrange
+        source = self.make_engine("source")
+        for _ in range(30):
+            source.nextStep()
+        Archive(source).dump(self.path)
+        dumped = engine_state(source)
+        vehicles = {vehicle_id: (vehicle.priority, vehicle.enter_time, vehicle.slot)
+                    for vehicle_id, vehicle in source.vehicle_map.items()}
+        for _ in range(20):
+            source.nextStep()
+        expected = engine_state(source)
+
+        # Act
+        sut = self.make_engine("target")
+        Archive.load(self.path).resume(sut)
+        resumed = engine_state(sut)
+        resumed_vehicles = {vehicle_id: (vehicle.priority, vehicle.enter_time, vehicle.slot)
+                            for vehicle_id, vehicle in sut.vehicle_map.items()}
+        for _ in range(20):
+            sut.nextStep()
+
+        # Assert
+        self.assertEqual(resumed, dumped)
+        self.assertEqual(resumed_vehicles, vehicles)
+        self.assertEqual(engine_state(sut), expected)
+
+    def test_decode_leaves_the_engine_untouched(self):
+        # Arrange
+        source = self.make_engine("source")
+        for _ in range(30):
+            source.nextStep()
+        Archive(source).dump(self.path)
+        sut = self.make_engine("target")
+        rng_keys = np.random.get_state()[1].copy()
+
+        # Act
+        snapshot = Archive.load(self.path).decode(sut)
+
+        # Assert
+        self.assertGreater(len(snapshot.vehicles), 0)
+        self.assertEqual(sut.vehicle_store.size, 0)
+        self.assertEqual(sut.vehicle_store.active_slots().tolist(), [])
+        self.assertEqual([vehicle.slot for vehicle in snapshot.vehicles], snapshot.slots.tolist())
+        np.testing.assert_array_equal(np.random.get_state()[1], rng_keys)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from src.engine.checkpoint import ALIGNMENT, read_checkpoint, write_checkpoint
+
+
+class TestCheckpoint(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "state.ckpt")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_round_trip_keeps_header_and_arrays(self):
+        # Arrange
+        header = {"step": 42, "vehicle_ids": ["flow_0_0", "flow_0_1"]}
+        arrays = {"speed": np.array([1.5, 2.5]), "running": np.array([True, False]),
+                  "offsets": np.arange(6, dtype=np.int64).reshape(2, 3), "empty": np.zeros(0)}
+
+        # Act
+        write_checkpoint(self.path, header, arrays)
+        result_header, result_arrays = read_checkpoint(self.path)
+
+        # Assert
+        self.assertEqual(result_header, header)
+        for name, array in arrays.items():
+            np.testing.assert_array_equal(result_arrays[name], array)
+            self.assertEqual(result_arrays[name].dtype, array.dtype)
+
+    def test_arrays_are_aligned_memory_maps(self):
+        # Arrange
+        write_checkpoint(self.path, {}, {"flag": np.array([True]), "speed": np.arange(3, dtype=np.float64)})
+
+        # Act
+        _, arrays = read_checkpoint(self.path)
+
+        # Assert
+        self.assertIsInstance(arrays["speed"].base, np.memmap)
+        self.assertEqual(arrays["speed"].ctypes.data % ALIGNMENT, arrays["flag"].ctypes.data % ALIGNMENT)
+
+    def test_rejects_file_without_magic(self):
+        # Arrange
+        with open(self.path, "wb") as file:
+            file.write(b"\x00" * 64)
+
+        # Act & Assert
+        with self.assertRaises(Exception):
+            read_checkpoint(self.path)
+
+
+if __name__ == "__main__":
+    unittest.main()
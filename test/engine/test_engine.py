@@ -0,0 +1,212 @@
+import math
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from helpers import engine_state, make_engine
+
+
+class TestEngine(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.engine = make_engine(self.directory.name, phases=((3, (0,)), (3, ())),
+                                  rl_traffic_light=True)
+
+    def tearDown(self):
+        self.engine.close()
+        self.directory.cleanup()
+
+    def test_light_states_are_written_once_per_phase_switch(self):
+        # Arrange
+        self.engine.replayAsync = False
+        self.engine.open_replay_writer(os.path.join(self.directory.name, "replay.bin"))
+        light = self.engine.road_net.get_intersection_by_id("B").get_traffic_light()
+
+        # Act
+        first = self.engine.get_light_states()
+        unchanged = self.engine.get_light_states()
+        self.engine.set_traffic_light_phase("B", 1)
+        switched = self.engine.get_light_states()
+        self.engine.open_replay_writer(os.path.join(self.directory.name, "replay_2.bin"))
+        reopened = self.engine.get_light_states()
+
+        # Assert
+        self.assertIsNotNone(first)
+        self.assertIsNone(unchanged)
+        self.assertIsNotNone(switched)
+        self.assertNotEqual(first.tolist(), switched.tolist())
+        self.assertEqual(reopened.tolist(), switched.tolist())
+        self.assertFalse(hasattr(light, "phase_changed"))
+
+    def test_vehicle_positions_match_per_vehicle_geometry(self):
+        # Arrange
+        self.engine.close()
+        self.engine = make_engine(self.directory.name, lane_num=2, flow_interval=3)
+        for _ in range(31):
+            self.engine.nextStep()
+
+        # Act
+        positions = self.engine.get_vehicle_positions()
+
+        # Assert
+        store = self.engine.vehicle_store
+        vehicles = [store.vehicles[slot] for slot in positions["slot"].tolist()]
+        self.assertEqual(sorted(vehicle.get_id() for vehicle in vehicles),
+                         sorted(self.engine.get_vehicles()))
+        self.assertGreater(len({vehicle.get_cur_drivable().get_id() for vehicle in vehicles}), 2)
+        for i, vehicle in enumerate(vehicles):
+            point = vehicle.get_point()
+            direction = vehicle.get_cur_drivable().get_direction_by_distance(vehicle.get_distance())
+            self.assertAlmostEqual(positions["x"][i], point.x)
+            self.assertAlmostEqual(positions["y"][i], point.y)
+            self.assertAlmostEqual(positions["heading"][i], math.atan2(direction.y, direction.x))
+
+    def test_vehicle_positions_follow_lane_change_offsets(self):
+        # Arrange
+        self.engine.close()
+        self.engine = make_engine(self.directory.name, lane_num=2, flow_interval=3)
+        for _ in range(31):
+            self.engine.nextStep()
+        road_0 = self.engine.road_net.get_road_by_id("road_0")
+        inner, outer = road_0.get_lanes()[0].get_vehicles(), road_0.get_lanes()[1].get_vehicles()
+        for vehicle in inner:
+            vehicle.set_offset(2.0)
+        for vehicle in outer:
+            vehicle.set_offset(-1.0)
+
+        # Act
+        positions = self.engine.get_vehicle_positions()
+
+        # Assert
+        self.assertGreater(len(inner), 0)
+        self.assertGreater(len(outer), 0)
+        index_by_slot = {slot: i for i, slot in enumerate(positions["slot"].tolist())}
+        for vehicle in inner + outer:
+            i = index_by_slot[vehicle.slot]
+            lane_point = vehicle.get_cur_drivable().get_point_by_distance(vehicle.get_distance())
+            point = vehicle.get_point()
+            self.assertNotAlmostEqual(point.y, lane_point.y)
+            self.assertAlmostEqual(positions["x"][i], point.x)
+            self.assertAlmostEqual(positions["y"][i], point.y)
+        self.assertAlmostEqual(positions["y"][index_by_slot[inner[0].slot]], -4.0)
+
+    def test_vehicle_positions_of_an_empty_engine_are_empty(self):
+        # Act
+        positions = self.engine.get_vehicle_positions()
+
+        # Assert
+        self.assertEqual(sorted(positions), ["heading", "slot", "x", "y"])
+        for column in positions.values():
+            self.assertEqual(len(column), 0)
+
+    def test_run_matches_observing_after_single_steps(self):
+        # Arrange
+        other_directory = tempfile.TemporaryDirectory()
+        self.addCleanup(other_directory.cleanup)
+        self.engine.close()
+        self.engine = make_engine(self.directory.name, lane_num=2, flow_interval=2, phases=((8, (0,)), (8, ())))
+
+        # Act
+        observations = self.engine.run(40, observe_every=4)
+        # Engines draw lanes from the global seeded generator, so the second one is only built once the first is done
+        other = make_engine(other_directory.name, lane_num=2, flow_interval=2, phases=((8, (0,)), (8, ())))
+        self.addCleanup(other.close)
+        expected = []
+        for step in range(40):
+            other.nextStep()
+            if (step + 1) % 4 == 0:
+                expected.append(other.get_observation())
+
+        # Assert
+        self.assertEqual(len(observations), 10)
+        for observation, expected_observation in zip(observations, expected):
+            self.assertEqual(sorted(observation), sorted(expected_observation))
+            for name in observation:
+                np.testing.assert_array_equal(observation[name], expected_observation[name])
+        self.assertEqual(self.engine.get_vehicle_speed(), other.get_vehicle_speed())
+        lanes = self.engine.road_net.get_lanes()
+        self.assertEqual(observations[-1]["lane_vehicle_count"].tolist(),
+                         [self.engine.get_lane_vehicle_count()[lane.get_id()] for lane in lanes])
+        self.assertEqual(observations[-1]["lane_waiting_vehicle_count"].tolist(),
+                         [self.engine.get_lane_waiting_vehicle_count()[lane.get_id()] for lane in lanes])
+        self.assertGreater(max(observation["lane_waiting_vehicle_count"].sum() for observation in observations), 0)
+
+    def test_lanes_take_the_first_drivable_indices(self):
+        # Act
+        lanes = self.engine.road_net.get_lanes()
+        drivables = self.engine.road_net.get_drivables()
+
+        # Assert
+        self.assertEqual([lane.index for lane in lanes], list(range(len(lanes))))
+        self.assertEqual(drivables[:len(lanes)], lanes)
+        self.assertEqual(len(self.engine.get_observation()["lane_vehicle_count"]), len(lanes))
+
+    def test_vehicles_move_to_the_worker_owning_their_drivable(self):
+        # Arrange
+        self.engine.close()
+        self.engine = make_engine(self.directory.name, thread_num=2, flow_interval=2)
+        partitioner = self.engine.partitioner
+
+        # Act
+        for _ in range(60):
+            self.engine.nextStep()
+
+        # Assert
+        workers = set()
+        for vehicle, thread_index in self.engine.vehicle_pool.values():
+            if vehicle.get_cur_drivable() is None:
+                continue
+            workers.add(thread_index)
+            self.assertEqual(thread_index, partitioner.get_drivable_partition(vehicle.get_cur_drivable()))
+            self.assertIn(vehicle, self.engine.thread_vehicle_pool[thread_index])
+        self.assertEqual(workers, {0, 1})
+        self.assertEqual(sum(len(pool) for pool in self.engine.thread_vehicle_pool), len(self.engine.vehicle_pool))
+
+    def test_reset_replays_the_run_of_a_fresh_engine(self):
+        # Arrange
+        self.engine.close()
+        self.engine = make_engine(self.directory.name, lane_num=2, flow_interval=2)
+        for _ in range(30):
+            self.engine.nextStep()
+        expected = engine_state(self.engine)
+
+        # Act
+        self.engine.reset(True)
+        reset_state = engine_state(self.engine)
+        for _ in range(30):
+            self.engine.nextStep()
+
+        # Assert
+        self.assertEqual(reset_state[:3], (0, 0, 0))
+        self.assertEqual(reset_state[5], [])
+        self.assertEqual(self.engine.vehicle_store.size, len(self.engine.vehicle_map))
+        self.assertEqual(engine_state(self.engine), expected)
+
+    def test_lane_changes_run_to_completion(self):
+        # Arrange
+        self.engine.close()
+        self.engine = make_engine(self.directory.name, lane_num=3, flow_interval=1, lane_change=True,
+                                  phases=((10, (0,)), (10, ())))
+        lanes_by_vehicle = {}
+        shadow_count = 0
+
+        # Act
+        for _ in range(120):
+            self.engine.nextStep()
+            shadow_count += sum(not vehicle.is_real() for vehicle in self.engine.vehicle_map.values())
+            for vehicle in self.engine.get_running_vehicles():
+                if vehicle.get_cur_drivable().is_lane():
+                    lanes_by_vehicle.setdefault(vehicle.get_id(), set()).add(vehicle.get_cur_drivable().get_id())
+
+        # Assert
+        self.assertGreater(shadow_count, 0)
+        self.assertTrue(any(len({lane for lane in lanes if lane.startswith("road_0")}) > 1
+                            for lanes in lanes_by_vehicle.values()))
+        self.assertGreater(self.engine.finished_vehicle_cnt, 0)
+        self.assertTrue(all(vehicle_id == vehicle.get_id() for vehicle_id, vehicle in self.engine.vehicle_map.items()))
+
+
+if __name__ == "__main__":
+    unittest.main()
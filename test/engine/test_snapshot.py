@@ -0,0 +1,199 @@
+import tempfile
+import unittest
+
+import numpy as np
+
+from helpers import engine_state, make_engine
+from src.engine.snapshot import SnapshotRing
+from src.vehicle.signal import Signal
+
+
+def comparable_vehicle_state(state):
+    *head, lane_change, blocker, buffer = state
+    lane_change_values = {name: vars(value) if isinstance(value, Signal) else value
+                          for name, value in vars(lane_change).items()}
+    return head, lane_change_values, blocker, (buffer.drivable, buffer.blocker, buffer.notifiedVehicles)
+
+
+def assert_same_resolution(test, snapshot, expected):
+    columns, expected_columns = snapshot.resolve_columns(), expected.resolve_columns()
+    test.assertEqual(sorted(columns), sorted(expected_columns))
+    for name in columns:
+        np.testing.assert_array_equal(columns[name], expected_columns[name])
+    test.assertEqual([comparable_vehicle_state(state) for state in snapshot.resolve_vehicle_states()],
+                     [comparable_vehicle_state(state) for state in expected.resolve_vehicle_states()])
+    drivable_num = expected.drivable_num()
+    for result, expected_slots in zip(snapshot.resolve_drivables(drivable_num), expected.resolve_drivables(drivable_num)):
+        test.assertEqual([slots.tolist() for slots in result], [slots.tolist() for slots in expected_slots])
+    for i in range(len(expected.history_lengths)):
+        test.assertEqual([(record.vehicle_num, record.average_speed) for record in snapshot.resolve_history(i)],
+                         [(record.vehicle_num, record.average_speed) for record in expected.resolve_history(i)])
+
+
+class TestSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.engine = make_engine(self.directory.name, lane_num=2, flow_interval=2, phases=((8, (0,)), (8, ())))
+        for _ in range(25):
+            self.engine.nextStep()
+
+    def tearDown(self):
+        self.engine.close()
+        self.directory.cleanup()
+
+    def step(self, steps):
+        for _ in range(steps):
+            self.engine.nextStep()
+        return engine_state(self.engine)
+
+    def test_restored_snapshot_replays_the_same_steps(self):
+        # Arrange
+        before = engine_state(self.engine)
+        snapshot = self.engine.snapshot()
+        expected = self.step(20)
+
+        # Act
+        self.engine.restore(snapshot)
+        restored = engine_state(self.engine)
+        result = self.step(20)
+        self.engine.restore(snapshot)
+        again = self.step(20)
+
+        # Assert
+        self.assertEqual(restored, before)
+        self.assertEqual(result, expected)
+        self.assertEqual(again, expected)
+
+    def test_snapshot_does_not_share_lane_change_or_buffer_state(self):
+        # Arrange
+        sut = self.engine.vehicle_map["flow_0_0"]
+        other = self.engine.vehicle_map["flow_0_1"]
+        signal = Signal()
+        signal.source, signal.direction = sut, 1
+        sut.lane_change.signal_send = signal
+        other.lane_change.signal_recv = signal
+        sut.lane_change.waiting_time = 2.0
+        sut.buffer.notifiedVehicles.append(other)
+        sut.buffer.blocker = other
+        snapshot = self.engine.snapshot()
+
+        # Act
+        signal.direction = -1
+        sut.lane_change.waiting_time = 5.0
+        sut.buffer.notifiedVehicles.clear()
+        sut.buffer.blocker = None
+        self.engine.restore(snapshot)
+        restored = (sut.lane_change.signal_send.direction, sut.lane_change.waiting_time,
+                    list(sut.buffer.notifiedVehicles), sut.buffer.blocker)
+        sut.lane_change.signal_send.direction = 0
+        sut.buffer.notifiedVehicles.clear()
+        self.engine.restore(snapshot)
+
+        # Assert
+        self.assertEqual(restored, (1, 2.0, [other], other))
+        self.assertIsNot(sut.lane_change.signal_send, signal)
+        self.assertIs(other.lane_change.signal_recv, sut.lane_change.signal_send)
+        self.assertEqual(sut.lane_change.signal_send.direction, 1)
+        self.assertEqual(sut.buffer.notifiedVehicles, [other])
+
+    def test_incremental_chain_resolves_to_the_full_snapshot(self):
+        # Arrange
+        self.engine.close()
+        self.engine = make_engine(self.directory.name, lane_num=2, flow_interval=2, phases=((5, (0,)), (80, ())))
+        self.step(60)
+        root = self.engine.snapshot()
+        self.step(5)
+        middle = self.engine.snapshot(incremental=True)
+        self.step(5)
+
+        # Act
+        sut = self.engine.snapshot(incremental=True)
+        full = self.engine.snapshot()
+        expected = engine_state(self.engine)
+
+        # Assert
+        self.assertEqual(sut.chain(), [root, middle, sut])
+        self.assertLess(len(sut.changed_slots), len(sut.slots))
+        assert_same_resolution(self, sut, full)
+        self.step(3)
+        self.engine.restore(sut)
+        self.assertEqual(engine_state(self.engine), expected)
+
+        sut.rebase()
+        self.assertIsNone(sut.parent)
+        assert_same_resolution(self, sut, full)
+        self.step(3)
+        self.engine.restore(sut)
+        self.assertEqual(engine_state(self.engine), expected)
+
+    def test_incremental_snapshot_keeps_routing_changed_outside_update(self):
+        # Arrange
+        self.engine.snapshot()
+        sut = next(self.engine.vehicle_map[vehicle_id] for vehicle_id in sorted(self.engine.vehicle_map)
+                   if self.engine.vehicle_map[vehicle_id].get_cur_drivable().get_id().startswith("road_0"))
+        router = sut.controller_info.router
+        router.get_next_drivable(len(router.planned))
+        planned = list(router.planned)
+
+        # Act
+        snapshot = self.engine.snapshot(incremental=True)
+        router.planned.clear()
+        self.engine.restore(snapshot)
+
+        # Assert
+        self.assertIn(sut.slot, snapshot.changed_slots.tolist())
+        self.assertEqual(list(sut.controller_info.router.planned), planned)
+
+
+class TestSnapshotRing(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.engine = make_engine(self.directory.name, lane_num=2, flow_interval=2, phases=((8, (0,)), (8, ())))
+
+    def tearDown(self):
+        self.engine.close()
+        self.directory.cleanup()
+
+    def push_steps(self, sut, steps):
+        states = []
+        for _ in range(steps):
+            self.engine.nextStep()
+            sut.push()
+            states.append(engine_state(self.engine))
+        return states
+
+    def test_push_keeps_capacity_and_rebases_the_oldest_snapshot(self):
+        # Arrange
+        sut = SnapshotRing(self.engine, capacity=5, full_interval=4)
+
+        # Act
+        self.push_steps(sut, 30)
+
+        # Assert
+        self.assertEqual(len(sut), 5)
+        self.assertIsNone(sut.snapshots[0].parent)
+        for parent, snapshot in zip(sut.snapshots, list(sut.snapshots)[1:]):
+            self.assertIn(snapshot.parent, (None, parent))
+        self.assertEqual([snapshot.step for snapshot in sut.snapshots], list(range(26, 31)))
+
+    def test_rollback_restores_each_pushed_state(self):
+        # Arrange
+        sut = SnapshotRing(self.engine, capacity=8, full_interval=3)
+        states = self.push_steps(sut, 40)
+
+        # Act
+        sut.rollback(back=5)
+        rolled_back = engine_state(self.engine)
+        replayed = self.push_steps(sut, 5)
+        sut.rollback()
+        latest = engine_state(self.engine)
+
+        # Assert
+        self.assertEqual(rolled_back, states[-6])
+        self.assertEqual(replayed, states[-5:])
+        self.assertEqual(latest, states[-1])
+        self.assertEqual(len(sut), 8)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+import tempfile
+import unittest
+
+import numpy as np
+
+from helpers import write_network
+from src.engine.vector_engine import VectorEngine
+
+
+class TestVectorEngine(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.config = write_network(self.directory.name, lane_num=2, flow_interval=2, phases=((100, (0,)), (100, ())),
+                                    rl_traffic_light=True)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def make_vector_engine(self, seeds):
+        engine = VectorEngine(self.config, len(seeds), seeds)
+        self.addCleanup(engine.close)
+        return engine
+
+    def test_environments_with_different_seeds_diverge(self):
+        # Arrange
+        sut = self.make_vector_engine([1, 2, 1])
+
+        # Act
+        observations = sut.step(20)
+
+        # Assert
+        counts = observations["lane_vehicle_count"]
+        self.assertEqual(counts.shape, (3, len(sut.get_lane_ids())))
+        self.assertNotEqual(counts[0].tolist(), counts[1].tolist())
+        self.assertEqual(counts[0].tolist(), counts[2].tolist())
+        np.testing.assert_array_equal(observations["lane_average_speed"][0], observations["lane_average_speed"][2])
+
+    def test_traffic_light_phase_only_applies_to_its_environment(self):
+        # Arrange
+        sut = self.make_vector_engine([0, 0])
+        sut.set_traffic_light_phase(0, "B", 1)
+
+        # Act
+        observations = sut.step(40)
+
+        # Assert
+        road_1 = [i for i, lane_id in enumerate(sut.get_lane_ids()) if lane_id.startswith("road_1")]
+        counts = observations["lane_vehicle_count"]
+        self.assertEqual(counts[0][road_1].sum(), 0)
+        self.assertGreater(counts[1][road_1].sum(), 0)
+        self.assertGreater(observations["lane_waiting_vehicle_count"][0].sum(),
+                           observations["lane_waiting_vehicle_count"][1].sum())
+
+    def test_reset_leaves_the_other_environments_untouched(self):
+        # Arrange
+        sut = self.make_vector_engine([3, 4])
+        reference = self.make_vector_engine([3, 4])
+        sut.step(20)
+        reference.step(20)
+        after_20 = reference.get_observations()
+
+        # Act
+        sut.reset(0)
+        after_reset = sut.get_observations()
+        observations = sut.step(20)
+        expected = reference.step(20)
+
+        # Assert
+        np.testing.assert_array_equal(after_reset["lane_vehicle_count"][0], np.zeros(len(sut.get_lane_ids())))
+        for name in observations:
+            np.testing.assert_array_equal(after_reset[name][1], after_20[name][1])
+            np.testing.assert_array_equal(observations[name][0], after_20[name][0])
+            np.testing.assert_array_equal(observations[name][1], expected[name][1])
+
+
+if __name__ == "__main__":
+    unittest.main()
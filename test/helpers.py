@@ -0,0 +1,125 @@
+import json
+import os
+
+from src.engine.engine import Engine
+from src.utility.utility import Point
+
+
+class FakeVehicleInfo:
+    def __init__(self, speed=1.5):
+        self.speed = speed
+        self.len = 5
+        self.width = 2
+        self.max_pos_acc = 4.5
+        self.max_neg_acc = 4.5
+        self.usual_pos_acc = 2.5
+        self.usual_neg_acc = 2.5
+        self.min_gap = 2
+        self.max_speed = 16.66667
+        self.headway_time = 1
+        self.yield_distance = 5
+        self.turn_speed = 8.3333
+
+
+class FakeIntersection:
+    def __init__(self, x=0.0, y=0.0):
+        self.point = Point(x, y)
+        self.roads = []
+        self.lane_links = []
+
+    def get_roads(self):
+        return self.roads
+
+    def get_lane_links(self):
+        return self.lane_links
+
+
+class FakeRoad:
+    # Roads are straight; the length defaults to the distance between the two intersections
+    def __init__(self, start_intersection, end_intersection, length=None, duration=-1.0, lanes=()):
+        self.start_intersection = start_intersection
+        self.end_intersection = end_intersection
+        self.points = [start_intersection.point, end_intersection.point] if start_intersection else []
+        self.length = length if length is not None else (end_intersection.point - start_intersection.point).len()
+        self.duration = duration
+        self.lanes = list(lanes)
+        for lane in self.lanes:
+            lane.belong_road = self
+        self.successors = set()
+
+    def get_start_intersection(self):
+        return self.start_intersection
+
+    def get_end_intersection(self):
+        return self.end_intersection
+
+    def get_lanes(self):
+        return self.lanes
+
+    def connected_to_road(self, road):
+        return road in self.successors
+
+    def get_length(self):
+        return self.length * max(len(self.lanes), 1)
+
+    def average_length(self):
+        return self.length
+
+    def get_average_duration(self):
+        return self.duration
+
+
+def write_network(directory, lane_num=1, phases=((30, (0,)),), flow_interval=5, seed=0, rl_traffic_light=False,
+                  lane_change=False):
+    # Two roads joined by one signalised intersection: A -road_0-> B -road_1-> C, with lane i linked to lane i
+    def intersection(id, x, virtual, roads, road_links=(), light_phases=()):
+        return {"id": id, "point": {"x": x, "y": 0}, "width": 0 if virtual else 10, "virtual": virtual,
+                "roads": roads, "roadLinks": list(road_links), "trafficLight": {"lightphases": list(light_phases)}}
+
+    def road(id, start, end, x0, x1):
+        return {"id": id, "startIntersection": start, "endIntersection": end,
+                "points": [{"x": x0, "y": 0}, {"x": x1, "y": 0}],
+                "lanes": [{"width": 4, "maxSpeed": 16.67} for _ in range(lane_num)]}
+
+    road_link = {"type": "go_straight", "startRoad": "road_0", "endRoad": "road_1", "direction": 0,
+                 "laneLinks": [{"startLaneIndex": i, "endLaneIndex": i} for i in range(lane_num)]}
+    roadnet = {"intersections": [
+        intersection("A", 0, True, ["road_0"]),
+        intersection("B", 300, False, ["road_0", "road_1"], [road_link],
+                     [{"time": time, "availableRoadLinks": list(available)} for time, available in phases]),
+        intersection("C", 600, True, ["road_1"])],
+        "roads": [road("road_0", "A", "B", 0, 300), road("road_1", "B", "C", 300, 600)]}
+    vehicle = {"length": 5.0, "width": 2.0, "maxPosAcc": 2.0, "maxNegAcc": 4.5, "usualPosAcc": 2.0,
+               "usualNegAcc": 4.5, "minGap": 2.5, "maxSpeed": 16.67, "headwayTime": 1.5}
+    flows = [{"vehicle": vehicle, "route": ["road_0", "road_1"], "interval": flow_interval}]
+    config = {"interval": 1.0, "seed": seed, "dir": directory + os.sep, "roadnetFile": "roadnet.json",
+              "flowFile": "flow.json", "rlTrafficLight": rl_traffic_light, "laneChange": lane_change,
+              "saveReplay": False}
+
+    for name, document in (("roadnet.json", roadnet), ("flow.json", flows), ("config.json", config)):
+        with open(os.path.join(directory, name), "w") as file:
+            json.dump(document, file)
+    return os.path.join(directory, "config.json")
+
+
+def make_engine(directory, thread_num=1, **network):
+    return Engine(write_network(directory, **network), thread_num)
+
+
+def engine_state(engine):
+    # The observable simulation state, in a form assertEqual can compare across engines and restores
+    vehicles = []
+    for vehicle_id in sorted(engine.vehicle_map):
+        vehicle = engine.vehicle_map[vehicle_id]
+        drivable = vehicle.get_cur_drivable()
+        leader = vehicle.get_leader()
+        vehicles.append((vehicle_id, vehicle.is_running(), drivable.get_id() if drivable else None,
+                         vehicle.get_distance(), vehicle.get_speed(), vehicle.get_gap(),
+                         leader.get_id() if leader else None,
+                         [planned.get_id() if planned else None for planned in vehicle.controller_info.router.planned]))
+    drivables = [(drivable.get_id(), [vehicle.get_id() for vehicle in drivable.get_vehicles()])
+                 for drivable in engine.road_net.get_drivables()]
+    lights = [intersection.get_traffic_light().get_current_phase_index()
+              for intersection in engine.road_net.get_intersections()]
+    return (engine.step, engine.finished_vehicle_cnt, engine.active_vehicle_count,
+            [flow.cnt for flow in engine.flows], lights, vehicles, drivables)
@@ -0,0 +1,61 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from src.replay.async_replay_writer import AsyncReplayWriter
+from src.replay.replay_reader import ReplayReader
+from src.replay.replay_writer import ReplayWriter
+
+
+def make_vehicles(n):
+    return {"x": np.arange(n, dtype=np.float64), "y": np.zeros(n), "angle": np.zeros(n),
+            "lane_change": np.zeros(n, dtype=np.int8), "len": np.full(n, 5.0), "width": np.full(n, 2.0)}
+
+
+class FailingWriter:
+    def write_frame(self, *frame):
+        raise IOError("disk full")
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class TestAsyncReplayWriter(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "replay.bin")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_close_flushes_all_frames_in_order(self):
+        # Arrange
+        sut = AsyncReplayWriter(ReplayWriter(self.path, [("road", 1)]), batch_frames=4, max_batches=1)
+
+        # Act
+        for step in range(10):
+            sut.write_frame(step, ["veh_" + str(step)], make_vehicles(1), np.zeros(1, dtype=np.uint8))
+        sut.close()
+
+        # Assert
+        frames = list(ReplayReader(self.path))
+        self.assertEqual([frame.step for frame in frames], list(range(10)))
+
+    def test_writer_error_is_raised_on_flush(self):
+        # Arrange
+        sut = AsyncReplayWriter(FailingWriter(), batch_frames=1)
+        sut.write_frame(0, [], make_vehicles(0), np.zeros(0, dtype=np.uint8))
+
+        # Act & Assert
+        with self.assertRaises(Exception):
+            sut.flush()
+        sut.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,182 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from src.replay.replay_format import LIGHT_GREEN, LIGHT_IMPLICIT, LIGHT_RED, index_path
+from src.replay.replay_reader import ReplayReader, convert_to_text
+from src.replay.replay_writer import ReplayWriter
+
+
+def make_vehicles(x, y):
+    n = len(x)
+    return {"x": np.array(x, dtype=np.float64), "y": np.array(y, dtype=np.float64),
+            "angle": np.full(n, 0.5), "lane_change": np.zeros(n, dtype=np.int8),
+            "len": np.full(n, 5.0), "width": np.full(n, 2.0)}
+
+
+class TestReplay(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "replay.bin")
+        self.roads = [("road_0_1", 2), ("road_1_0", 1)]
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write_frames(self, compress):
+        writer = ReplayWriter(self.path, self.roads, compress)
+        lights = np.array([LIGHT_GREEN, LIGHT_RED, LIGHT_IMPLICIT], dtype=np.uint8)
+        writer.write_frame(0, ["flow_0_0"], make_vehicles([1.25], [2.0]), lights)
+        writer.write_frame(1, ["flow_0_0", "flow_0_1"], make_vehicles([3.5, 0.0], [2.0, 1.0]), lights)
+        writer.close()
+
+    def test_frames_round_trip_with_id_table(self):
+        for compress in (False, True):
+            # Arrange
+            self.write_frames(compress)
+
+            # Act
+            reader = ReplayReader(self.path)
+            frames = list(reader)
+
+            # Assert
+            self.assertEqual([frame.step for frame in frames], [0, 1])
+            self.assertEqual(frames[1].new_ids, ["flow_0_1"])
+            self.assertEqual(frames[1].vehicles["id"].tolist(), [0, 1])
+            np.testing.assert_array_equal(frames[1].vehicles["x"], [3.5, 0.0])
+            self.assertEqual(reader.ids, ["flow_0_0", "flow_0_1"])
+
+    def test_convert_to_text_matches_cityflow_format(self):
+        # Arrange
+        self.write_frames(False)
+        text_path = os.path.join(self.directory.name, "replay.txt")
+
+        # Act
+        convert_to_text(self.path, text_path)
+
+        # Assert
+        with open(text_path) as file:
+            lines = file.read().splitlines()
+        self.assertEqual(lines[0], "1.25 2.0 0.5 flow_0_0 0 5.0 2.0,;road_0_1 g r,road_1_0 i,")
+        self.assertEqual(lines[1].split(";")[0], "3.5 2.0 0.5 flow_0_0 0 5.0 2.0,0.0 1.0 0.5 flow_0_1 0 5.0 2.0,")
+
+    def test_delta_frames_track_positions_within_resolution(self):
+        # Arrange
+        writer = ReplayWriter(self.path, self.roads, keyframe_interval=10)
+        lights = np.zeros(3, dtype=np.uint8)
+        ids = ["veh_" + str(i) for i in range(50)]
+        rng = np.random.default_rng(0)
+        x = rng.uniform(0, 1000, 50)
+        positions = []
+        for step in range(25):
+            x = x + rng.uniform(0, 15, 50) * 0.1
+            positions.append(x)
+            writer.write_frame(step, ids, make_vehicles(x, x / 2), lights if step == 0 else None)
+        writer.close()
+
+        # Act
+        frames = list(ReplayReader(self.path))
+
+        # Assert
+        for frame, expected in zip(frames, positions):
+            np.testing.assert_allclose(frame.vehicles["x"], expected, atol=0.005 + 1e-9)
+            np.testing.assert_array_equal(frame.lights, lights)
+        np.testing.assert_array_equal(frames[10].vehicles["x"], positions[10])
+
+    def test_delta_frames_are_smaller_than_keyframes(self):
+        # Arrange
+        ids = ["veh_" + str(i) for i in range(100)]
+        x = np.linspace(0, 500, 100)
+        sizes = []
+        for keyframe_interval in (1, 100):
+            writer = ReplayWriter(self.path, self.roads, keyframe_interval=keyframe_interval)
+            for step in range(20):
+                writer.write_frame(step, ids, make_vehicles(x + step, x), None)
+            writer.close()
+            sizes.append(os.path.getsize(self.path))
+
+        # Assert
+        self.assertLess(sizes[1] * 3, sizes[0])
+
+    def write_moving_frames(self):
+        writer = ReplayWriter(self.path, self.roads, keyframe_interval=4)
+        lights = np.zeros(3, dtype=np.uint8)
+        for step in range(18):
+            ids = ["veh_" + str(i) for i in range(step // 3, step // 3 + 5)]
+            x = np.arange(5) * 10.0 + step
+            writer.write_frame(step, ids, make_vehicles(x, x), lights if step == 0 else None)
+        writer.close()
+
+    def test_seek_matches_sequential_frames(self):
+        # Arrange
+        self.write_moving_frames()
+        reader = ReplayReader(self.path)
+        expected = {}
+        for frame in reader:
+            expected[frame.step] = (frame.vehicles["x"].copy(), [reader.ids[i] for i in frame.vehicles["id"]])
+
+        for step in (0, 3, 4, 9, 17):
+            # Act
+            frame = reader.seek(step)
+
+            # Assert
+            self.assertEqual(frame.step, step)
+            np.testing.assert_array_equal(frame.vehicles["x"], expected[step][0])
+            self.assertEqual([reader.ids[i] for i in frame.vehicles["id"]], expected[step][1])
+            np.testing.assert_array_equal(frame.lights, np.zeros(3, dtype=np.uint8))
+        self.assertEqual(reader.keyframe_steps.tolist(), [0, 4, 8, 12, 16])
+        self.assertIsNone(reader.seek(18))
+        reader.close()
+
+    def test_frames_iterate_lazily_from_step(self):
+        # Arrange
+        self.write_moving_frames()
+        reader = ReplayReader(self.path)
+
+        # Act
+        frames = reader.frames(10)
+        first = next(frames)
+        rest = list(frames)
+
+        # Assert
+        self.assertEqual(first.step, 10)
+        self.assertEqual([frame.step for frame in rest], list(range(11, 18)))
+        reader.close()
+
+    def test_seek_without_index_decodes_from_start(self):
+        # Arrange
+        self.write_moving_frames()
+        os.remove(index_path(self.path))
+
+        # Act
+        reader = ReplayReader(self.path)
+        frame = reader.seek(9)
+
+        # Assert
+        self.assertEqual(frame.step, 9)
+        self.assertEqual(reader.ids[frame.vehicles["id"][0]], "veh_3")
+        reader.close()
+
+    def test_truncated_index_keeps_complete_entries(self):
+        # Arrange
+        self.write_moving_frames()
+        with open(index_path(self.path), "rb") as file:
+            data = file.read()
+        with open(index_path(self.path), "wb") as file:
+            file.write(data[:-3])
+
+        # Act
+        reader = ReplayReader(self.path)
+        frame = reader.seek(17)
+
+        # Assert
+        self.assertEqual(reader.keyframe_steps.tolist(), [0, 4, 8, 12])
+        self.assertEqual(frame.step, 17)
+        self.assertEqual(reader.ids[frame.vehicles["id"][-1]], "veh_9")
+        reader.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
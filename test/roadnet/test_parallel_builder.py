@@ -0,0 +1,54 @@
+import unittest
+
+import numpy as np
+
+from src.roadnet.parallel_builder import CURVE_POINT_NUM, build_intersection, build_intersections
+from src.utility.geometry import bezier_points, polyline_crossings
+
+
+def make_intersections(count, seed=3):
+    rng = np.random.default_rng(seed)
+    intersections = []
+    for _ in range(count):
+        lane_links = []
+        for _ in range(12):
+            start, end = rng.uniform(0, 30, 2), rng.uniform(0, 30, 2)
+            controls = np.array([start, start + rng.uniform(-5, 5, 2), end + rng.uniform(-5, 5, 2), end])
+            lane_links.append((True, controls))
+        lane_links.append((False, np.array([[0.0, 15.0], [30.0, 15.0]])))
+        intersections.append(lane_links)
+    return intersections
+
+
+class TestParallelBuilder(unittest.TestCase):
+    def test_build_intersection_generates_curves_and_crossings(self):
+        # Arrange
+        lane_links = make_intersections(1)[0]
+
+        # Act
+        polylines, crossings = build_intersection(lane_links)
+
+        # Assert
+        self.assertEqual(len(polylines), 13)
+        np.testing.assert_array_equal(polylines[0], bezier_points(*lane_links[0][1], CURVE_POINT_NUM))
+        self.assertIs(polylines[-1], lane_links[-1][1])
+        self.assertEqual(crossings, polyline_crossings(polylines))
+
+    def test_parallel_build_matches_serial_build(self):
+        # Arrange
+        intersections = make_intersections(8)
+
+        # Act
+        serial = build_intersections(intersections, 1)
+        parallel = build_intersections(intersections, 2)
+
+        # Assert
+        self.assertEqual(len(parallel), 8)
+        for (serial_polylines, serial_crossings), (polylines, crossings) in zip(serial, parallel):
+            self.assertEqual(crossings, serial_crossings)
+            for expected, result in zip(serial_polylines, polylines):
+                np.testing.assert_array_equal(result, expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
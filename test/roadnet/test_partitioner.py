@@ -0,0 +1,128 @@
+import unittest
+
+import numpy as np
+
+from helpers import FakeIntersection, FakeRoad
+from src.roadnet.partitioner import RoadNetPartitioner
+
+
+class FakeDrivable:
+    def __init__(self, index, vehicle_count=0):
+        self.index = index
+        self.vehicle_count = vehicle_count
+        self.belong_road = None
+        self.start_lane = None
+
+    def is_lane(self):
+        return self.start_lane is None
+
+    def get_start_lane(self):
+        return self.start_lane
+
+    def get_vehicle_count(self):
+        return self.vehicle_count
+
+
+class FakeRoadNet:
+    def __init__(self, width, height):
+        self.intersections = [FakeIntersection() for _ in range(width * height)]
+        self.roads = []
+        self.drivables = []
+        for x in range(width):
+            for y in range(height):
+                node = self.intersections[x * height + y]
+                if x + 1 < width:
+                    self.add_road(node, self.intersections[(x + 1) * height + y])
+                    self.add_road(self.intersections[(x + 1) * height + y], node)
+                if y + 1 < height:
+                    self.add_road(node, self.intersections[x * height + y + 1])
+                    self.add_road(self.intersections[x * height + y + 1], node)
+
+    def add_road(self, start, end):
+        lane = FakeDrivable(len(self.drivables))
+        self.drivables.append(lane)
+        road = FakeRoad(start, end, length=1.0, lanes=[lane])
+        self.roads.append(road)
+        lane_link = FakeDrivable(len(self.drivables))
+        lane_link.start_lane = lane
+        self.drivables.append(lane_link)
+        end.lane_links.append(lane_link)
+
+    def get_intersections(self):
+        return self.intersections
+
+    def get_roads(self):
+        return self.roads
+
+    def get_drivables(self):
+        return self.drivables
+
+
+class TestRoadNetPartitioner(unittest.TestCase):
+    def test_partition_assigns_every_intersection_to_balanced_regions(self):
+        # Arrange
+        sut = RoadNetPartitioner(FakeRoadNet(8, 8), 4)
+
+        # Act
+        result = sut.partition()
+
+        # Assert
+        counts = np.bincount(result, minlength=4)
+        self.assertTrue((result >= 0).all())
+        self.assertEqual(counts.sum(), 64)
+        self.assertLessEqual(counts.max() - counts.min(), 6)
+
+    def test_partition_produces_connected_regions(self):
+        # Arrange
+        sut = RoadNetPartitioner(FakeRoadNet(6, 5), 3)
+
+        # Act
+        result = sut.partition()
+
+        # Assert
+        for region in range(3):
+            members = set(np.flatnonzero(result == region))
+            start = next(iter(members))
+            seen = {start}
+            stack = [start]
+            while stack:
+                node = stack.pop()
+                for neighbor in sut.adjacency[node]:
+                    if neighbor in members and neighbor not in seen:
+                        seen.add(neighbor)
+                        stack.append(neighbor)
+            self.assertEqual(seen, members)
+
+    def test_lanes_and_lane_links_of_a_road_share_partition_with_its_end_intersection(self):
+        # Arrange
+        road_net = FakeRoadNet(4, 4)
+        sut = RoadNetPartitioner(road_net, 2)
+        sut.partition()
+
+        # Act
+        drivable_partition = sut.drivable_partition_array()
+
+        # Assert
+        for road in road_net.get_roads():
+            expected = sut.get_intersection_partition(road.get_end_intersection())
+            lane = road.get_lanes()[0]
+            self.assertEqual(drivable_partition[lane.index], expected)
+            self.assertEqual(drivable_partition[lane.index + 1], expected)
+
+    def test_partition_with_load_moves_weight_away_from_congested_region(self):
+        # Arrange
+        sut = RoadNetPartitioner(FakeRoadNet(6, 6), 2)
+        sut.partition()
+        load = np.zeros(36)
+        load[sut.intersection_partition == 0] = 50
+        before = sut.imbalance(load)
+
+        # Act
+        sut.partition(load)
+
+        # Assert
+        self.assertLess(sut.imbalance(load), before)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,136 @@
+import heapq
+import tempfile
+import unittest
+
+import numpy as np
+
+from helpers import FakeIntersection, FakeRoad, make_engine
+from src.roadnet.road_graph import RoadGraph
+
+
+def make_grid(seed=4, size=40):
+    rng = np.random.default_rng(seed)
+    intersections = [FakeIntersection() for _ in range(size // 4)]
+    roads = [FakeRoad(None, intersections[rng.integers(len(intersections))], length=float(rng.uniform(10, 100)))
+             for _ in range(size)]
+    for road in roads:
+        intersection = road.get_end_intersection()
+        for other in rng.choice(roads, 3, replace=False):
+            intersection.roads.append(other)
+            if rng.random() < 0.8:
+                road.successors.add(other)
+    return roads
+
+
+def reference_distances(roads, start):
+    dis = {start: 0.0}
+    queue = [(0.0, start)]
+    while queue:
+        cur_dis, cur = heapq.heappop(queue)
+        if cur_dis > dis[cur]:
+            continue
+        for adj in roads[cur].get_end_intersection().get_roads():
+            if roads[cur].connected_to_road(adj):
+                index = roads.index(adj)
+                if index not in dis or cur_dis + adj.length < dis[index]:
+                    dis[index] = cur_dis + adj.length
+                    heapq.heappush(queue, (dis[index], index))
+    return dis
+
+
+class TestRoadGraph(unittest.TestCase):
+    def test_adjacency_lists_connected_successors(self):
+        # Arrange
+        roads = make_grid()
+
+        # Act
+        sut = RoadGraph(roads)
+
+        # Assert
+        self.assertEqual([road.index for road in roads], list(range(len(roads))))
+        for road in roads:
+            expected = [adj.index for adj in road.get_end_intersection().get_roads() if road.connected_to_road(adj)]
+            self.assertEqual(sut.get_successors(road.index).tolist(), expected)
+        np.testing.assert_array_equal(sut.edge_lengths, sut.lengths[sut.targets])
+
+    def test_shortest_path_matches_reference_distances(self):
+        # Arrange
+        roads = make_grid()
+        sut = RoadGraph(roads)
+
+        for start in range(0, len(roads), 7):
+            expected = reference_distances(roads, start)
+            for end in range(len(roads)):
+                # Act
+                path = sut.shortest_path(start, end, sut.length_list)
+
+                # Assert
+                if end not in expected:
+                    self.assertIsNone(path)
+                    continue
+                self.assertEqual((path[0], path[-1]), (start, end))
+                for a, b in zip(path, path[1:]):
+                    self.assertIn(b, sut.get_successors(a).tolist())
+                self.assertAlmostEqual(sum(sut.length_list[i] for i in path[1:]), expected[end])
+
+    def test_duration_weights_fall_back_to_length_over_max_speed(self):
+        # Arrange
+        intersection = FakeIntersection()
+        roads = [FakeRoad(None, intersection, length=100.0, duration=4.0), FakeRoad(None, intersection, length=50.0)]
+        sut = RoadGraph(roads)
+
+        # Act
+        weights = sut.get_duration_weights(10.0)
+        other_speed = sut.get_duration_weights(20.0)
+        roads[1].duration = 2.0
+        cached = sut.get_duration_weights(10.0)
+        sut.invalidate_durations()
+        refreshed = sut.get_duration_weights(10.0)
+
+        # Assert
+        self.assertEqual(weights, [4.0, 5.0])
+        self.assertIs(cached, weights)
+        self.assertEqual(refreshed, [4.0, 2.0])
+        self.assertEqual(other_speed, [4.0, 2.5])
+
+    def test_durations_only_go_stale_when_their_rounded_value_changes(self):
+        # Arrange
+        intersection = FakeIntersection()
+        roads = [FakeRoad(None, intersection, length=100.0, duration=4.0), FakeRoad(None, intersection, length=50.0)]
+        sut = RoadGraph(roads)
+
+        # Act
+        untouched = sut.update_durations()
+        weights = sut.get_duration_weights(10.0)
+        roads[0].duration = 4.01
+        drifted = sut.update_durations()
+        drifted_weights = sut.get_duration_weights(10.0)
+        roads[1].duration = 2.0
+        changed = sut.update_durations()
+        changed_weights = sut.get_duration_weights(10.0)
+
+        # Assert
+        self.assertFalse(untouched)
+        self.assertFalse(drifted)
+        self.assertIs(drifted_weights, weights)
+        self.assertTrue(changed)
+        self.assertEqual(changed_weights, [4.0, 2.0])
+
+    def test_duration_fallback_uses_the_length_summed_over_lanes(self):
+        # Arrange
+        with tempfile.TemporaryDirectory() as directory:
+            engine = make_engine(directory, lane_num=2)
+            sut = engine.road_net.get_road_graph()
+            roads = engine.road_net.get_roads()
+
+            # Act
+            weights = sut.get_duration_weights(10.0)
+            engine.close()
+
+        # Assert
+        self.assertEqual(weights, [road.get_length() / 10.0 for road in roads])
+        self.assertEqual(weights, [2 * road.average_length() / 10.0 for road in roads])
+
+
+if __name__ == "__main__":
+    unittest.main()
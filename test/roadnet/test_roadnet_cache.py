@@ -0,0 +1,130 @@
+import os
+import pickle
+import tempfile
+import unittest
+from enum import Enum
+
+import numpy as np
+
+from src.roadnet.roadnet_cache import MAGIC, TRUSTED_MODULES, RoadNetCache, dumps_graph, loads_graph
+from src.utility.utility import Point
+
+
+class Kind(Enum):
+    LANE = 0
+
+
+class FakeNode:
+    def __init__(self, index):
+        self.index = index
+        self.kind = Kind.LANE
+        self.next = None
+        self.points = [Point(index, -index)]
+        self.lengths = np.arange(3.0) * index
+
+
+class FakeRoadNet:
+    def __init__(self, count):
+        self.nodes = [FakeNode(i) for i in range(count)]
+        for node, next_node in zip(self.nodes, self.nodes[1:] + self.nodes[:1]):
+            node.next = next_node
+        self.node_map = {str(node.index): node for node in self.nodes}
+
+
+class TestRoadNetCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.json_file = os.path.join(self.directory.name, "roadnet.json")
+        with open(self.json_file, "w") as file:
+            file.write('{"intersections": [], "roads": []}')
+        self.sut = RoadNetCache(os.path.join(self.directory.name, "cache"), TRUSTED_MODULES + (__name__,))
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_graph_round_trip_preserves_shared_references_in_deep_chains(self):
+        # Arrange
+        road_net = FakeRoadNet(10000)
+
+        # Act
+        result = loads_graph(dumps_graph(road_net), TRUSTED_MODULES + (__name__,))
+
+        # Assert
+        self.assertEqual(len(result.nodes), 10000)
+        self.assertIs(result.nodes[-1].next, result.nodes[0])
+        self.assertIs(result.node_map["123"], result.nodes[123])
+        self.assertIs(result.nodes[7].kind, Kind.LANE)
+        self.assertEqual((result.nodes[7].points[0].x, result.nodes[7].points[0].y), (7, -7))
+        np.testing.assert_array_equal(result.nodes[7].lengths, [0.0, 7.0, 14.0])
+
+    def test_load_returns_stored_roadnet_for_same_json(self):
+        # Arrange
+        self.sut.store(self.json_file, FakeRoadNet(3))
+
+        # Act
+        result = self.sut.load(self.json_file)
+
+        # Assert
+        self.assertEqual([node.index for node in result.nodes], [0, 1, 2])
+        self.assertEqual(os.listdir(self.sut.cache_dir), [os.path.basename(self.sut.get_path(self.json_file))])
+
+    def test_load_misses_when_json_changes(self):
+        # Arrange
+        self.sut.store(self.json_file, FakeRoadNet(3))
+        with open(self.json_file, "a") as file:
+            file.write(" ")
+
+        # Act
+        result = self.sut.load(self.json_file)
+
+        # Assert
+        self.assertIsNone(result)
+
+    def test_load_ignores_corrupt_cache(self):
+        # Arrange
+        self.sut.store(self.json_file, FakeRoadNet(3))
+        path = self.sut.get_path(self.json_file)
+        with open(path, "r+b") as file:
+            file.truncate(os.path.getsize(path) // 2)
+
+        # Act
+        result = self.sut.load(self.json_file)
+
+        # Assert
+        self.assertIsNone(result)
+
+    def test_load_misses_when_the_roadnet_source_changes(self):
+        # Arrange
+        self.sut.store(self.json_file, FakeRoadNet(3))
+        other = RoadNetCache(self.sut.cache_dir, self.sut.trusted_modules)
+        other.source_digest = bytes(32)
+
+        # Act
+        result = other.load(self.json_file)
+
+        # Assert
+        self.assertIsNone(result)
+        self.assertNotEqual(other.get_path(self.json_file), self.sut.get_path(self.json_file))
+
+    def test_load_rejects_cache_naming_untrusted_globals(self):
+        # Arrange
+        os.makedirs(self.sut.cache_dir)
+        marker = os.path.join(self.directory.name, "marker")
+        # A protocol 0 pickle calling os.makedirs(marker)
+        payload = b"cos\nmakedirs\n(V" + marker.encode() + b"\ntR."
+        with open(self.sut.get_path(self.json_file), "wb") as file:
+            file.write(MAGIC + self.sut.source_digest + payload)
+
+        # Act
+        result = self.sut.load(self.json_file)
+
+        # Assert
+        self.assertIsNone(result)
+        self.assertFalse(os.path.exists(marker))
+        with self.assertRaises(pickle.UnpicklingError):
+            loads_graph(payload)
+        self.assertFalse(os.path.exists(marker))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+import unittest
+
+import numpy as np
+
+from helpers import FakeIntersection, FakeRoad
+from src.roadnet.road_graph import RoadGraph
+from src.roadnet.routing_engine import AStarRoutingEngine, ContractionHierarchyRoutingEngine, \
+    DijkstraRoutingEngine, create_routing_engine
+
+
+def make_network(seed=5, size=8):
+    # A grid of intersections joined by two-way roads with random turn restrictions
+    rng = np.random.default_rng(seed)
+    intersections = {(i, j): FakeIntersection(i * 100.0 + rng.uniform(-20, 20), j * 100.0 + rng.uniform(-20, 20))
+                     for i in range(size) for j in range(size)}
+    roads = []
+    for (i, j), intersection in intersections.items():
+        for adj in ((i + 1, j), (i, j + 1)):
+            if adj in intersections:
+                roads.append(FakeRoad(intersection, intersections[adj]))
+                roads.append(FakeRoad(intersections[adj], intersection))
+    starts = {}
+    for road in roads:
+        starts.setdefault(id(road.points[0]), []).append(road)
+    for road in roads:
+        for other in starts[id(road.end_intersection.point)]:
+            road.end_intersection.roads.append(other)
+            if rng.random() < 0.85:
+                road.successors.add(other)
+    return RoadGraph(roads)
+
+
+def path_length(graph, path):
+    return sum(graph.length_list[i] for i in path[1:])
+
+
+class TestRoutingEngine(unittest.TestCase):
+    def assert_matches_dijkstra(self, sut, graph):
+        reference = DijkstraRoutingEngine(graph)
+        for start in range(0, len(graph), 5):
+            for end in range(0, len(graph), 3):
+                # Act
+                path = sut.shortest_length_path(start, end)
+
+                # Assert
+                expected = reference.shortest_length_path(start, end)
+                if expected is None:
+                    self.assertIsNone(path)
+                    continue
+                self.assertEqual((path[0], path[-1]), (start, end))
+                for a, b in zip(path, path[1:]):
+                    self.assertIn(b, graph.successor_lists[a])
+                self.assertAlmostEqual(path_length(graph, path), path_length(graph, expected))
+
+    def test_astar_matches_dijkstra(self):
+        # Arrange
+        graph = make_network()
+
+        # Act / Assert
+        self.assert_matches_dijkstra(AStarRoutingEngine(graph), graph)
+
+    def test_contraction_hierarchy_matches_dijkstra(self):
+        # Arrange
+        graph = make_network()
+
+        # Act / Assert
+        self.assert_matches_dijkstra(ContractionHierarchyRoutingEngine(graph), graph)
+
+    def test_contraction_hierarchy_with_tiny_witness_search_stays_exact(self):
+        # Arrange
+        graph = make_network(seed=6, size=5)
+
+        # Act / Assert
+        self.assert_matches_dijkstra(ContractionHierarchyRoutingEngine(graph, witness_settle_limit=1), graph)
+
+    def test_create_routing_engine_rejects_unknown_name(self):
+        # Arrange
+        graph = make_network(size=2)
+
+        # Act / Assert
+        self.assertIsInstance(create_routing_engine("ch", graph), ContractionHierarchyRoutingEngine)
+        self.assertRaises(Exception, create_routing_engine, "bellman-ford", graph)
+
+
+if __name__ == "__main__":
+    unittest.main()
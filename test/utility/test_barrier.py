@@ -33,6 +33,62 @@ class TestBarrier(unittest.TestCase):
             self.assertEqual(results.count(f"Thread {i} is waiting at the barrier."), 1)
             self.assertEqual(results.count(f"Thread {i} passed the barrier."), 1)
 
+    def test_wait_can_be_reused_for_many_phases(self):
+        # Arrange
+        num_threads = 4
+        rounds = 50
+        barrier = Barrier(num_threads, spin_count=10)
+        counters = [0] * num_threads
+        errors = []
+
+        def thread_function(thread_id):
+            for i in range(rounds):
+                counters[thread_id] += 1
+                barrier.wait()
+                if min(counters) < i + 1:
+                    errors.append((thread_id, i))
+                barrier.wait()
+
+        threads = [threading.Thread(target=thread_function, args=(i,)) for i in range(num_threads)]
+
+        # Act
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=10)
+
+        # Assert
+        self.assertEqual(errors, [])
+        self.assertEqual(counters, [rounds] * num_threads)
+        self.assertEqual(barrier.generation, rounds * 2)
+        self.assertEqual(barrier.count, 0)
+
+    def test_wait_with_phase_records_wait_statistics(self):
+        # Arrange
+        barrier = Barrier(2)
+        thread = threading.Thread(target=barrier.wait)
+        thread.start()
+
+        # Act
+        barrier.wait("get_action")
+        thread.join()
+
+        # Assert
+        stats = barrier.get_stats()
+        self.assertEqual(stats["get_action"][0], 1)
+        self.assertGreaterEqual(stats["get_action"][1], 0)
+
+    def test_reset_stats_clears_statistics(self):
+        # Arrange
+        barrier = Barrier(1)
+        barrier.wait("phase")
+
+        # Act
+        barrier.reset_stats()
+
+        # Assert
+        self.assertEqual(barrier.get_stats(), {})
+
 
 if __name__ == "__main__":
     unittest.main()
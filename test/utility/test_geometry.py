@@ -0,0 +1,137 @@
+import unittest
+
+import numpy as np
+
+from src.utility.geometry import (array_to_points, bezier_points, lengths, normals, points_to_array, polyline_crossings,
+                                  polyline_length, segment_intersections, units)
+from src.utility.utility import Point, calc_intersect_point, cross_multiply, on_segment
+
+
+def lerp(p1: Point, p2: Point, a: float) -> Point:
+    return Point((p2.x - p1.x) * a + p1.x, (p2.y - p1.y) * a + p1.y)
+
+
+def brute_force_crossings(polylines):
+    result = []
+    for i in range(len(polylines)):
+        for j in range(i + 1, len(polylines)):
+            va, vb = array_to_points(polylines[i]), array_to_points(polylines[j])
+            disa = 0.0
+            for ia in range(len(va) - 1):
+                disb = 0.0
+                for ib in range(len(vb) - 1):
+                    a1, a2, b1, b2 = va[ia], va[ia + 1], vb[ib], vb[ib + 1]
+                    if Point.sign(cross_multiply(a2 - a1, b2 - b1)) == 0:
+                        continue
+                    p = calc_intersect_point(a1, a2, b1, b2)
+                    if on_segment(a1, a2, p) and on_segment(b1, b2, p):
+                        result.append((i, j, ia, ib, disa + (p - a1).len(), disb + (p - b1).len()))
+                        break
+                    disb += (vb[ib + 1] - vb[ib]).len()
+                disa += (va[ia + 1] - va[ia]).len()
+    return result
+
+
+class TestGeometry(unittest.TestCase):
+    def test_point_has_no_instance_dict(self):
+        # Arrange
+        sut = Point(1, 2)
+
+        # Act / Assert
+        self.assertFalse(hasattr(sut, "__dict__"))
+        with self.assertRaises(AttributeError):
+            sut.z = 3
+
+    def test_points_round_trip_through_array(self):
+        # Arrange
+        points = [Point(0, 0), Point(3, 4), Point(3, 10)]
+
+        # Act
+        array = points_to_array(points)
+        result = array_to_points(array)
+
+        # Assert
+        self.assertEqual(array.shape, (3, 2))
+        self.assertEqual([(p.x, p.y) for p in result], [(0, 0), (3, 4), (3, 10)])
+        self.assertEqual(polyline_length(array), Point.get_length_of_points(points))
+
+    def test_units_and_normals_match_point_methods(self):
+        # Arrange
+        vectors = np.array([[3.0, 4.0], [0.0, -2.0], [0.0, 0.0]])
+
+        # Act
+        unit_vectors = units(vectors)
+        normal_vectors = normals(vectors)
+
+        # Assert
+        for vector, unit, normal in zip(vectors[:2], unit_vectors, normal_vectors):
+            point = Point(*vector)
+            self.assertEqual(tuple(unit), (point.unit().x, point.unit().y))
+            self.assertEqual(tuple(normal), (point.normal().x, point.normal().y))
+        np.testing.assert_array_equal(unit_vectors[2], [0.0, 0.0])
+        np.testing.assert_allclose(lengths(unit_vectors[:2]), [1.0, 1.0])
+
+    def test_segment_intersections_match_scalar_helpers(self):
+        # Arrange
+        rng = np.random.default_rng(1)
+        segments = rng.uniform(0, 10, (40, 2, 2))
+        segments[5] = [[0, 0], [4, 0]]
+        segments[6] = [[1, 0], [3, 0]]
+        a1, a2 = segments[:, np.newaxis, 0], segments[:, np.newaxis, 1]
+        b1, b2 = segments[np.newaxis, :, 0], segments[np.newaxis, :, 1]
+
+        # Act
+        mask, points = segment_intersections(a1, a2, b1, b2)
+
+        # Assert
+        for i in range(len(segments)):
+            for j in range(len(segments)):
+                p_a1, p_a2 = Point(*segments[i, 0].tolist()), Point(*segments[i, 1].tolist())
+                p_b1, p_b2 = Point(*segments[j, 0].tolist()), Point(*segments[j, 1].tolist())
+                expected = False
+                if Point.sign(cross_multiply(p_a2 - p_a1, p_b2 - p_b1)) != 0:
+                    p = calc_intersect_point(p_a1, p_a2, p_b1, p_b2)
+                    expected = on_segment(p_a1, p_a2, p) and on_segment(p_b1, p_b2, p)
+                    if expected:
+                        self.assertAlmostEqual(points[i, j, 0], p.x)
+                        self.assertAlmostEqual(points[i, j, 1], p.y)
+                self.assertEqual(bool(mask[i, j]), expected)
+        self.assertGreater(np.count_nonzero(mask), 0)
+
+    def test_bezier_points_match_repeated_interpolation(self):
+        # Arrange
+        start, mid1, mid2, end = Point(0, 0), Point(5, 0), Point(10, 5), Point(10, 10)
+
+        # Act
+        result = bezier_points(*(np.array([p.x, p.y]) for p in (start, mid1, mid2, end)), 10)
+
+        # Assert
+        for y in range(11):
+            a = y / 10.0
+            p1, p2, p3 = lerp(start, mid1, a), lerp(mid1, mid2, a), lerp(mid2, end, a)
+            expected = lerp(lerp(p1, p2, a), lerp(p2, p3, a), a)
+            self.assertEqual(tuple(result[y]), (expected.x, expected.y))
+
+    def test_polyline_crossings_match_pairwise_search(self):
+        # Arrange
+        rng = np.random.default_rng(2)
+        polylines = []
+        for _ in range(30):
+            start, end = rng.uniform(0, 30, 2), rng.uniform(0, 30, 2)
+            mid1, mid2 = start + rng.uniform(-5, 5, 2), end + rng.uniform(-5, 5, 2)
+            polylines.append(bezier_points(start, mid1, mid2, end, 10))
+        polylines.append(np.array([[0.0, 15.0], [10.0, 15.0], [20.0, 15.0], [30.0, 15.0]]))
+        polylines.append(np.array([[15.0, 0.0], [15.0, 30.0]]))
+        polylines.append(np.array([[100.0, 100.0], [101.0, 101.0]]))
+        polylines.append(np.zeros((1, 2)))
+
+        # Act
+        result = polyline_crossings(polylines)
+
+        # Assert
+        self.assertEqual(result, brute_force_crossings(polylines))
+        self.assertGreater(len(result), 30)
+
+
+if __name__ == "__main__":
+    unittest.main()
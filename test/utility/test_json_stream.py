@@ -0,0 +1,72 @@
+import json
+import os
+import tempfile
+import unittest
+
+from src.utility.json_stream import iter_json_array
+from src.utility.utility import JsonMemberMiss, JsonTypeError
+
+
+class TestJsonStream(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "roadnet.json")
+        self.document = {
+            "intersections": [{"id": "intersection_" + str(i), "point": {"x": i * 300.125, "y": -12345.5},
+                               "virtual": i % 2 == 0, "roads": ["road_" + str(i)], "width": 1e-3 * i}
+                              for i in range(20)],
+            "meta": {"nested": [[1, 2, {"a": "]}"}], "x\"y"], "empty": {}},
+            "roads": [{"id": "road_" + str(i), "points": [{"x": 1234567.0 + i, "y": 0.5}], "lanes": []}
+                      for i in range(20)],
+            "empty": []
+        }
+        with open(self.path, "w") as file:
+            json.dump(self.document, file, indent=2)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_items_match_full_parse_for_any_chunk_size(self):
+        for chunk_size in (1, 7, 64, 1 << 20):
+            for name in ("intersections", "roads", "empty"):
+                # Act
+                result = list(iter_json_array(self.path, name, chunk_size))
+
+                # Assert
+                self.assertEqual(result, self.document[name])
+
+    def test_items_are_yielded_before_the_array_is_read(self):
+        # Arrange
+        with open(self.path, "a") as file:
+            file.write("garbage")
+
+        # Act
+        items = iter_json_array(self.path, "intersections", 16)
+
+        # Assert
+        self.assertEqual(next(items)["id"], "intersection_0")
+
+    def test_missing_member_raises(self):
+        # Act / Assert
+        with self.assertRaises(JsonMemberMiss):
+            list(iter_json_array(self.path, "flows"))
+
+    def test_non_array_member_raises(self):
+        # Act / Assert
+        with self.assertRaises(JsonTypeError):
+            list(iter_json_array(self.path, "meta"))
+
+    def test_truncated_document_raises(self):
+        # Arrange
+        with open(self.path) as file:
+            text = file.read()
+        with open(self.path, "w") as file:
+            file.write(text[:len(text) // 2])
+
+        # Act / Assert
+        with self.assertRaises(ValueError):
+            list(iter_json_array(self.path, "roads", 64))
+
+
+if __name__ == "__main__":
+    unittest.main()
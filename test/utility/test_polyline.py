@@ -0,0 +1,63 @@
+import unittest
+
+import numpy as np
+
+from src.utility.polyline import Polyline
+from src.utility.utility import Point
+
+
+class TestPolyline(unittest.TestCase):
+    def setUp(self):
+        self.points = [Point(0, 0), Point(3, 4), Point(3, 4), Point(13, 4), Point(13, -6)]
+        self.distances = [-1.0, 0.0, 2.5, 5.0, 7.5, 15.0, 20.0, 24.0, 25.0, 40.0]
+
+    def test_length_is_sum_of_segment_lengths(self):
+        # Act
+        sut = Polyline(self.points)
+
+        # Assert
+        self.assertEqual(sut.length, 25.0)
+        self.assertEqual(sut.offsets.tolist(), [0.0, 5.0, 5.0, 15.0, 25.0])
+
+    def test_point_at_matches_linear_walk(self):
+        # Arrange
+        sut = Polyline(self.points)
+
+        for distance in self.distances:
+            # Act
+            result = sut.point_at(distance)
+
+            # Assert
+            expected = Point.get_point_by_distance(self.points, distance)
+            self.assertAlmostEqual(result.x, expected.x)
+            self.assertAlmostEqual(result.y, expected.y)
+
+    def test_points_at_matches_point_at(self):
+        # Arrange
+        sut = Polyline(self.points)
+
+        # Act
+        x, y = sut.points_at(np.array(self.distances))
+
+        # Assert
+        for i, distance in enumerate(self.distances):
+            expected = sut.point_at(distance)
+            self.assertAlmostEqual(x[i], expected.x)
+            self.assertAlmostEqual(y[i], expected.y)
+
+    def test_direction_at_returns_unit_of_segment_containing_distance(self):
+        # Arrange
+        sut = Polyline(self.points)
+
+        # Act
+        directions = [sut.direction_at(distance) for distance in (1.0, 5.0, 14.0, 15.0, 30.0)]
+
+        # Assert
+        self.assertEqual([(d.x, d.y) for d in directions], [(0.6, 0.8), (1.0, 0.0), (1.0, 0.0), (0.0, -1.0),
+                                                            (0.0, -1.0)])
+        unit_x, unit_y = sut.directions_at(np.array([1.0, 5.0, 14.0, 15.0, 30.0]))
+        self.assertEqual(list(zip(unit_x.tolist(), unit_y.tolist())), [(d.x, d.y) for d in directions])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+import math
+import unittest
+
+import numpy as np
+
+from helpers import FakeVehicleInfo
+from src.vehicle.car_follow_kernel import get_no_collision_speeds, get_next_speeds
+from src.vehicle.vehicle_store import VehicleStore
+
+
+def scalar_no_collision_speed(vL, dL, vF, dF, gap, interval, target_gap):
+    c = vF * interval / 2 + target_gap - 0.5 * vL * vL / dL - gap
+    a = 0.5 / dF
+    b = 0.5 * interval
+    if b * b < 4 * a * c:
+        return -100
+    v1 = 0.5 / a * (math.sqrt(b * b - 4 * a * c) - b)
+    v2 = 2 * vL - dL * interval + 2 * (gap - target_gap) / interval
+    return min(v1, v2)
+
+
+class TestCarFollowKernel(unittest.TestCase):
+    def setUp(self):
+        self.store = VehicleStore()
+        self.drivable_max_speed = np.array([30.0, 5.0])
+
+    def add_vehicle(self, speed, drivable_index=0):
+        slot = self.store.allocate(None, FakeVehicleInfo(speed))
+        self.store.drivable_index[slot] = drivable_index
+        self.store.running[slot] = True
+        return slot
+
+    def test_get_no_collision_speeds_matches_scalar_formula(self):
+        # Arrange
+        cases = [(10, 4.5, 12, 4.5, 20, 1, 0), (0, 1, 15, 4.5, 1, 1, 2), (5, 2.5, 3, 2.5, 8, 0.5, 2)]
+
+        # Act
+        result = get_no_collision_speeds(*[np.array([case[i] for case in cases], dtype=float)
+                                           for i in range(5)], 1.0, np.array([c[6] for c in cases], dtype=float))
+
+        # Assert
+        for value, case in zip(result, cases):
+            self.assertAlmostEqual(value, scalar_no_collision_speed(*case[:5], 1.0, case[6]))
+
+    def test_get_next_speeds_without_leader_accelerates_up_to_drivable_max_speed(self):
+        # Arrange
+        free = self.add_vehicle(speed=10)
+        slow_lane = self.add_vehicle(speed=4, drivable_index=1)
+
+        # Act
+        result = get_next_speeds(self.store, np.array([free, slow_lane]), self.drivable_max_speed, 1.0)
+
+        # Assert
+        self.assertAlmostEqual(result[0], 14.5)
+        self.assertAlmostEqual(result[1], 5.0)
+
+    def test_get_next_speeds_with_leader_uses_car_follow_speed(self):
+        # Arrange
+        leader = self.add_vehicle(speed=2)
+        follower = self.add_vehicle(speed=12)
+        self.store.leader_slot[follower] = leader
+        self.store.gap[follower] = 15
+        interval = 1.0
+
+        # Act
+        result = get_next_speeds(self.store, np.array([follower]), self.drivable_max_speed, interval)
+
+        # Assert
+        expected = min(16.66667, 12 + 4.5 * interval, 30.0,
+                       scalar_no_collision_speed(2, 4.5, 12, 4.5, 15, interval, 0),
+                       scalar_no_collision_speed(2, 2.5, 12, 2.5, 15, interval, 2),
+                       (15 + (2 + 10 / 2) * interval - 12 * interval / 2) / (1 + interval / 2))
+        expected = max(expected, 12 - 4.5 * interval)
+        self.assertAlmostEqual(result[0], expected)
+
+    def test_get_next_speeds_respects_custom_speed(self):
+        # Arrange
+        slot = self.add_vehicle(speed=10)
+        self.store.is_custom_speed_set[slot] = True
+        self.store.buffer_custom_speed[slot] = 8
+
+        # Act
+        result = get_next_speeds(self.store, np.array([slot]), self.drivable_max_speed, 1.0)
+
+        # Assert
+        self.assertAlmostEqual(result[0], 8)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+import unittest
+
+from src.vehicle.route_cache import RouteCache
+from src.vehicle.router_type import RouterType
+
+
+class TestRouteCache(unittest.TestCase):
+    def test_get_returns_stored_route_and_counts_hits(self):
+        # Arrange
+        sut = RouteCache()
+        key = RouteCache.make_key(["road_0", "road_2"], RouterType.LENGTH, 11.0)
+        sut.put(key, True, ["road_0", "road_1", "road_2"])
+
+        # Act
+        result = sut.get(key)
+        missing = sut.get(RouteCache.make_key(["road_2", "road_0"], RouterType.LENGTH, 11.0))
+
+        # Assert
+        self.assertEqual(result, (True, ("road_0", "road_1", "road_2")))
+        self.assertIsNone(missing)
+        self.assertEqual((sut.hits, sut.misses), (1, 1))
+
+    def test_key_ignores_max_speed_except_for_duration_routes(self):
+        # Act / Assert
+        self.assertEqual(RouteCache.make_key(["a"], RouterType.LENGTH, 10.0),
+                         RouteCache.make_key(["a"], RouterType.LENGTH, 20.0))
+        self.assertNotEqual(RouteCache.make_key(["a"], RouterType.DURATION, 10.0),
+                            RouteCache.make_key(["a"], RouterType.DURATION, 20.0))
+
+    def test_put_evicts_least_recently_used_route(self):
+        # Arrange
+        sut = RouteCache(capacity=2)
+        keys = [RouteCache.make_key([str(i)], RouterType.LENGTH, 0) for i in range(3)]
+        sut.put(keys[0], True, ["0"])
+        sut.put(keys[1], True, ["1"])
+        sut.get(keys[0])
+
+        # Act
+        sut.put(keys[2], True, ["2"])
+
+        # Assert
+        self.assertEqual(len(sut), 2)
+        self.assertIsNone(sut.get(keys[1]))
+        self.assertIsNotNone(sut.get(keys[0]))
+
+    def test_invalidate_drops_only_requested_router_type(self):
+        # Arrange
+        sut = RouteCache()
+        length_key = RouteCache.make_key(["a", "b"], RouterType.LENGTH, 0)
+        duration_key = RouteCache.make_key(["a", "b"], RouterType.DURATION, 10.0)
+        sut.put(length_key, True, ["a", "b"])
+        sut.put(duration_key, True, ["a", "c", "b"])
+
+        # Act
+        sut.invalidate(RouterType.DURATION)
+
+        # Assert
+        self.assertIsNotNone(sut.get(length_key))
+        self.assertIsNone(sut.get(duration_key))
+        sut.invalidate()
+        self.assertEqual(len(sut), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
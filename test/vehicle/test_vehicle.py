@@ -0,0 +1,93 @@
+import tempfile
+import unittest
+
+from helpers import make_engine
+
+
+class TestVehicle(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.engine = make_engine(self.directory.name)
+
+    def tearDown(self):
+        self.engine.close()
+        self.directory.cleanup()
+
+    def test_flags_backed_by_the_vehicle_store_are_python_bools(self):
+        # Arrange
+        self.engine.nextStep()
+        sut = self.engine.vehicle_map["flow_0_0"]
+
+        # Act
+        flags = [sut.is_running(), sut.has_set_speed(), sut.has_set_end(), sut.has_set_drivable(),
+                 sut.hasSetCustomSpeed()]
+
+        # Assert
+        self.assertEqual([type(flag) for flag in flags], [bool] * 5)
+        self.assertIsNone(sut.get_changed_drivable())
+
+    def test_vehicle_crosses_lane_ends_until_it_finishes_its_route(self):
+        # Arrange
+        drivables = []
+        finished_step = None
+
+        # Act
+        for step in range(60):
+            self.engine.nextStep()
+            sut = self.engine.vehicle_map.get("flow_0_0")
+            if sut is None:
+                finished_step = step
+                break
+            drivable = sut.get_cur_drivable()
+            self.assertIn(sut, drivable.get_vehicles())
+            if not drivables or drivables[-1] != drivable.get_id():
+                drivables.append(drivable.get_id())
+
+        # Assert
+        self.assertEqual(drivables, ["road_0_0", "road_0_0_TO_road_1_0", "road_1_0"])
+        self.assertIsNotNone(finished_step)
+        self.assertEqual(self.engine.finished_vehicle_cnt, 1)
+        self.assertNotIn(sut, self.engine.road_net.get_drivable_by_id("road_1_0").get_vehicles())
+
+    def test_vehicle_stops_before_a_red_light(self):
+        # Arrange
+        self.engine.close()
+        self.engine = make_engine(self.directory.name, phases=((5, (0,)), (100, ())))
+
+        # Act
+        for _ in range(60):
+            self.engine.nextStep()
+
+        # Assert
+        sut = self.engine.vehicle_map["flow_0_0"]
+        self.assertEqual(sut.get_cur_drivable().get_id(), "road_0_0")
+        self.assertAlmostEqual(sut.get_speed(), 0)
+        self.assertLessEqual(sut.get_distance(), sut.get_cur_drivable().get_length())
+
+    def test_abort_changing_resets_the_partner_in_store_and_info(self):
+        # Arrange
+        for _ in range(6):
+            self.engine.nextStep()
+        sut = self.engine.vehicle_map["flow_0_0"]
+        shadow = self.engine.vehicle_map["flow_0_1"]
+        sut.set_shadow(shadow)
+        shadow.set_parent(sut)
+        sut.lane_change.changing = True
+        sut.set_offset(2.0)
+        self.engine.vehicle_store.dirty[:] = False
+
+        # Act
+        shadow.lane_change.abort_changing()
+
+        # Assert
+        self.assertEqual(sut.get_offset(), 0)
+        self.assertEqual(sut.lane_change_info.partnerType, 0)
+        self.assertIsNone(sut.get_partner())
+        self.assertFalse(sut.lane_change.changing)
+        self.assertFalse(hasattr(sut.lane_change, "offset"))
+        self.assertTrue(self.engine.vehicle_store.dirty[sut.slot])
+        self.assertTrue(self.engine.vehicle_store.dirty[shadow.slot])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,126 @@
+import sys
+import unittest
+
+import numpy as np
+
+from helpers import FakeVehicleInfo
+from src.vehicle.vehicle_store import VehicleStore
+
+
+class TestVehicleStore(unittest.TestCase):
+    def setUp(self):
+        self.sut = VehicleStore(capacity=2)
+
+    def test_allocate_copies_vehicle_info_into_columns(self):
+        # Act
+        slot = self.sut.allocate("vehicle", FakeVehicleInfo())
+
+        # Assert
+        self.assertEqual(self.sut.speed[slot], 1.5)
+        self.assertEqual(self.sut.max_speed[slot], 16.66667)
+        self.assertEqual(self.sut.drivable_index[slot], -1)
+        self.assertEqual(self.sut.leader_slot[slot], -1)
+        self.assertEqual(self.sut.enter_lane_link_time[slot], sys.maxsize)
+        self.assertTrue(self.sut.active[slot])
+        self.assertFalse(self.sut.running[slot])
+        self.assertEqual(self.sut.get_vehicle(slot), "vehicle")
+
+    def test_allocate_grows_columns_and_keeps_existing_values(self):
+        # Arrange
+        first = self.sut.allocate("a", FakeVehicleInfo())
+        self.sut.dis[first] = 12.5
+        self.sut.allocate("b", FakeVehicleInfo())
+
+        # Act
+        third = self.sut.allocate("c", FakeVehicleInfo())
+
+        # Assert
+        self.assertEqual(self.sut.capacity, 4)
+        self.assertEqual(self.sut.size, 3)
+        self.assertEqual(self.sut.dis[first], 12.5)
+        self.assertEqual(self.sut.get_vehicle(third), "c")
+
+    def test_release_frees_slot_for_reuse(self):
+        # Arrange
+        slot = self.sut.allocate("a", FakeVehicleInfo())
+        self.sut.dis[slot] = 3
+
+        # Act
+        self.sut.release(slot)
+        reused = self.sut.allocate("b", FakeVehicleInfo())
+
+        # Assert
+        self.assertEqual(reused, slot)
+        self.assertEqual(self.sut.dis[reused], 0)
+        self.assertEqual(self.sut.size, 1)
+
+    def test_allocate_copy_duplicates_all_columns(self):
+        # Arrange
+        slot = self.sut.allocate("a", FakeVehicleInfo())
+        self.sut.dis[slot] = 7
+        self.sut.is_speed_set[slot] = True
+        self.sut.drivable_index[slot] = 3
+
+        # Act
+        copy = self.sut.allocate_copy("shadow", slot)
+
+        # Assert
+        self.assertNotEqual(copy, slot)
+        self.assertEqual(self.sut.dis[copy], 7)
+        self.assertTrue(self.sut.is_speed_set[copy])
+        self.assertEqual(self.sut.drivable_index[copy], 3)
+
+    def test_running_slots_returns_only_active_running_slots(self):
+        # Arrange
+        a = self.sut.allocate("a", FakeVehicleInfo())
+        b = self.sut.allocate("b", FakeVehicleInfo())
+        self.sut.running[a] = True
+        self.sut.running[b] = True
+        self.sut.release(b)
+
+        # Act
+        result = self.sut.running_slots()
+
+        # Assert
+        self.assertEqual(list(result), [a])
+
+    def test_restore_slots_brings_back_released_vehicles_in_place(self):
+        # Arrange
+        a = self.sut.allocate("a", FakeVehicleInfo())
+        b = self.sut.allocate("b", FakeVehicleInfo())
+        self.sut.dis[b] = 12
+        slots = np.array([a, b])
+        columns = {name: getattr(self.sut, name)[slots]
+                   for fields in (self.sut.float_fields, self.sut.bool_fields, self.sut.int_fields)
+                   for name in fields}
+        self.sut.release(b)
+        c = self.sut.allocate("c", FakeVehicleInfo())
+        self.sut.dis[c] = 3
+
+        # Act
+        self.sut.restore_slots(slots, ["a", "b"], columns)
+
+        # Assert
+        self.assertEqual(self.sut.size, 2)
+        self.assertEqual(self.sut.get_vehicle(b), "b")
+        self.assertEqual(self.sut.dis[b], 12)
+        self.assertEqual(list(self.sut.active_slots()), [a, b])
+        self.assertNotIn(b, self.sut.free_slots)
+        self.assertFalse(self.sut.dirty.any())
+
+    def test_allocation_marks_slot_dirty(self):
+        # Arrange
+        self.sut.dirty[:] = False
+
+        # Act
+        slot = self.sut.allocate("a", FakeVehicleInfo())
+        copy = self.sut.allocate_copy("shadow", slot)
+
+        # Assert
+        self.assertTrue(self.sut.dirty[slot])
+        self.assertTrue(self.sut.dirty[copy])
+        self.assertNotIn("dirty", self.sut.bool_fields)
+
+
+if __name__ == "__main__":
+    unittest.main()